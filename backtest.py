@@ -0,0 +1,184 @@
+"""Vectorized backtests of the dashboard's RSI, MACD, MA200 and Bollinger signals.
+
+A strategy is a rule that maps the panel indicators of
+technical_analysis.calculate_panel_indicators to a dates x symbols array
+of target positions (1 long, 0 flat). Positions are taken at the close
+and held from the next bar, costs are charged on every change, and
+equity, drawdown and turnover are computed for all symbols at once: the
+only Python loop is over strategies.
+
+    python backtest.py --store data/ohlcv --cost 0.001
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from metrics import PricePanel, TRADING_DAYS_1Y
+from technical_analysis import calculate_panel_indicators
+
+# One-way cost per unit of position changed (0.1% covers brokerage and STT)
+DEFAULT_COST = 0.001
+
+
+def _ffill(values):
+    """Carry the last non-NaN value down each column"""
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+
+def hold_between(entries, exits):
+    """Positions that open on `entries` and stay open until `exits` (exits win ties)"""
+    state = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    return np.nan_to_num(_ffill(state), nan=0.0)
+
+
+def rsi_reversion(close, indicators, oversold=30, overbought=70):
+    """Buy when RSI turns Oversold, sell when it turns Overbought"""
+    rsi = indicators['RSI']
+    return hold_between(rsi < oversold, rsi > overbought)
+
+
+def macd_trend(close, indicators):
+    """Long while MACD is Bullish (above its signal line)"""
+    return (indicators['MACD'] > indicators['Signal']).astype(float)
+
+
+def above_ma(close, indicators):
+    """Long while the close is above the longest moving average computed (MA200 by default)"""
+    window = max(int(name[2:]) for name in indicators if name.startswith('MA') and name[2:].isdigit())
+    return (close > indicators[f"MA{window}"]).astype(float)
+
+
+def macd_above_ma(close, indicators):
+    """MACD trend, only while above the longest moving average"""
+    return macd_trend(close, indicators) * above_ma(close, indicators)
+
+
+def bollinger_reversion(close, indicators):
+    """Buy below the lower Bollinger band, sell back at the middle band"""
+    return hold_between(close < indicators['BB_Lower'], close > indicators['BB_Middle'])
+
+
+STRATEGIES = {
+    'RSI reversion': rsi_reversion,
+    'MACD trend': macd_trend,
+    'Above MA200': above_ma,
+    'MACD above MA200': macd_above_ma,
+    'Bollinger reversion': bollinger_reversion
+}
+
+
+class BacktestResult:
+    """Equity curves and statistics of one strategy over a panel.
+
+    `equity` is the dates x symbols growth of 1 invested per symbol,
+    `portfolio` the equity of an equal-weight portfolio of all listed
+    symbols, `summary` one row of statistics per symbol and `stats` the
+    same statistics for the portfolio.
+    """
+
+    def __init__(self, name, dates, symbols, equity, portfolio, summary, stats):
+        self.name = name
+        self.dates = dates
+        self.symbols = symbols
+        self.equity = equity
+        self.portfolio = portfolio
+        self.summary = summary
+        self.stats = stats
+
+    def equity_curve(self, symbol):
+        return pd.Series(self.equity[:, self.symbols.index(symbol)], index=self.dates, name=self.name)
+
+
+def _statistics(returns, held, listed, equity):
+    """Per-column statistics of daily strategy returns; every input is dates x columns"""
+    days = listed.sum(axis=0)
+    years = np.maximum(days, 1) / TRADING_DAYS_1Y
+    changes = np.abs(np.diff(held, axis=0, prepend=0.0))
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+    with np.errstate(all='ignore'):
+        mean = returns.sum(axis=0) / days
+        std = np.sqrt(np.where(listed, (returns - mean) ** 2, 0.0).sum(axis=0) / (days - 1))
+        return {
+            'Total Return': equity[-1] - 1,
+            'CAGR': equity[-1] ** (1 / years) - 1,
+            'Volatility': std * np.sqrt(TRADING_DAYS_1Y),
+            'Sharpe': mean / std * np.sqrt(TRADING_DAYS_1Y),
+            'Max Drawdown': drawdown.min(axis=0),
+            'Turnover': changes.sum(axis=0) / years,
+            'Exposure': np.where(listed, held, 0.0).sum(axis=0) / days,
+            'Trades': (np.diff(held, axis=0, prepend=0.0) > 0).sum(axis=0)
+        }
+
+
+def backtest(name, dates, symbols, close, positions, cost=DEFAULT_COST):
+    """Backtest target `positions` (dates x symbols, decided at each close) on `close`"""
+    close = np.asarray(close, dtype=float)
+    valid = ~np.isnan(close)
+    last = len(close) - 1 - np.argmax(valid[::-1], axis=0)
+    # Gaps carry the previous close; bars after a symbol's last close don't count
+    close = _ffill(close)
+    returns = np.zeros_like(close)
+    returns[1:] = close[1:] / close[:-1] - 1
+    listed = ~np.isnan(returns) & (np.arange(len(close))[:, None] <= last)
+    listed[0] = False
+
+    # Decided at the close of bar t, held over bar t + 1
+    held = np.zeros_like(close)
+    held[1:] = np.where(listed[1:], positions[:-1], 0.0)
+    changes = np.abs(np.diff(held, axis=0, prepend=0.0))
+    strategy = np.where(listed, held * np.nan_to_num(returns) - cost * changes, 0.0)
+    equity = np.cumprod(1 + strategy, axis=0)
+
+    summary = pd.DataFrame({'Symbol': symbols, **_statistics(strategy, held, listed, equity)})
+    with np.errstate(all='ignore'):
+        first = close[np.argmax(listed, axis=0) - 1, np.arange(close.shape[1])]
+        summary['Buy & Hold'] = close[-1] / first - 1
+    summary = summary[listed.any(axis=0)].reset_index(drop=True)
+
+    # Equal weight across the symbols listed on each day, rebalanced daily
+    active = listed.sum(axis=1)
+    with np.errstate(all='ignore'):
+        daily = np.where(active > 0, strategy.sum(axis=1) / active, 0.0)
+        exposure = np.where(active > 0, np.where(listed, held, 0.0).sum(axis=1) / active, 0.0)
+    portfolio = np.cumprod(1 + daily)
+    stats = {key: float(value[0]) for key, value in _statistics(
+        daily[:, None], exposure[:, None], (active > 0)[:, None], portfolio[:, None]
+    ).items()}
+    return BacktestResult(name, dates, list(symbols), equity, pd.Series(portfolio, index=dates, name=name),
+                          summary, stats)
+
+
+def run_backtests(panel, strategies=None, cost=DEFAULT_COST, **indicator_params):
+    """Backtest every strategy on a PricePanel; indicators are computed once and shared"""
+    strategies = STRATEGIES if strategies is None else strategies
+    close = np.asarray(panel['Close'], dtype=float)
+    indicators = calculate_panel_indicators(close, **indicator_params)
+    return {
+        name: backtest(name, panel.dates, panel.symbols, close, rule(close, indicators), cost)
+        for name, rule in strategies.items()
+    }
+
+
+def main():
+    from ohlcv_store import OHLCVStore
+
+    parser = argparse.ArgumentParser(description="Backtest the dashboard signals on the local OHLCV store")
+    parser.add_argument('--store', default='data/ohlcv')
+    parser.add_argument('--cost', type=float, default=DEFAULT_COST, help="One-way cost per trade")
+    args = parser.parse_args()
+
+    store = OHLCVStore(args.store)
+    panel = PricePanel.from_histories({symbol: store.load(symbol) for symbol in store.symbols()})
+    if not panel.symbols:
+        parser.error(f"No stored history in {args.store}")
+    results = run_backtests(panel, cost=args.cost)
+    print(f"{len(panel.symbols)} symbols, {panel.dates[0]:%Y-%m-%d} to {panel.dates[-1]:%Y-%m-%d}\n")
+    print(pd.DataFrame({name: result.stats for name, result in results.items()}).T.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
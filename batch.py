@@ -0,0 +1,142 @@
+"""Headless batch refresh: update the store, compute metrics and screens, write snapshots.
+
+Runs the same data layer as the dashboard without a Streamlit runtime,
+e.g. nightly from cron:
+
+    python batch.py --store data/ohlcv --out data/batch
+    python batch.py --format csv --no-quotes
+
+The output directory gets stocks, indicators and one file per screen
+(Parquet or CSV) plus stats.json. Each file is written next to its target
+and renamed into place, so readers never see a partial file. The stats
+are printed on exit; the exit status is 1 when no history could be
+loaded or more than --max-failed of the symbols failed to download.
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+
+from data_handler import StockDataHandler
+from ohlcv_store import OHLCVStore
+from screener import Screener, SCREEN_CONDITIONS, screen_table, near_52week_high, near_52week_low
+import perf
+
+FORMATS = ('parquet', 'csv')
+
+# Every screen the dashboard offers, including its price filters
+BATCH_SCREENS = {
+    'Near 52-Week High': near_52week_high(),
+    'Near 52-Week Low': near_52week_low(),
+    **SCREEN_CONDITIONS
+}
+
+
+def screen_filename(name):
+    """File-system safe name of a screen, e.g. 'rsi-30-oversold'"""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def write_frame(df, path, fmt):
+    """Write a table atomically as Parquet or CSV"""
+    tmp_path = f"{path}.tmp"
+    if fmt == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def run_batch(handler, out, fmt='parquet', quotes=True):
+    """Refresh the universe through `handler` and write its tables to `out`; returns the run stats"""
+    os.makedirs(os.path.join(out, 'screens'), exist_ok=True)
+    stages = {}
+
+    def stage(name, fn):
+        start = time.perf_counter()
+        with perf.span(f"batch.{name}"):
+            result = fn()
+        stages[name] = round(time.perf_counter() - start, 4)
+        return result
+
+    started = datetime.now()
+    panel = stage('load_panel', handler.load_price_panel)
+    history_fetch = handler.history_stats.summary()
+    metrics = stage('history_metrics', lambda: handler.history_metrics(panel))
+    indicators = stage('indicator_screen', lambda: handler.indicator_screen(panel))
+    prices = stage('load_quotes', handler.load_quotes) if quotes else None
+    quote_fetch = handler.quote_stats.summary() if quotes else None
+    stock_table = stage('apply_quotes', lambda: handler.apply_quotes(metrics, prices))
+
+    files = []
+    screens = {}
+    if len(stock_table):
+        table = screen_table(stock_table, indicators)
+        screener = stage('screener', lambda: Screener(table))
+        for name, predicate in BATCH_SCREENS.items():
+            rows = stage(f"screen:{name}", lambda: predicate.select(screener))
+            screens[name] = len(rows)
+            path = os.path.join(out, 'screens', f"{screen_filename(name)}.{fmt}")
+            write_frame(table.iloc[rows], path, fmt)
+            files.append(path)
+
+    for name, df in (('stocks', stock_table), ('indicators', indicators)):
+        path = os.path.join(out, f"{name}.{fmt}")
+        stage(f"write:{name}", lambda: write_frame(df, path, fmt))
+        files.append(path)
+
+    stats = {
+        'started': started.isoformat(timespec='seconds'),
+        'seconds': round((datetime.now() - started).total_seconds(), 3),
+        'requested': int(handler.nifty500_symbols['Symbol'].nunique()),
+        'symbols': len(panel.symbols),
+        'first_date': f"{panel.dates[0]:%Y-%m-%d}" if len(panel.dates) else None,
+        'last_date': f"{panel.dates[-1]:%Y-%m-%d}" if len(panel.dates) else None,
+        'quotes': int(prices.notna().sum()) if prices is not None else 0,
+        'history_fetch': history_fetch,
+        'quote_fetch': quote_fetch,
+        'screens': screens,
+        'stages': stages,
+        'files': files,
+        'last_error': handler.last_error
+    }
+    with open(os.path.join(out, 'stats.json.tmp'), 'w') as f:
+        json.dump(stats, f, indent=2)
+    os.replace(os.path.join(out, 'stats.json.tmp'), os.path.join(out, 'stats.json'))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh Nifty 500 data and write metric and screen snapshots")
+    parser.add_argument('--store', default='data/ohlcv', help="Local OHLCV store to update")
+    parser.add_argument('--out', default='data/batch', help="Directory the snapshots are written to")
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--no-quotes', action='store_true', help="Use the last close instead of fetching live prices")
+    parser.add_argument('--max-failed', type=float, default=0.05,
+                        help="Fraction of symbols allowed to fail downloading before exiting with 1")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    handler = StockDataHandler(store=OHLCVStore(args.store))
+    stats = run_batch(handler, args.out, args.format, quotes=not args.no_quotes)
+    print(json.dumps(stats, indent=2))
+
+    # Failed symbols over the whole update, not failed batches
+    failed = stats['history_fetch']['failed_symbols']
+    if not stats['symbols']:
+        print(f"No price history loaded into {args.store}", file=sys.stderr)
+        return 1
+    if stats['requested'] and failed / stats['requested'] > args.max_failed:
+        print(f"{failed} of {stats['requested']} symbols failed to download", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Benchmarks for the refresh and rendering hot paths on synthetic data.
+
+    python benchmark.py                         # 500 symbols, compare with the baseline
+    python benchmark.py --symbols 500 5000      # several universe sizes
+    python benchmark.py --update-baseline       # record the current numbers
+
+Every run builds a deterministic universe of FakeDataProvider symbols with
+5 years of daily bars in a temporary store, then measures the peak traced memory of
+each stage after a warm-up run and its best time over --repeat further runs.
+
+Times are compared as multiples of a fixed calibration workload timed in the
+same process, so a baseline recorded on one machine still holds on a faster
+or slower one. Hosts whose numpy/pandas builds differ a lot can still drift;
+re-baseline there first: check out the base commit, run --update-baseline,
+then check out the change and run the comparison.
+
+The exit status is 1 when a stage is slower or uses more memory than the
+baseline by more than the allowed margin, and 2 when a universe size has no
+baseline to compare against.
+"""
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+BASELINE_FILE = 'benchmark_baseline.json'
+# Fixed end date, so every run sees the same bars
+END_DATE = '2025-06-30'
+CHART_SYMBOLS = 5
+
+
+def synthetic_symbols(n_symbols):
+    """Symbol/Name frame of a synthetic universe"""
+    symbols = [f"SYN{i:05d}.NS" for i in range(n_symbols)]
+    return pd.DataFrame({'Symbol': symbols, 'Name': [f"Synthetic Company {i}" for i in range(n_symbols)]})
+
+
+def build_universe(n_symbols, root):
+    """Data handler over a warmed local store of `n_symbols` synthetic symbols"""
+    from data_providers import FakeDataProvider
+    from ohlcv_store import OHLCVStore
+    from data_handler import StockDataHandler
+
+    provider = FakeDataProvider(end=END_DATE, origin='2020-01-01')
+    handler = StockDataHandler(provider=provider, store=OHLCVStore(root), symbols=synthetic_symbols(n_symbols))
+    handler.load_price_panel()
+    return handler
+
+
+def stages(handler):
+    """(name, setup, run) for every benchmarked stage; setup output is passed to run"""
+    from technical_analysis import calculate_all_indicators, calculate_panel_indicators
+    from screener import Screener, Between, Flag, screen_table, near_52week_high, near_52week_low
+    from table_view import TableView, STOCK_TABLE_FORMATS, STOCK_TABLE_SIGNED
+    from visualizations import create_price_chart, create_macd_chart, create_returns_chart
+    from data_handler import STOCK_COLUMNS
+    from backtest import backtest, macd_trend
+    from correlation import CorrelationCache
+
+    panel = handler.load_price_panel()
+    metrics = handler.history_metrics(panel)
+    quotes = handler.load_quotes()
+    stock_table = handler.apply_quotes(metrics, quotes)
+    table = screen_table(stock_table, handler.indicator_screen(panel))
+    symbols = list(panel.symbols[:CHART_SYMBOLS])
+    histories = {symbol: panel.history(symbol) for symbol in symbols}
+    indicators = {symbol: calculate_all_indicators(histories[symbol]) for symbol in symbols}
+    close = np.asarray(panel['Close'], dtype=float)
+    panel_indicators = calculate_panel_indicators(close)
+
+    def run_screens(screener):
+        for predicate in (near_52week_high(), near_52week_low(), Between('RSI', high=30),
+                          Flag('Above MA200') & Between('1y_return', low=0.1)):
+            screener.select(predicate)
+
+    def run_figures(_):
+        for symbol in symbols:
+            create_price_chart(histories[symbol], symbol, indicators[symbol])
+            create_macd_chart(histories[symbol], indicators[symbol])
+            create_returns_chart(histories[symbol], symbol)
+
+    def run_table(_):
+        view = TableView(stock_table[STOCK_COLUMNS], STOCK_TABLE_FORMATS, STOCK_TABLE_SIGNED)
+        view.render(view.page(sort_by='Price Change %', page_size=50)).to_html()
+
+    return [
+        ('load_panel', lambda: None, lambda _: handler.load_price_panel()),
+        ('metrics', lambda: None, lambda _: handler.history_metrics(panel)),
+        ('apply_quotes', lambda: None, lambda _: handler.apply_quotes(metrics, quotes)),
+        ('indicators_panel', lambda: None, lambda _: calculate_panel_indicators(panel['Close'])),
+        ('indicators_symbol', lambda: None,
+         lambda _: [calculate_all_indicators(histories[symbol]) for symbol in symbols]),
+        ('indicator_screen', lambda: None, lambda _: handler.indicator_screen(panel)),
+        ('screens', lambda: Screener(table), run_screens),
+        ('figures', lambda: None, run_figures),
+        ('table', lambda: None, run_table),
+        ('backtest', lambda: macd_trend(close, panel_indicators),
+         lambda positions: backtest('MACD trend', panel.dates, panel.symbols, close, positions)),
+        ('correlation', CorrelationCache, lambda cache: cache.clustering(panel, 252)),
+    ]
+
+
+def calibration_workload():
+    """Fixed mix of numpy, pandas and interpreter work, roughly like the stages"""
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal((1250, 200))
+    np.sort(values, axis=0)
+    pd.DataFrame(values).rolling(20).mean()
+    sum(i * i for i in range(200_000))
+
+
+def calibrate(repeat=5):
+    """Best time of the calibration workload on this machine, in seconds"""
+    calibration_workload()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        calibration_workload()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure(setup, run, repeat):
+    """Peak traced memory of a run after a warm-up, then the best wall time of `repeat` runs"""
+    # Imports, templates and caches of the first run are not the stage's own memory
+    run(setup())
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        state = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+    # The minimum is the least noisy estimate on a shared machine
+    return {'seconds': min(timings), 'peak_mb': peak / 1024 / 1024}
+
+
+def run_benchmarks(n_symbols, repeat=3):
+    """{stage: {'seconds', 'relative', 'peak_mb'}}; relative is in calibration units"""
+    with tempfile.TemporaryDirectory() as root:
+        handler = build_universe(n_symbols, root)
+        results = {name: measure(setup, run, repeat) for name, setup, run in stages(handler)}
+    calibration = calibrate()
+    for result in results.values():
+        result['relative'] = result['seconds'] / calibration
+    return results
+
+
+def compare(results, baseline, time_margin, memory_margin, min_seconds=0.005):
+    """Messages for every stage that regressed past its margin"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        # Stages too short to time reliably are only checked for memory
+        if result['seconds'] > min_seconds and result['relative'] > reference['relative'] * (1 + time_margin):
+            regressions.append(f"{name}: {result['relative']:.3f} vs baseline {reference['relative']:.3f} "
+                               f"calibration units ({result['seconds']:.4f}s)")
+        if result['peak_mb'] > reference['peak_mb'] * (1 + memory_margin) + 1:
+            regressions.append(f"{name}: {result['peak_mb']:.1f}MB vs baseline {reference['peak_mb']:.1f}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data and rendering hot paths")
+    parser.add_argument('--symbols', type=int, nargs='+', default=[500], help="Universe sizes to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store these results as the baseline (re-run on each new benchmark host)")
+    parser.add_argument('--time-margin', type=float, default=0.5, help="Allowed slowdown (0.5 = 50%%)")
+    parser.add_argument('--memory-margin', type=float, default=0.25, help="Allowed peak memory growth")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    regressions = []
+    missing = []
+    for n_symbols in args.symbols:
+        results = run_benchmarks(n_symbols, args.repeat)
+        reference = baseline.get(str(n_symbols), {})
+        # Baselines from before calibration only have seconds and need re-recording
+        if not reference or not all('relative' in ref for ref in reference.values()):
+            reference = {}
+            missing.append(n_symbols)
+        print(f"\n{n_symbols} symbols (times in calibration units)")
+        print(f"{'stage':<20}{'seconds':>10}{'relative':>10}{'baseline':>10}{'peak MB':>10}{'baseline':>10}")
+        for name, result in results.items():
+            ref = reference.get(name, {})
+            print(f"{name:<20}{result['seconds']:>10.4f}{result['relative']:>10.3f}{ref.get('relative', np.nan):>10.3f}"
+                  f"{result['peak_mb']:>10.1f}{ref.get('peak_mb', np.nan):>10.1f}")
+        if args.update_baseline:
+            baseline[str(n_symbols)] = {
+                name: {key: round(value, 4) for key, value in result.items()} for name, result in results.items()
+            }
+        else:
+            regressions += [f"[{n_symbols}] {message}" for message in
+                            compare(results, reference, args.time_margin, args.memory_margin)]
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if missing:
+        print(f"\nNo baseline for {', '.join(map(str, missing))} symbols in {args.baseline}; "
+              f"run with --update-baseline first")
+        return 2
+    if regressions:
+        print("\nRegressions:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""Rolling correlation of the whole universe and clustering of the matrix.
+
+Returns are log close-to-close changes of the price panel, with gaps
+carried forward as no change. A symbol only gets correlations once it
+has a full window of returns.
+
+RollingCorrelation keeps the cross products of the window's returns,
+shifted by a reference mean, so a new bar is a rank-one update
+(O(symbols^2)) instead of a new matrix product over the whole window, and
+a revised last bar replaces its own contribution. Full fits build the
+cross products tile by tile so the temporaries stay small for large
+universes and intraday windows.
+"""
+import threading
+
+import numpy as np
+
+import perf
+
+CORRELATION_WINDOWS = (60, 252)
+BLOCK_SIZE = 256
+
+
+def log_returns(close, rows=None):
+    """dates x symbols log returns, or only the last `rows` of them.
+
+    Gaps count as no change and a symbol is NaN before its first close.
+    The tail is computed from the closes it needs, so following a long
+    history costs only the new bars.
+    """
+    if rows is not None and rows < len(close):
+        head, close = close[:len(close) - rows - 1], close[len(close) - rows - 1:]
+    else:
+        head = close[:0]
+    close = np.array(close, dtype=float)
+    missing = np.isnan(close[0]) if len(close) else np.zeros(0, dtype=bool)
+    if missing.any() and len(head):
+        # A gap at the start of the tail carries the last earlier close
+        earlier = np.asarray(head[:, missing], dtype=float)
+        seen = ~np.isnan(earlier)
+        last = len(earlier) - 1 - np.argmax(seen[::-1], axis=0)
+        close[0, missing] = np.where(seen.any(axis=0), earlier[last, np.arange(earlier.shape[1])], np.nan)
+
+    rows_index = np.where(np.isnan(close), 0, np.arange(len(close))[:, None])
+    np.maximum.accumulate(rows_index, axis=0, out=rows_index)
+    filled = close[rows_index, np.arange(close.shape[1])]
+    returns = np.full_like(filled, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = np.log(filled[1:] / filled[:-1])
+    return returns if rows is None else returns[-rows:]
+
+
+def blocked_gram(x, block=BLOCK_SIZE, dtype=float):
+    """x.T @ x built from `block` x `block` tiles of the upper triangle, mirrored.
+
+    Only the output and one tile are alive at a time, and the symmetric
+    half is never multiplied.
+    """
+    m = x.shape[1]
+    gram = np.empty((m, m), dtype=dtype)
+    for i in range(0, m, block):
+        for j in range(i, m, block):
+            tile = x[:, i:i + block].T @ x[:, j:j + block]
+            gram[i:i + block, j:j + block] = tile
+            gram[j:j + block, i:i + block] = tile.T
+    return gram
+
+
+class RollingCorrelation:
+    """Correlation matrix over the last `window` returns, updated bar by bar.
+
+    `fit` starts from a returns panel; `update(row)` adds a bar and drops
+    the oldest, `update(row, replace=True)` revises the latest bar. The sums
+    are rebuilt from the kept window every `window` updates so rounding
+    cannot accumulate.
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self.rows = None
+        self._updates = 0
+        self._matrix = None
+
+    def fit(self, returns):
+        returns = np.asarray(returns, dtype=float)
+        tail = returns[-self.window:]
+        self.rows = np.full((self.window, returns.shape[1]), np.nan)
+        self.rows[self.window - len(tail):] = tail
+        self._rebuild()
+        return self
+
+    def _rebuild(self):
+        valid = ~np.isnan(self.rows)
+        values = np.where(valid, self.rows, 0.0)
+        self.count = valid.sum(axis=0)
+        # Sums are kept around a reference mean for numerical stability
+        self.shift = values.sum(axis=0) / np.maximum(self.count, 1)
+        shifted = np.where(valid, values - self.shift, 0.0)
+        self.sums = shifted.sum(axis=0)
+        self.products = blocked_gram(shifted)
+        self._updates = 0
+        self._matrix = None
+
+    def _shifted(self, row):
+        valid = ~np.isnan(row)
+        return valid, np.where(valid, row - self.shift, 0.0)
+
+    def update(self, row, replace=False):
+        row = np.asarray(row, dtype=float)
+        if replace:
+            outgoing, self.rows[-1] = self.rows[-1].copy(), row
+        else:
+            outgoing = self.rows[0].copy()
+            self.rows = np.roll(self.rows, -1, axis=0)
+            self.rows[-1] = row
+
+        old_valid, old = self._shifted(outgoing)
+        new_valid, new = self._shifted(row)
+        self.count += new_valid.astype(int) - old_valid.astype(int)
+        self.sums += new - old
+        self.products += np.outer(new, new) - np.outer(old, old)
+        self._matrix = None
+
+        self._updates += 1
+        if self._updates >= self.window:
+            self._rebuild()
+
+    def matrix(self, dtype=np.float32):
+        """The current correlation matrix; symbols without a full window are NaN"""
+        if self._matrix is None:
+            n = self.window
+            covariance = (self.products - np.outer(self.sums, self.sums) / n) / (n - 1)
+            std = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+            complete = (self.count == n) & (std > 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                matrix = covariance / np.outer(std, std)
+            matrix[~complete, :] = np.nan
+            matrix[:, ~complete] = np.nan
+            np.clip(matrix, -1, 1, out=matrix)
+            self._matrix = matrix.astype(dtype)
+        return self._matrix
+
+
+def average_linkage(distance):
+    """Average-linkage hierarchical clustering of a distance matrix (nearest-neighbour chain).
+
+    Returns the merges as (node, node, distance) in creation order; leaves
+    are 0..n-1 and the i-th merge creates node n + i.
+    """
+    n = len(distance)
+    d = np.array(distance, dtype=float)
+    np.fill_diagonal(d, np.inf)
+    size = np.ones(n)
+    node = np.arange(n)
+    active = np.ones(n, dtype=bool)
+    merges = []
+    chain = []
+    remaining = n
+    while remaining > 1:
+        if not chain:
+            chain.append(int(np.argmax(active)))
+        a = chain[-1]
+        b = int(np.argmin(d[a]))
+        if len(chain) > 1 and d[a, chain[-2]] <= d[a, b]:
+            b = chain[-2]
+        if len(chain) > 1 and b == chain[-2]:
+            chain = chain[:-2]
+            merges.append((int(node[a]), int(node[b]), float(d[a, b])))
+            # Lance-Williams update for average linkage; slot a holds the new cluster
+            merged = (size[a] * d[a] + size[b] * d[b]) / (size[a] + size[b])
+            d[a], d[:, a] = merged, merged
+            d[b], d[:, b] = np.inf, np.inf
+            d[a, a] = np.inf
+            active[b] = False
+            size[a] += size[b]
+            node[a] = n + len(merges) - 1
+            remaining -= 1
+        else:
+            chain.append(b)
+    return merges
+
+
+def leaf_order(merges, n):
+    """Leaves in dendrogram order, so similar symbols sit next to each other"""
+    if n == 0:
+        return np.empty(0, dtype=int)
+    children = {n + i: (a, b) for i, (a, b, _) in enumerate(merges)}
+    order, stack = [], [n + len(merges) - 1 if merges else 0]
+    while stack:
+        current = stack.pop()
+        if current < n:
+            order.append(current)
+        else:
+            stack.extend(reversed(children[current]))
+    return np.array(order)
+
+
+def cut_clusters(merges, n, n_clusters):
+    """Flat cluster label per leaf when the tree is cut into `n_clusters` groups"""
+    parent = list(range(n + len(merges)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    # Average linkage is monotone, so the lowest merges are the ones kept
+    by_height = sorted(range(len(merges)), key=lambda i: (merges[i][2], i))
+    for i in by_height[:max(n - n_clusters, 0)]:
+        a, b, _ = merges[i]
+        parent[find(a)] = n + i
+        parent[find(b)] = n + i
+    roots = [find(leaf) for leaf in range(n)]
+    labels = {root: label for label, root in enumerate(dict.fromkeys(roots))}
+    return np.array([labels[root] for root in roots])
+
+
+class Clustering:
+    """Dendrogram order and flat clusters of the symbols with a full window"""
+
+    def __init__(self, matrix, symbols, n_clusters=12):
+        complete = ~np.isnan(np.diag(matrix))
+        self.symbols = [s for s, ok in zip(symbols, complete) if ok]
+        self.matrix = matrix[np.ix_(complete, complete)]
+        # Correlation distance: 0 for perfectly correlated, 2 for opposite
+        self.merges = average_linkage(1 - self.matrix)
+        n = len(self.symbols)
+        self.order = leaf_order(self.merges, n)
+        self.labels = cut_clusters(self.merges, n, min(n_clusters, n))
+
+    def ordered(self):
+        """(matrix, symbols, labels) in dendrogram order"""
+        order = self.order
+        return self.matrix[np.ix_(order, order)], [self.symbols[i] for i in order], self.labels[order]
+
+    def summary(self):
+        """One row per cluster: size, mean correlation inside it and its members"""
+        rows = []
+        for label in np.unique(self.labels):
+            members = np.flatnonzero(self.labels == label)
+            block = self.matrix[np.ix_(members, members)]
+            inside = (block.sum() - len(members)) / max(len(members) * (len(members) - 1), 1)
+            rows.append({
+                'Cluster': int(label) + 1,
+                'Size': len(members),
+                'Mean Correlation': float(inside) if len(members) > 1 else np.nan,
+                'Members': ', '.join(self.symbols[i] for i in members)
+            })
+        return rows
+
+
+class _WindowState:
+    """What CorrelationCache knows about one window: the rolling sums and the panel they follow"""
+
+    def __init__(self, rolling):
+        self.rolling = rolling
+        self.symbols = None
+        self.last_day = None
+        self.last_returns = None
+        # Days and closes the rolling sums were computed from
+        self.days = None
+        self.closes = None
+
+
+class CorrelationCache:
+    """Per-window rolling correlations that follow the published price panel.
+
+    A panel that extends the one seen last by up to a window of bars is
+    folded in bar by bar, after revising the previous last bar if it
+    changed. A new universe, or a history rewritten inside the window (e.g.
+    re-adjusted for a split), is refitted: the closes behind the rolling
+    sums are kept and compared with the new panel. Clusterings are cached
+    until the matrix they were built from changes.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._clusterings = {}
+        self._lock = threading.Lock()
+        self.refits = 0
+        self.updates = 0
+
+    def _new_rows(self, state, panel, window):
+        """Bars of `panel` from the last one `state` has seen, or None when it needs a refit"""
+        if state is None or state.symbols != panel.symbols:
+            return None
+        start = int(np.searchsorted(panel.days, state.last_day))
+        if start >= len(panel.days) or panel.days[start] != state.last_day:
+            return None
+        if len(panel.days) - start - 1 > window:
+            return None
+        # Any earlier close in the window must be unchanged; the last one may be revised
+        first = start - (len(state.days) - 1)
+        if first < 0 or not np.array_equal(panel.days[first:start], state.days[:-1]):
+            return None
+        if not np.array_equal(panel['Close'][first:start], state.closes[:-1], equal_nan=True):
+            return None
+        return len(panel.days) - start
+
+    def matrix(self, panel, window):
+        """float32 symbols x symbols correlation of the last `window` daily returns of `panel`"""
+        with self._lock, perf.span('correlation.matrix', window=window) as span:
+            span.rows = len(panel.symbols)
+            if len(panel.days) == 0:
+                return np.empty((len(panel.symbols),) * 2, dtype=np.float32)
+            state = self._states.get(window)
+            rows = self._new_rows(state, panel, window)
+            if rows is None:
+                returns = log_returns(panel['Close'], window)
+                state = _WindowState(RollingCorrelation(window).fit(returns))
+                self.refits += 1
+            else:
+                returns = log_returns(panel['Close'], rows)
+                # The first row revises the bar seen last time, if it changed
+                if not np.array_equal(returns[0], state.last_returns, equal_nan=True):
+                    state.rolling.update(returns[0], replace=True)
+                    self.updates += 1
+                for row in returns[1:]:
+                    state.rolling.update(row)
+                    self.updates += 1
+            state.symbols, state.last_day = panel.symbols, panel.days[-1]
+            state.last_returns = returns[-1].copy()
+            state.days = panel.days[-(window + 1):].copy()
+            state.closes = np.array(panel['Close'][-(window + 1):])
+            self._states[window] = state
+            return state.rolling.matrix()
+
+    def clustering(self, panel, window, n_clusters=12):
+        """Clustering of the current matrix for `window`"""
+        matrix = self.matrix(panel, window)
+        with self._lock:
+            cached = self._clusterings.get((window, n_clusters))
+            if cached is not None and cached[0] is matrix:
+                return cached[1]
+        with perf.span('correlation.cluster', window=window):
+            clustering = Clustering(matrix, panel.symbols, n_clusters)
+        with self._lock:
+            self._clusterings[(window, n_clusters)] = (matrix, clustering)
+        return clustering
+
+    def stats(self):
+        return {'refits': self.refits, 'updates': self.updates}
+
+
+correlation_cache = CorrelationCache()
+perf.registry.register_collector('correlation', correlation_cache.stats)
@@ -1,119 +1,329 @@
-import yfinance as yf
+import os
+import time
+import logging
+import threading
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import streamlit as st
+from datetime import datetime
+from data_providers import YFinanceProvider
+from ohlcv_store import OHLCVStore, slice_period
+from fetch_scheduler import FetchScheduler, FetchStats
+from metrics import PricePanel, compute_history_metrics
+from technical_analysis import calculate_indicator_screen
+from symbol_search import SymbolIndex
+from resampling import INTERVALS, ResampleCache
+import perf
+
+logger = logging.getLogger(__name__)
+
+# Column layout of the table returned by get_stock_data
+STOCK_COLUMNS = [
+    'Symbol', 'Name', 'Current Price', 'Price Change %',
+    '52W High', '52W Low', 'From 52W High %', 'From 52W Low %',
+    '1y_return', '2y_return', '5y_return'
+]
+
+# One-minute history a symbol starts with (the most yfinance serves) and
+# how often it is topped up; every intraday interval is resampled from it
+INTRADAY_PERIOD = '7d'
+INTRADAY_REFRESH_SECONDS = 60
+
+# Columns of that table that change when only the quotes change
+QUOTE_COLUMNS = ['Current Price', 'Price Change %', 'From 52W High %', 'From 52W Low %']
 
 class StockDataHandler:
-    def __init__(self):
-        self.nifty500_symbols = self._load_nifty500_symbols()
+    """Market data for the Nifty 500 universe, independent of any UI.
+
+    Notices go to the `data_handler` logger and, when given, to
+    `on_event(level, message)`; the latest warning or error is kept in
+    `last_error` until the next successful load. The `get_*` methods
+    memoize their results for a TTL.
+
+    A `read_only` handler has no provider: it only reads the daily and
+    1-minute stores, which another process (snapshot_publisher.py) keeps
+    current.
+    """
+
+    def __init__(self, provider=None, store=None, scheduler=None, symbols=None, on_event=None, read_only=False):
+        self.on_event = on_event
+        self.last_error = None
+        self.read_only = read_only
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        if read_only:
+            self.scheduler = None
+            self.provider = None
+        else:
+            self.scheduler = scheduler or FetchScheduler(max_workers=8, rate=5.0)
+            self.provider = provider or YFinanceProvider(scheduler=self.scheduler)
+        self.store = store or OHLCVStore()
+        # Files written by another process would go stale in a frame cache
+        self.intraday_store = OHLCVStore(os.path.join(self.store.root, 'intraday'), interval='1m',
+                                         cache_frames=not read_only)
+        self.resampler = ResampleCache()
+        self._intraday_updated = {}
+        # `symbols` (Symbol and Name columns) replaces the Nifty 500 list, e.g. for benchmarks
+        self.nifty500_symbols = symbols if symbols is not None else self._load_nifty500_symbols()
+        self.symbol_index = SymbolIndex.from_frame(self.nifty500_symbols)
+        # Requests and failed symbols of the latest history and quote refreshes
+        self.history_stats = FetchStats()
+        self.quote_stats = FetchStats()
+        perf.registry.register_collector('fetch', lambda: self.history_stats.summary())
+        perf.registry.register_collector('quote_fetch', lambda: self.quote_stats.summary())
         self.last_update_time = None
 
-    @st.cache_data(ttl=3600)
-    def _load_nifty500_symbols(_self):  # Changed 'self' to '_self' for caching
+    def _notify(self, level, message):
+        """Log a notice and pass it on to the on_event listener"""
+        logger.log(level, message)
+        if level >= logging.WARNING:
+            self.last_error = message
+        if self.on_event is not None:
+            self.on_event(level, message)
+
+    def _cached(self, name, ttl, load):
+        """Result of `load()`, reused for `ttl` seconds or until clear_cache"""
+        with self._cache_lock:
+            entry = self._cache.get(name)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        value = load()
+        with self._cache_lock:
+            self._cache[name] = (time.monotonic(), value)
+        return value
+
+    def _load_nifty500_symbols(self):
         # Load Nifty 500 symbols from CSV
         try:
             df = pd.read_csv('nifty500_symbols.csv')
-            st.write(f"Loaded {len(df)} stocks from CSV")  # Debug info
+            self._notify(logging.INFO, f"Loaded {len(df)} stocks from CSV")
             return df
         except Exception as e:
-            st.error(f"Error loading CSV: {str(e)}")
+            self._notify(logging.ERROR, f"Error loading CSV: {str(e)}")
             # Fallback to a smaller list if file not found
             return pd.DataFrame({
                 'Symbol': ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS'],
                 'Name': ['Reliance Industries', 'Tata Consultancy Services', 'HDFC Bank']
             })
 
+    def _require_provider(self):
+        if self.read_only:
+            raise RuntimeError("Read-only data handler: prices are published by snapshot_publisher.py")
+
+    def search_symbols(self, query, limit=None):
+        """Every symbol whose ticker or company name matches the query, best match first"""
+        return self.symbol_index.search(query, limit)
+
     def get_real_time_price(self, symbol):
         """Get real-time price for a single symbol"""
         try:
-            ticker = yf.Ticker(symbol)
-            live_data = ticker.history(period='1d', interval='1m')
-            if len(live_data) > 0:
-                return live_data['Close'].iloc[-1]
-            return None
+            self._require_provider()
+            return self.provider.get_quotes([symbol]).get(symbol)
         except Exception as e:
-            st.warning(f"Error fetching price for {symbol}: {str(e)}")
+            self._notify(logging.WARNING, f"Error fetching price for {symbol}: {str(e)}")
             return None
 
-    @st.cache_data(ttl=60)  # Cache for 1 minute
-    def get_stock_data(_self, period='1y', include_live_prices=True):
+    def load_quotes(self):
+        """Fetch the latest price of every symbol, uncached"""
+        self._require_provider()
+        with perf.span('handler.load_quotes') as span:
+            stats = FetchStats()
+            quotes = self.provider.get_quotes(self.nifty500_symbols['Symbol'], stats=stats)
+            self.quote_stats = stats
+            span.rows = len(quotes)
+        self.last_update_time = datetime.now()
+        self.last_error = None
+        return pd.Series(quotes, name='Current Price', dtype=float)
+
+    def load_price_panel(self):
+        """Update the local store and build the universe price panel, uncached"""
+        self._require_provider()
+        # Only bars newer than the local store are downloaded, in batches
+        self._notify(logging.INFO, "Fetching stock data...")
+        with perf.span('handler.update_store') as span:
+            stats = FetchStats()
+            histories = self.store.update(self.provider, self.nifty500_symbols['Symbol'], period='5y', stats=stats)
+            self.history_stats = stats
+            span.rows = len(histories)
+        self.last_update_time = datetime.now()
+        self.last_error = None
+        with perf.span('handler.build_panel') as span:
+            panel = PricePanel.from_histories(histories)
+            span.rows = len(panel.symbols)
+        return panel
+
+    def history_metrics(self, panel):
+        """Per-symbol metrics of a price panel, joined with stock names"""
+        # One vectorized pass over the dates x symbols panel
+        with perf.span('handler.history_metrics') as span:
+            metrics = compute_history_metrics(panel)
+            span.rows = len(metrics)
+        return self.nifty500_symbols[['Symbol', 'Name']].merge(metrics, on='Symbol', how='inner')
+
+    def indicator_screen(self, panel):
+        """Latest indicator values and signal flags of a price panel, joined with stock names"""
+        with perf.span('handler.indicator_screen') as span:
+            screen = calculate_indicator_screen(panel)
+            span.rows = len(screen)
+        return self.nifty500_symbols[['Symbol', 'Name']].drop_duplicates('Symbol').merge(
+            screen, on='Symbol', how='inner'
+        )
+
+    def apply_quotes(self, metrics, quotes=None):
+        """Build the stock table from history metrics and an optional quote snapshot"""
+        df = metrics.copy()
+        if len(df) == 0:
+            return df
+        perf.count('handler.apply_quotes_rows_total', len(df))
+
+        historical_price = df['Last Close']
+        current_price = historical_price
+        if quotes is not None:
+            current_price = df['Symbol'].map(quotes).fillna(historical_price)
+
+        # Calculate price change and 52-week metrics
+        df['Current Price'] = current_price
+        df['Price Change %'] = ((current_price - historical_price) / historical_price) * 100
+        df['From 52W High %'] = ((df['52W High'] - current_price) / df['52W High']) * 100  # How far below 52w high
+        df['From 52W Low %'] = ((current_price - df['52W Low']) / df['52W Low']) * 100  # How far above 52w low
+        return df[STOCK_COLUMNS]
+
+    def apply_quote_deltas(self, metrics, table, prices):
+        """Stock table with new prices for some symbols.
+
+        Only the quote columns of the rows in `prices` are recomputed; `table`
+        must have been built from `metrics` by apply_quotes.
+        """
+        rows = pd.Series(np.arange(len(metrics)), index=metrics['Symbol'].to_numpy())
+        rows = rows[~rows.index.duplicated()]
+        symbols = [symbol for symbol in prices if symbol in rows.index]
+        if not symbols:
+            return table
+        positions = rows[symbols].to_numpy()
+        current_price = np.array([prices[symbol] for symbol in symbols], dtype=float)
+        historical_price = metrics['Last Close'].to_numpy()[positions]
+        high = metrics['52W High'].to_numpy()[positions]
+        low = metrics['52W Low'].to_numpy()[positions]
+
+        df = table.copy(deep=False)
+        for column, values in (
+            ('Current Price', current_price),
+            ('Price Change %', (current_price - historical_price) / historical_price * 100),
+            ('From 52W High %', (high - current_price) / high * 100),
+            ('From 52W Low %', (current_price - low) / low * 100)
+        ):
+            updated = table[column].to_numpy(dtype=float).copy()
+            updated[positions] = values
+            df[column] = updated
+        return df
+
+    def get_quote_snapshot(self):
+        """Latest price for the whole universe, fetched in batched requests"""
+        # Live prices go stale quickly, keep this TTL short
+        return self._cached('quotes', 15, self._load_quote_snapshot)
+
+    def _load_quote_snapshot(self):
+        try:
+            return self.load_quotes()
+        except Exception as e:
+            self._notify(logging.WARNING, f"Error fetching live prices: {str(e)}")
+            return pd.Series(name='Current Price', dtype=float)
+
+    def get_price_panel(self):
+        """Dates x symbols Close/High/Low panel of the whole universe"""
+        # Daily bars change at most once per session
+        return self._cached('panel', 3600, self.load_price_panel)
+
+    def get_history_metrics(self):
+        """Per-symbol metrics derived from daily history, without live prices"""
+        return self._cached('history_metrics', 3600, self._load_history_metrics)
+
+    def _load_history_metrics(self):
         try:
-            st.info("Fetching stock data...")  # Debug info
-            stocks_data = []
-
-            for _, row in _self.nifty500_symbols.iterrows():
-                try:
-                    ticker = yf.Ticker(row['Symbol'])
-                    hist = ticker.history(period='5y')
-
-                    if len(hist) == 0:
-                        continue
-
-                    # Get historical data
-                    historical_price = hist['Close'][-1]
-                    high_52w = hist['High'][-252:].max() if len(hist) >= 252 else historical_price
-                    low_52w = hist['Low'][-252:].min() if len(hist) >= 252 else historical_price
-
-                    # Get real-time price if requested
-                    current_price = _self.get_real_time_price(row['Symbol']) if include_live_prices else historical_price
-                    if current_price is None:
-                        current_price = historical_price
-
-                    # Calculate price change and 52-week metrics
-                    price_change = ((current_price - historical_price) / historical_price) * 100
-                    pct_from_high = ((high_52w - current_price) / high_52w) * 100  # How far below 52w high
-                    pct_from_low = ((current_price - low_52w) / low_52w) * 100  # How far above 52w low
-
-                    returns = {
-                        '1y_return': (hist['Close'][-1] / hist['Close'][-252] - 1) if len(hist) >= 252 else np.nan,
-                        '2y_return': (hist['Close'][-1] / hist['Close'][-504] - 1) if len(hist) >= 504 else np.nan,
-                        '5y_return': (hist['Close'][-1] / hist['Close'][0] - 1) if len(hist) >= 1260 else np.nan
-                    }
-
-                    stocks_data.append({
-                        'Symbol': row['Symbol'],
-                        'Name': row['Name'],
-                        'Current Price': current_price,
-                        'Price Change %': price_change,
-                        '52W High': high_52w,
-                        '52W Low': low_52w,
-                        'From 52W High %': pct_from_high,
-                        'From 52W Low %': pct_from_low,
-                        **returns
-                    })
-
-                except Exception as e:
-                    st.warning(f"Error processing {row['Symbol']}: {str(e)}")
-                    continue
-
-            _self.last_update_time = datetime.now()
-            df = pd.DataFrame(stocks_data)
-            st.write(f"Processed {len(df)} stocks successfully")  # Debug info
+            df = self.history_metrics(self.get_price_panel())
+            self._notify(logging.INFO, f"Processed {len(df)} stocks successfully")
             return df
 
         except Exception as e:
-            st.error(f"Error in get_stock_data: {str(e)}")
+            self._notify(logging.ERROR, f"Error in get_history_metrics: {str(e)}")
             return pd.DataFrame()  # Return empty DataFrame on error
 
-    def filter_near_52week_high(self, df, threshold=0.95):
-        return df[df['Current Price'] >= df['52W High'] * threshold]
+    def get_indicator_screen(self):
+        """Latest RSI/MACD/MA/Bollinger values and signal flags for every stock"""
+        return self._cached('indicator_screen', 3600, self._load_indicator_screen)
+
+    def _load_indicator_screen(self):
+        try:
+            return self.indicator_screen(self.get_price_panel())
+        except Exception as e:
+            self._notify(logging.ERROR, f"Error in get_indicator_screen: {str(e)}")
+            return pd.DataFrame()
+
+    def get_stock_data(self, period='1y', include_live_prices=True):
+        """Combine cached history metrics with the current quote snapshot.
+
+        Only the quote snapshot is refetched on its short TTL; the history
+        metrics stay cached, so a price refresh is a single batched call plus
+        a few column operations.
+        """
+        quotes = self.get_quote_snapshot() if include_live_prices else None
+        return self.apply_quotes(self.get_history_metrics(), quotes)
+
+    def update_intraday(self, symbols=None):
+        """Top up the 1-minute store of `symbols` (default: the whole universe)"""
+        self._require_provider()
+        symbols = list(self.nifty500_symbols['Symbol'] if symbols is None else symbols)
+        with perf.span('handler.update_intraday') as span:
+            histories = self.intraday_store.update(self.provider, symbols, period=INTRADAY_PERIOD)
+            span.rows = len(histories)
+        now = time.monotonic()
+        for symbol in symbols:
+            self._intraday_updated[symbol] = now
+        return histories
+
+    def _intraday_bars(self, symbol):
+        if self.read_only:
+            return self.intraday_store.load(symbol)
+        # One top-up of the 1-minute store serves every intraday interval
+        now = time.monotonic()
+        if now - self._intraday_updated.get(symbol, -INTRADAY_REFRESH_SECONDS) >= INTRADAY_REFRESH_SECONDS:
+            self.intraday_store.update(self.provider, [symbol], period=INTRADAY_PERIOD)
+            self._intraday_updated[symbol] = now
+        return self.intraday_store.load(symbol)
+
+    def load_bars(self, symbol, interval='1d', panel=None):
+        """Bars of a symbol at any interval in resampling.INTERVALS.
 
-    def filter_near_52week_low(self, df, threshold=1.05):
-        return df[df['Current Price'] <= df['52W Low'] * threshold]
+        Daily and weekly bars are read from `panel` (the published PricePanel)
+        without copying, or from the daily store for symbols it lacks;
+        intraday bars come from the 1-minute store. Coarser bars are resampled
+        incrementally, so switching intervals fetches nothing.
+        """
+        base, _ = INTERVALS[interval]
+        if base == '1d':
+            if panel is not None and symbol in panel:
+                source = panel.history(symbol)
+            else:
+                source = self.store.load(symbol)
+                if len(source) == 0 and not self.read_only:
+                    source = self.store.update(self.provider, [symbol], period='5y').get(symbol, pd.DataFrame())
+        else:
+            source = self._intraday_bars(symbol)
+        return self.resampler.resample(symbol, interval, source)
 
-    @st.cache_data(ttl=60)  # Cache for 1 minute
-    def get_detailed_stock_data(_self, symbol, period='1y'):
+    def get_detailed_stock_data(self, symbol, period='1y', interval='1d', panel=None):
+        # Not memoized: the bars are already shared views or cached resamples
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period)
-            return hist
+            bars = slice_period(self.load_bars(symbol, interval, panel), period)
+            self.last_error = None
+            return bars
         except Exception as e:
-            st.error(f"Error getting detailed data for {symbol}: {str(e)}")
+            self._notify(logging.ERROR, f"Error getting detailed data for {symbol}: {str(e)}")
             return pd.DataFrame()
 
     def clear_cache(self):
-        st.cache_data.clear()
+        with self._cache_lock:
+            self._cache.clear()
+        self.last_error = None
 
     def get_last_update_time(self):
         return self.last_update_time
\ No newline at end of file
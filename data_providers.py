@@ -0,0 +1,331 @@
+import zlib
+import time
+import random
+import threading
+import numpy as np
+import pandas as pd
+import yfinance as yf
+import perf
+from fetch_scheduler import FetchStats
+from resampling import INTERVALS, SESSION_OPEN, resample_bars
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# One-minute bars in an NSE session, 09:15 to 15:30
+INTRADAY_BARS_PER_DAY = 375
+
+# yf.download collects results in module-global state, so only one call may run at a time
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+
+class MissingSymbols(Exception):
+    """A batch request returned no data for some of its symbols"""
+
+
+class DataProvider:
+    """Base interface for market data sources.
+
+    Subclasses implement `download`, which fetches bars (daily unless another
+    `interval` is given) for a batch of symbols in a single request, and `download_quotes`, which fetches their
+    latest prices. `get_history` and `get_quotes` split any number of symbols
+    into batches of `batch_size` and merge the per-symbol results. When a
+    `scheduler` (see fetch_scheduler.FetchScheduler) is set, batches are
+    fetched concurrently with its rate limiting and retries; a batch that
+    comes back without some of its symbols counts as failed and only those
+    symbols are requested again. Requests and missing symbols are recorded
+    into `stats` (a FetchStats) when one is passed.
+    """
+    batch_size = 100
+    scheduler = None
+
+    def download(self, symbols, period='5y', start=None, interval='1d'):
+        """Download bars for a batch of symbols, returns {symbol: DataFrame}"""
+        raise NotImplementedError
+
+    def download_quotes(self, symbols):
+        """Fetch the latest traded price for a batch of symbols, returns {symbol: price}"""
+        raise NotImplementedError
+
+    def _run_batches(self, fetch, symbols, kind='history', stats=None):
+        batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        if perf.registry.enabled:
+            fetch = _timed_fetch(fetch, kind)
+        stats = FetchStats() if stats is None else stats
+        merged = {}
+        if self.scheduler is None:
+            for batch in batches:
+                merged.update(fetch(batch))
+        else:
+            # Symbols received so far per batch; a retry asks only for the rest
+            received = {tuple(batch): {} for batch in batches}
+
+            def fetch_batch(batch):
+                got = received[tuple(batch)]
+                got.update(fetch([symbol for symbol in batch if symbol not in got]))
+                missing = [symbol for symbol in batch if symbol not in got]
+                if missing:
+                    raise MissingSymbols(f"No data for {len(missing)} of {len(batch)} symbols, e.g. {missing[0]}")
+                return got
+
+            self.scheduler.map(
+                fetch_batch,
+                batches,
+                label=lambda batch: f"{batch[0]}..{batch[-1]}" if len(batch) > 1 else batch[0],
+                stats=stats
+            )
+            for got in received.values():
+                merged.update(got)
+        stats.record_symbols(len(symbols), [symbol for symbol in symbols if symbol not in merged])
+        return merged
+
+    def get_history(self, symbols, period='5y', start=None, interval='1d', stats=None):
+        """Fetch bars for many symbols, batch_size symbols per request"""
+        return self._run_batches(
+            lambda batch: self.download(batch, period=period, start=start, interval=interval),
+            list(symbols),
+            stats=stats
+        )
+
+    def get_quotes(self, symbols, stats=None):
+        """Fetch latest prices for many symbols, batch_size symbols per request"""
+        return self._run_batches(self.download_quotes, list(symbols), kind='quotes', stats=stats)
+
+
+def _timed_fetch(fetch, kind):
+    """Wrap a batch fetch to record request latency, per-symbol latency and errors"""
+    def timed(batch):
+        start = time.perf_counter()
+        try:
+            return fetch(batch)
+        except Exception:
+            perf.count('fetch_errors_total', kind=kind)
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            perf.observe('fetch_request_seconds', seconds, kind=kind)
+            # Latency amortized over the symbols of the batch, one observation per symbol
+            perf.observe('fetch_symbol_seconds', seconds / max(len(batch), 1), count=len(batch), kind=kind)
+    return timed
+
+
+def split_download(frame, symbols):
+    """Split a multi-ticker download into one OHLCV frame per symbol"""
+    histories = {}
+    if frame is None or frame.empty:
+        return histories
+
+    for symbol in symbols:
+        if isinstance(frame.columns, pd.MultiIndex):
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+            hist = frame[symbol]
+        elif len(symbols) == 1:
+            hist = frame
+        else:
+            continue
+
+        hist = hist[[col for col in OHLCV_COLUMNS if col in hist.columns]]
+        # Rows are aligned across tickers, so drop dates this symbol did not trade
+        hist = hist.dropna(how='all')
+        # A ticker yfinance failed on comes back without closes; leave it out
+        if 'Close' in hist.columns and hist['Close'].notna().any():
+            histories[symbol] = hist
+    return histories
+
+
+class YFinanceProvider(DataProvider):
+    """Yahoo Finance provider using yf.download for multi-ticker requests.
+
+    yf.download keeps its results in module-global state, so calls are
+    serialized; with `threads` it still fetches the tickers of one batch in
+    parallel. It does not raise for tickers it failed on, which instead are
+    missing from the result and retried by the scheduler.
+    """
+
+    def __init__(self, batch_size=100, threads=True, scheduler=None):
+        self.batch_size = batch_size
+        self.threads = threads
+        self.scheduler = scheduler
+
+    def download(self, symbols, period='5y', start=None, interval='1d'):
+        with _YF_DOWNLOAD_LOCK:
+            frame = yf.download(
+                tickers=list(symbols),
+                period=None if start is not None else period,
+                start=start,
+                interval=interval,
+                group_by='ticker',
+                auto_adjust=True,
+                actions=False,
+                threads=self.threads,
+                progress=False
+            )
+        return split_download(frame, symbols)
+
+    def download_quotes(self, symbols):
+        # One intraday request for the whole batch; the last 1-minute close
+        # of each ticker is its current price
+        with _YF_DOWNLOAD_LOCK:
+            frame = yf.download(
+                tickers=list(symbols),
+                period='1d',
+                interval='1m',
+                group_by='ticker',
+                auto_adjust=True,
+                actions=False,
+                threads=self.threads,
+                progress=False
+            )
+        closes = {symbol: hist['Close'].dropna() for symbol, hist in split_download(frame, symbols).items()}
+        return {symbol: float(close.iloc[-1]) for symbol, close in closes.items() if len(close) > 0}
+
+
+class FakeDataProvider(DataProvider):
+    """In-process provider generating deterministic synthetic bars.
+
+    Each symbol gets a random walk seeded from its name, starting at a fixed
+    origin date, so repeated or incremental requests always see the same
+    history. `calls` records every batch request for inspection.
+
+    `latency` (seconds per request) and `error_rate` (probability that a
+    request raises ConnectionError) simulate a slow, flaky upstream.
+    """
+
+    def __init__(self, end=None, origin='2015-01-01', batch_size=100,
+                 latency=0.0, error_rate=0.0, seed=0, scheduler=None):
+        self.end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+        self.origin = pd.Timestamp(origin)
+        self.batch_size = batch_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.scheduler = scheduler
+        self.calls = []
+        self._cache = {}
+        self._dates = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate_network(self):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise ConnectionError("Injected provider failure")
+
+    def _business_days(self):
+        if self.end not in self._dates:
+            self._dates[self.end] = pd.bdate_range(self.origin, self.end)
+        return self._dates[self.end]
+
+    def _full_history(self, symbol):
+        key = (symbol, self.end)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is None:
+            dates = self._business_days()
+            rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+            n = len(dates)
+            start_price = rng.uniform(50, 5000)
+            close = start_price * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n)))
+            open_ = close * (1 + rng.normal(0, 0.005, n))
+            high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n))
+            low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n))
+            volume = rng.integers(10_000, 5_000_000, n)
+            cached = pd.DataFrame({
+                'Open': open_,
+                'High': high,
+                'Low': low,
+                'Close': close,
+                'Volume': volume
+            }, index=dates)
+            with self._lock:
+                self._cache[key] = cached
+        return cached
+
+    def _intraday_day(self, symbol, day):
+        """One-minute bars of a session that open and close with its daily bar"""
+        key = (symbol, day, '1m')
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is None:
+            bar = self._full_history(symbol).loc[day]
+            rng = np.random.default_rng(zlib.crc32(f"{symbol}{day:%Y%m%d}".encode()))
+            n = INTRADAY_BARS_PER_DAY
+            walk = np.cumsum(rng.normal(0, 0.0008, n))
+            bridge = walk - np.linspace(walk[0], walk[-1], n)
+            close = bar['Open'] * (bar['Close'] / bar['Open']) ** np.linspace(1 / n, 1, n) * np.exp(bridge)
+            open_ = np.concatenate([[bar['Open']], close[:-1]])
+            cached = pd.DataFrame({
+                'Open': open_,
+                'High': np.maximum(open_, close) * (1 + rng.uniform(0, 0.0005, n)),
+                'Low': np.minimum(open_, close) * (1 - rng.uniform(0, 0.0005, n)),
+                'Close': close,
+                'Volume': (rng.dirichlet(np.ones(n)) * bar['Volume']).astype(np.int64)
+            }, index=pd.date_range(day + SESSION_OPEN, periods=n, freq='1min'))
+            with self._lock:
+                self._cache[key] = cached
+        return cached
+
+    def _history(self, symbol, interval, first_day):
+        base, rule = INTERVALS[interval]
+        if base == '1d':
+            hist = self._full_history(symbol)
+        else:
+            days = self._business_days()
+            hist = pd.concat([self._intraday_day(symbol, day) for day in days[days >= first_day]])
+        return resample_bars(hist, rule) if rule else hist
+
+    def download(self, symbols, period='5y', start=None, interval='1d'):
+        with self._lock:
+            self.calls.append((list(symbols), period, start) if interval == '1d' else
+                              (list(symbols), period, start, interval))
+        self._simulate_network()
+        if start is not None:
+            first_day = pd.Timestamp(start).normalize()
+        elif period != 'max':
+            first_day = self.end - period_to_offset(period) + pd.Timedelta(days=1)
+        else:
+            first_day = self.origin
+        histories = {}
+        for symbol in symbols:
+            hist = self._history(symbol, interval, first_day)
+            if start is not None:
+                hist = hist[hist.index >= pd.Timestamp(start)]
+            elif period != 'max':
+                hist = hist[hist.index > self.end - period_to_offset(period)]
+            histories[symbol] = hist.copy()
+        return histories
+
+    def download_quotes(self, symbols):
+        with self._lock:
+            self.calls.append((list(symbols), 'quote', None))
+        self._simulate_network()
+        quotes = {}
+        for symbol in symbols:
+            with self._lock:
+                drift = self._random.gauss(0, 0.005)
+            quotes[symbol] = float(self._full_history(symbol)['Close'].iloc[-1] * (1 + drift))
+        return quotes
+
+
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '7d': pd.DateOffset(days=7),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+
+def period_to_offset(period):
+    """Convert a yfinance-style period string such as '6mo' to a DateOffset"""
+    try:
+        return PERIOD_OFFSETS[period]
+    except KeyError:
+        raise ValueError(f"Unsupported period: {period}")
@@ -0,0 +1,215 @@
+import time
+import uuid
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from data_handler import QUOTE_COLUMNS
+from screener import Screener, screen_table
+import perf
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+                leader = True
+                self.executions += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = fn()
+            except Exception as e:
+                call['error'] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call['done'].set()
+
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable view of the market data published by DataService.
+
+    Sessions share the same objects, so nothing reachable from a snapshot
+    may be modified in place; filtering returns new frames. Versions count
+    from 1 in every DataService, so caches that outlive one key on
+    (origin, version).
+    """
+    origin: str = ''
+    version: int = 0
+    history_version: int = 0
+    prices_version: int = 0
+    panel: object = None
+    history_metrics: object = None
+    indicator_screen: object = None
+    quotes: object = None
+    stock_table: object = None
+    screener: object = None
+    history_updated: float = 0.0
+    prices_updated: float = 0.0
+    prices_at: datetime = None
+    updated_at: datetime = None
+
+
+class DataService:
+    """Process-wide owner of the market snapshot, shared by every session.
+
+    Refreshes are demand driven: sessions call `request_refresh` with the
+    staleness they tolerate, and a stale part is reloaded once on a
+    background thread no matter how many sessions ask for it. Each reload
+    publishes a new Snapshot by swapping a single reference, so readers
+    always see a consistent version without locking.
+    """
+
+    def __init__(self, data_handler, history_interval=3600):
+        self.data_handler = data_handler
+        self.history_interval = history_interval
+        self.last_error = None
+        self._snapshot = Snapshot(origin=uuid.uuid4().hex)
+        self._publish_lock = threading.RLock()
+        self._flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='data-service')
+        perf.registry.register_collector('data_service', self.stats)
+
+    def snapshot(self):
+        """Current snapshot, loading it synchronously if nothing is published yet"""
+        if self._snapshot.history_version == 0:
+            self.refresh_history()
+        if self._snapshot.prices_version == 0:
+            self.refresh_prices()
+        return self._snapshot
+
+    def _publish(self, stock_table=None, history=False, prices=False, **changes):
+        """Swap in a new snapshot; `history`/`prices` mark which parts were reloaded"""
+        with self._publish_lock, perf.span('service.publish'):
+            current = self._snapshot
+            # Versions are bumped under the lock so concurrent reloads never reuse one
+            if history:
+                changes.update(history_version=current.history_version + 1, history_updated=time.monotonic())
+            if prices:
+                changes.update(prices_version=current.prices_version + 1, prices_updated=time.monotonic(),
+                               prices_at=datetime.now().astimezone())
+            snapshot = replace(current, version=current.version + 1, updated_at=datetime.now(), **changes)
+            if snapshot.history_metrics is not None:
+                if stock_table is None:
+                    stock_table = self.data_handler.apply_quotes(snapshot.history_metrics, snapshot.quotes)
+                table = screen_table(stock_table, snapshot.indicator_screen)
+                # A quote refresh keeps the screener indexes of the history columns
+                if current.screener is not None and 'panel' not in changes:
+                    screener = current.screener.update(table, QUOTE_COLUMNS)
+                else:
+                    screener = Screener(table)
+                snapshot = replace(snapshot, stock_table=stock_table, screener=screener)
+            self._snapshot = snapshot
+        return snapshot
+
+    def _load_history(self):
+        panel = self.data_handler.load_price_panel()
+        return self._publish(
+            panel=panel,
+            history_metrics=self.data_handler.history_metrics(panel),
+            indicator_screen=self.data_handler.indicator_screen(panel),
+            history=True
+        )
+
+    def _load_prices(self):
+        # Held across the download, so a slow poll cannot publish over ticks streamed meanwhile
+        with self._publish_lock:
+            return self._publish(
+                quotes=self.data_handler.load_quotes(),
+                prices=True
+            )
+
+    def refresh_history(self):
+        """Reload history now, joining a reload that is already running"""
+        with perf.span('service.refresh', part='history'):
+            return self._flight.do('history', self._load_history)
+
+    def refresh_prices(self):
+        """Reload the quote snapshot now, joining a reload that is already running"""
+        with perf.span('service.refresh', part='prices'):
+            return self._flight.do('prices', self._load_prices)
+
+    def apply_ticks(self, prices):
+        """Publish streamed prices ({symbol: price}) without touching history.
+
+        Only the quote columns of the ticked symbols are recomputed. Streamed
+        prices count as a price refresh, so polling stays idle while a feed
+        keeps them current.
+        """
+        with self._publish_lock:
+            current = self._snapshot
+            if current.history_metrics is None or not prices:
+                return current
+            quotes = pd.Series(prices, dtype=float, name='Current Price')
+            if current.quotes is not None:
+                quotes = quotes.combine_first(current.quotes).rename('Current Price')
+            return self._publish(
+                stock_table=self.data_handler.apply_quote_deltas(current.history_metrics, current.stock_table, prices),
+                quotes=quotes,
+                prices=True
+            )
+
+    def _refresh_in_background(self, key, refresh):
+        def run():
+            try:
+                refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"Error refreshing {key}: {str(e)}"
+
+        if not self._flight.in_flight(key):
+            self._executor.submit(run)
+
+    def request_refresh(self, max_price_age, max_history_age=None):
+        """Start background reloads of whatever is older than the given ages (seconds)"""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if max_history_age is None:
+            max_history_age = self.history_interval
+        if now - snapshot.history_updated >= max_history_age:
+            self._refresh_in_background('history', self.refresh_history)
+        if now - snapshot.prices_updated >= max_price_age:
+            self._refresh_in_background('prices', self.refresh_prices)
+
+    def stats(self):
+        return {
+            'version': self._snapshot.version,
+            'history_version': self._snapshot.history_version,
+            'prices_version': self._snapshot.prices_version,
+            'refreshes': self._flight.executions,
+            'coalesced': self._flight.coalesced,
+            'panel_bytes': self._snapshot.panel.nbytes if self._snapshot.panel is not None else 0
+        }
@@ -0,0 +1,115 @@
+import sys
+import zlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from technical_analysis import calculate_all_indicators
+import perf
+
+
+def estimate_nbytes(value):
+    """Approximate memory held by a cached value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def close_checksum(data, end=None):
+    """CRC32 of the closes (up to row `end`); changes when earlier history is re-adjusted"""
+    closes = np.ascontiguousarray(data['Close'].to_numpy()[:end])
+    return zlib.crc32(closes.tobytes())
+
+
+def last_bar_key(data):
+    """Identity of a history: its newest timestamp and close, the bar count and a close checksum.
+
+    The close is included because a live refresh rewrites the current bar
+    in place without changing its timestamp; the checksum because a split
+    or dividend re-adjusts earlier bars without touching the newest one.
+    """
+    if len(data) == 0:
+        return None
+    return (data.index[-1], float(data['Close'].iloc[-1]), len(data), close_checksum(data))
+
+
+class DerivedCache:
+    """Thread-safe LRU cache for derived series with an entry and byte budget.
+
+    Entries are keyed by (kind, symbol, period, last bar, parameters); when
+    either budget is exceeded the least recently used entries are evicted.
+    `sizeof` measures an entry for the byte budget.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, sizeof=estimate_nbytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def indicators(self, symbol, period, data, **params):
+        """Memoized calculate_all_indicators(data)"""
+        key = ('indicators', symbol, period, last_bar_key(data), tuple(sorted(params.items())))
+        return self.get_or_compute(key, lambda: calculate_all_indicators(data, **params))
+
+    def cumulative_returns(self, symbol, period, data):
+        """Memoized cumulative % return of the Close series"""
+        key = ('returns', symbol, period, last_bar_key(data))
+        return self.get_or_compute(key, lambda: (data['Close'] / data['Close'].iloc[0] - 1) * 100)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+# Shared by every session in the process
+derived_cache = DerivedCache()
+perf.registry.register_collector('derived_cache', derived_cache.stats)
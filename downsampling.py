@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# Points per trace sent to the browser, whatever the length of the history
+MAX_POINTS_PER_TRACE = 800
+
+
+def visible_slice(data, x_range=None):
+    """Restrict a time-indexed frame or series to the (start, end) range being displayed"""
+    if x_range is None:
+        return data
+    start, end = x_range
+    return data.loc[start:end]
+
+
+def _x_numeric(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(float)
+    return np.asarray(index, dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: positions of the n_out points that best keep the line's shape.
+
+    The first and last points are always kept. Every bucket in between
+    contributes the point forming the largest triangle with the previously
+    chosen point and the mean of the next bucket.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        bucket_x, bucket_y = x[start:end], y[start:end]
+        area = np.abs(
+            (x[previous] - next_x) * (bucket_y - y[previous]) -
+            (x[previous] - bucket_x) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_line(series, n_out=MAX_POINTS_PER_TRACE):
+    """LTTB-downsample a time-indexed series, skipping missing values"""
+    series = series.dropna()
+    if len(series) <= n_out:
+        return series
+    positions = lttb_indices(_x_numeric(series.index), series.to_numpy(dtype=float), n_out)
+    return series.iloc[positions]
+
+
+def aggregate_ohlc(data, n_out=MAX_POINTS_PER_TRACE):
+    """Merge consecutive bars into at most n_out candles (first open, max high, min low, last close)"""
+    if len(data) <= n_out:
+        return data
+
+    starts = np.linspace(0, len(data), n_out, endpoint=False).astype(int)
+    starts = np.unique(starts)
+    ends = np.append(starts[1:], len(data)) - 1
+
+    aggregated = {
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[ends]
+    }
+    if 'Volume' in data:
+        aggregated['Volume'] = np.add.reduceat(data['Volume'].to_numpy(), starts)
+    return pd.DataFrame(aggregated, index=data.index[starts])
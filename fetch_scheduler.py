@@ -0,0 +1,127 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchStats:
+    """Per-item timing, attempt and failure records of one or more scheduler runs.
+
+    Items are requests (a batch of symbols); `record_symbols` additionally
+    counts the symbols requested and those that never arrived.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.attempts = {}
+        self.failures = {}
+        self.symbols = 0
+        self.failed_symbols = set()
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, attempts, error=None):
+        with self._lock:
+            # Runs recorded into the same stats may reuse a label
+            if label in self.timings:
+                label = f"{label}#{len(self.timings)}"
+            self.timings[label] = seconds
+            self.attempts[label] = attempts
+            if error is not None:
+                self.failures[label] = str(error)
+
+    def record_symbols(self, requested, failed=()):
+        with self._lock:
+            self.symbols += requested
+            self.failed_symbols.update(failed)
+
+    def summary(self):
+        """Aggregate counts and latency percentiles (seconds)"""
+        timings = np.array(list(self.timings.values()), dtype=float)
+        return {
+            'items': len(self.timings),
+            'failed': len(self.failures),
+            'symbols': self.symbols,
+            'failed_symbols': len(self.failed_symbols),
+            'retries': sum(self.attempts.values()) - len(self.attempts),
+            'p50': float(np.percentile(timings, 50)) if len(timings) else 0.0,
+            'p95': float(np.percentile(timings, 95)) if len(timings) else 0.0,
+            'max': float(timings.max()) if len(timings) else 0.0
+        }
+
+
+class FetchScheduler:
+    """Run fetch calls on a thread pool with rate limiting and retries.
+
+    Every attempt first takes a token from a shared bucket, so `rate` bounds
+    the request rate across all workers. Failed attempts are retried with
+    full-jitter exponential backoff: a random delay in
+    [0, min(max_delay, base_delay * 2 ** attempt)].
+    """
+
+    def __init__(self, max_workers=8, rate=5.0, burst=None, max_retries=3,
+                 base_delay=0.5, max_delay=8.0, sleep=time.sleep):
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _run_one(self, fn, item, label, stats):
+        start = time.perf_counter()
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                result = fn(item)
+                stats.record(label, time.perf_counter() - start, attempt + 1)
+                return result
+            except Exception as e:
+                error = e
+                if attempt < self.max_retries:
+                    self.sleep(self._backoff(attempt))
+        stats.record(label, time.perf_counter() - start, self.max_retries + 1, error)
+        return None
+
+    def map(self, fn, items, label=str, stats=None):
+        """Apply fn to every item concurrently.
+
+        Returns (results, stats): results in input order, with None for items
+        that still failed after all retries, and the FetchStats the run was
+        recorded into (`stats` if given, so several runs can add up).
+        """
+        items = list(items)
+        stats = FetchStats() if stats is None else stats
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._run_one, fn, item, label(item), stats) for item in items]
+            results = [future.result() for future in futures]
+        return results, stats
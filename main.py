@@ -1,11 +1,25 @@
+import os
+import time
 import streamlit as st
 import pandas as pd
 from data_handler import StockDataHandler
-from visualizations import create_price_chart, create_macd_chart, create_returns_chart
-from technical_analysis import calculate_all_indicators
+from visualizations import cached_price_chart, cached_macd_chart, cached_returns_chart, cached_correlation_heatmap
+from correlation import CORRELATION_WINDOWS, correlation_cache
+from derived_cache import derived_cache
+from resampling import INTERVALS
+from data_service import DataService
+from snapshot_publisher import MappedDataService
+from tick_stream import TickStreamer, make_tick_source, revise_last_bar
+from screener import Between, All, SavedScreens, SCREEN_CONDITIONS, near_52week_high, near_52week_low
+from table_view import TableView, STOCK_TABLE_FORMATS, STOCK_TABLE_SIGNED
 from utils import format_percentage, format_price
-import time
-from datetime import datetime
+import perf
+from datetime import datetime, timedelta
+
+# How often the live sections check the data service for new data (seconds)
+UI_POLL_SECONDS = 2
+# Faster cadence while prices stream in from a tick feed, for sub-second updates
+STREAM_POLL_SECONDS = 0.5
 
 # Page configuration
 st.set_page_config(
@@ -36,9 +50,44 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'data_handler' not in st.session_state:
-    st.session_state.data_handler = StockDataHandler()
+
+@st.cache_resource
+def get_data_service():
+    """One data service per server process, shared by every browser session"""
+    # With SNAPSHOT_DIR set, data comes from a separate snapshot_publisher.py process
+    snapshot_dir = os.environ.get('SNAPSHOT_DIR')
+    if snapshot_dir:
+        return MappedDataService(StockDataHandler(read_only=True), snapshot_dir)
+    return DataService(StockDataHandler())
+
+
+@st.cache_resource
+def get_tick_streamer(_data_service):
+    """With TICK_FEED set, stream live prices into the data service instead of polling them"""
+    tick_feed = os.environ.get('TICK_FEED')
+    if not tick_feed or isinstance(_data_service, MappedDataService):
+        return None
+    return TickStreamer(_data_service, make_tick_source(tick_feed)).start()
+
+
+@st.cache_resource
+def start_perf_exporters():
+    """Expose the perf metrics on PERF_METRICS_PORT and/or in PERF_METRICS_FILE, once per process"""
+    port = os.environ.get('PERF_METRICS_PORT')
+    path = os.environ.get('PERF_METRICS_FILE')
+    if port:
+        perf.serve(int(port))
+    if path:
+        perf.export_to_file(path)
+    return True
+
+
+page_start = time.perf_counter()
+start_perf_exporters()
+data_service = get_data_service()
+data_handler = data_service.data_handler
+tick_streamer = get_tick_streamer(data_service)
+live_poll = STREAM_POLL_SECONDS if tick_streamer else UI_POLL_SECONDS
 
 # Sidebar
 with st.sidebar:
@@ -47,9 +96,24 @@ with st.sidebar:
     # Auto-refresh settings
     st.subheader("Data Updates")
     auto_refresh = st.checkbox('Enable Auto-refresh', value=True)
-    if auto_refresh:
-        time.sleep(60)
-        st.rerun()
+    refresh_interval = st.select_slider(
+        "Price refresh interval",
+        options=[15, 30, 60, 120, 300],
+        value=60,
+        format_func=lambda seconds: f"{seconds}s",
+        disabled=not auto_refresh
+    )
+
+    # Timing spans are process-wide, so collection is set with PERF_METRICS=1; with
+    # PERF_ADMIN=1 the toggle switches it for every session, written only when flipped
+    if os.environ.get('PERF_ADMIN', '') not in ('', '0'):
+        st.subheader("Diagnostics")
+        st.toggle(
+            "Collect performance metrics (all sessions)",
+            value=perf.registry.enabled,
+            key='perf_enabled',
+            on_change=lambda: setattr(perf.registry, 'enabled', st.session_state.perf_enabled)
+        )
 
     # Time period selection
     st.subheader("Time Range")
@@ -77,6 +141,13 @@ with st.sidebar:
         "Select Filter",
         filter_options
     )
+    price_screen = None
+    if price_filter == "Near 52-Week High":
+        proximity = st.slider("Within % of the 52-week high", 1, 25, 5)
+        price_screen = near_52week_high(1 - proximity / 100)
+    elif price_filter == "Near 52-Week Low":
+        proximity = st.slider("Within % of the 52-week low", 1, 25, 5)
+        price_screen = near_52week_low(1 + proximity / 100)
 
 # Main content
 st.title("📈 Indian Stock Market Analysis")
@@ -85,160 +156,422 @@ This advanced tool provides real-time analysis for Nifty 500 stocks with technic
 and comprehensive price analytics.
 """)
 
+def filter_stocks(snapshot, price_screen, search):
+    """Apply the sidebar price screen and the search box to the stock table"""
+    stocks_df = snapshot.stock_table
+    if price_screen is not None:
+        # Screener rows line up with the stock table
+        stocks_df = stocks_df.iloc[snapshot.screener.select(price_screen)]
+
+    if search:
+        # Ranked index lookup; matching rows are returned best match first
+        ranks = {symbol: rank for rank, symbol in enumerate(data_handler.search_symbols(search))}
+        order = stocks_df['Symbol'].map(ranks).dropna().sort_values(kind='stable')
+        stocks_df = stocks_df.loc[order.index]
+    return stocks_df
+
+
+if 'saved_screens' not in st.session_state:
+    st.session_state.saved_screens = SavedScreens()
+
+
+# The live sections below rerun on their own every live_poll seconds, so a
+# price refresh only redraws them and not the charts further down the page
+@st.fragment(run_every=live_poll if auto_refresh else None)
+def render_market_overview(price_screen):
+    # Reloads run in the background and are shared with every other session
+    if auto_refresh:
+        data_service.request_refresh(max_price_age=refresh_interval)
+
+    # New history changes the stock list and charts as well: redraw everything
+    snapshot = data_service.snapshot()
+    if (snapshot.origin, snapshot.history_version) != st.session_state.rendered_history_version:
+        st.rerun()
+
+    stocks_df = filter_stocks(snapshot, price_screen, None)
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric(
+            "Total Stocks",
+            len(stocks_df),
+            delta=None
+        )
+    with col2:
+        avg_1y_return = stocks_df['1y_return'].mean()
+        st.metric(
+            "Average 1Y Return",
+            format_percentage(avg_1y_return),
+            delta=format_percentage(avg_1y_return)
+        )
+    with col3:
+        avg_5y_return = stocks_df['5y_return'].mean()
+        st.metric(
+            "Average 5Y Return",
+            format_percentage(avg_5y_return),
+            delta=format_percentage(avg_5y_return)
+        )
+    with col4:
+        last_update = snapshot.updated_at
+        if last_update:
+            st.metric(
+                "Last Updated",
+                last_update.strftime("%H:%M:%S"),
+                delta=("Streaming" if tick_streamer else "Live") if auto_refresh else None
+            )
+
+
+STOCK_TABLE_COLUMNS = [
+    'Symbol', 'Name', 'Current Price', 'Price Change %',
+    '52W High', '52W Low', 'From 52W High %', 'From 52W Low %',
+    '1y_return', '2y_return', '5y_return'
+]
+TABLE_PAGE_SIZE = 50
+
+
+@st.cache_resource(max_entries=4)
+def get_stock_table_view(version, _stock_table):
+    """Formatted stock table, built once per (origin, version) of a snapshot and shared by every session"""
+    with perf.span('render.table_view_build') as span:
+        span.rows = len(_stock_table)
+        return TableView(_stock_table[STOCK_TABLE_COLUMNS], STOCK_TABLE_FORMATS, STOCK_TABLE_SIGNED)
+
+
+@st.fragment(run_every=live_poll if auto_refresh else None)
+def render_stock_table(price_screen, search):
+    snapshot = data_service.snapshot()
+    view = get_stock_table_view((snapshot.origin, snapshot.version), snapshot.stock_table)
+    rows = filter_stocks(snapshot, price_screen, search).index.to_numpy()
+
+    # Sorting and paging happen here, so only one page is styled and sent to the browser
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        sort_options = ['Relevance'] + STOCK_TABLE_COLUMNS
+        sort_by = st.selectbox("Sort by", sort_options, index=0 if search else sort_options.index('Price Change %'))
+    with col2:
+        ascending = st.toggle("Ascending", value=False)
+    with col3:
+        pages = max(1, -(-len(rows) // TABLE_PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+
+    # Relevance keeps the order of the search results
+    with perf.span('render.table_page') as span:
+        positions = view.page(rows, None if sort_by == 'Relevance' else sort_by, ascending, page - 1, TABLE_PAGE_SIZE)
+        st.dataframe(view.render(positions), height=400, hide_index=True)
+        span.rows = len(positions)
+    st.caption(f"Showing {len(positions)} of {len(rows)} stocks (page {page} of {pages})")
+
+
+@st.fragment(run_every=live_poll if auto_refresh else None)
+def render_saved_screens():
+    saved_screens = st.session_state.saved_screens
+    if not saved_screens.screens:
+        return
+
+    # Only screens on price columns are re-evaluated after a price refresh
+    screener = data_service.snapshot().screener
+    results = saved_screens.evaluate(screener)
+    symbols = screener.table['Symbol']
+    st.dataframe(
+        pd.DataFrame({
+            'Screen': list(results.keys()),
+            'Matches': [len(rows) for rows in results.values()],
+            'Stocks': [', '.join(symbols.iloc[rows[:10]]) for rows in results.values()]
+        }),
+        hide_index=True
+    )
+
+
+def show_chart(name, build):
+    # Building (or patching) the figure and serializing it are timed separately
+    with perf.span('render.chart_build', chart=name):
+        fig = build()
+    with perf.span('render.plotly_chart', chart=name):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def render_perf_panel():
+    metrics = perf.registry.snapshot()
+    spans = pd.DataFrame([
+        {
+            'Stage': h['name'].removesuffix('_seconds'),
+            'Labels': ', '.join(f"{k}={v}" for k, v in h['labels'].items()),
+            'Calls': h['count'],
+            'Mean (ms)': h['mean'] * 1000,
+            'p50 ≤ (ms)': h['p50'] * 1000,
+            'p95 ≤ (ms)': h['p95'] * 1000,
+            'Total (s)': h['sum']
+        }
+        for h in metrics['histograms']
+    ])
+    if len(spans):
+        st.dataframe(spans.sort_values('Total (s)', ascending=False), hide_index=True)
+    else:
+        st.caption("No spans recorded yet")
+
+    counters = {
+        c['name'] + ''.join(f" {k}={v}" for k, v in c['labels'].items()): c['value']
+        for c in metrics['counters']
+    }
+    caches = {
+        f"{source} hit rate": f"{values['hit_rate']:.0%}"
+        for source, values in metrics['gauges'].items() if 'hit_rate' in values
+    }
+    col1, col2 = st.columns(2)
+    with col1:
+        st.json(counters, expanded=False)
+    with col2:
+        st.json({**caches, **metrics['gauges']}, expanded=False)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download (Prometheus)", perf.registry.to_prometheus(), "metrics.prom")
+    with col2:
+        if st.button("Reset metrics"):
+            perf.registry.reset()
+
+
+def zoom_range(stock_data, key, intraday):
+    """(start, end) picked on a zoom slider, or None for the whole history.
+
+    Charts downsample only the picked range, so zooming in shows full
+    detail. An end at the newest bar is left open (None) so live bars keep
+    appearing in the zoomed view.
+    """
+    index = stock_data.index
+    if len(index) < 3:
+        return None
+    first, last = (ts.tz_localize(None).to_pydatetime() if index.tz else ts.to_pydatetime()
+                   for ts in (index[0], index[-1]))
+    start, end = st.slider(
+        "Zoom",
+        min_value=first,
+        max_value=last,
+        value=(first, last),
+        step=timedelta(minutes=1) if intraday else timedelta(days=1),
+        format="YYYY-MM-DD HH:mm" if intraday else "YYYY-MM-DD",
+        key=key
+    )
+    if start <= first and end >= last:
+        return None
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if index.tz:
+        start, end = start.tz_localize(index.tz), end.tz_localize(index.tz)
+    return (start, None if end >= pd.Timestamp(last).tz_localize(index.tz) else end)
+
+
+@st.fragment(run_every=live_poll if auto_refresh else None)
+def render_technical_analysis(selected_stock, period, interval='1d'):
+    # The newest candle follows the live price (a price from a later bar starts a
+    # provisional one); charts patch it in place
+    snapshot = data_service.snapshot()
+    stock_data = revise_last_bar(
+        data_handler.get_detailed_stock_data(selected_stock, period, interval, snapshot.panel),
+        snapshot.quotes.get(selected_stock),
+        snapshot.prices_at,
+        interval
+    )
+    if len(stock_data) == 0:
+        st.warning(f"No price history available for {selected_stock}")
+        return
+
+    # Derived values and figures are cached per period and interval
+    period = f"{period}/{interval}"
+
+    # Calculate technical indicators (memoized until a new bar arrives)
+    indicators = derived_cache.indicators(selected_stock, period, stock_data)
+
+    # The slider starts over when a new bar arrives, since its bounds change
+    x_range = zoom_range(stock_data, f"zoom/{selected_stock}/{period}/{stock_data.index[-1]}",
+                         INTERVALS[interval][0] != '1d')
+
+    # Create tabs for different charts
+    tab1, tab2, tab3 = st.tabs(["📊 Price & Indicators", "📉 MACD", "📈 Returns"])
+
+    with tab1:
+        show_chart('price', lambda: cached_price_chart(stock_data, selected_stock, period, indicators, x_range))
+
+    with tab2:
+        show_chart('macd', lambda: cached_macd_chart(stock_data, selected_stock, period, indicators, x_range))
+
+    with tab3:
+        show_chart('returns', lambda: cached_returns_chart(
+            stock_data,
+            selected_stock,
+            period,
+            derived_cache.cumulative_returns(selected_stock, period, stock_data),
+            x_range
+        ))
+
+    # Technical Indicators Summary
+    st.subheader("Technical Indicators Summary")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        current_rsi = indicators['RSI'].iloc[-1]
+        rsi_status = "Oversold" if current_rsi < 30 else "Overbought" if current_rsi > 70 else "Neutral"
+        st.metric("RSI (14)", f"{current_rsi:.2f}", rsi_status)
+
+    with col2:
+        macd = indicators['MACD'].iloc[-1]
+        signal = indicators['Signal'].iloc[-1]
+        macd_status = "Bullish" if macd > signal else "Bearish"
+        st.metric("MACD", f"{macd:.2f}", macd_status)
+
+    with col3:
+        current_price = stock_data['Close'].iloc[-1]
+        ma200 = indicators['MA200'].iloc[-1]
+        trend = "Above MA200" if current_price > ma200 else "Below MA200"
+        st.metric("Trend", trend, f"{((current_price/ma200 - 1) * 100):.2f}%")
+
+
+@st.fragment
+def render_correlation():
+    # Matrices follow the daily history; new bars are folded in, not recomputed
+    snapshot = data_service.snapshot()
+    col1, col2 = st.columns(2)
+    with col1:
+        window = st.radio("Window (trading days)", CORRELATION_WINDOWS, horizontal=True)
+    with col2:
+        n_clusters = st.slider("Clusters", 2, 30, 12)
+
+    clustering = correlation_cache.clustering(snapshot.panel, window, n_clusters)
+    if len(clustering.symbols) < 2:
+        st.info(f"Correlations need at least two stocks with {window} days of history")
+        return
+    matrix, symbols, labels = clustering.ordered()
+
+    tab1, tab2 = st.tabs(["🗺️ Heatmap", "🧩 Clusters"])
+
+    with tab1:
+        show_chart('correlation', lambda: cached_correlation_heatmap(
+            matrix, symbols, window, (snapshot.origin, snapshot.history_version, n_clusters)
+        ))
+
+    with tab2:
+        summary = pd.DataFrame(clustering.summary())
+        st.dataframe(
+            summary.sort_values('Mean Correlation', ascending=False).style.format({'Mean Correlation': '{:.2f}'}),
+            hide_index=True,
+            height=400
+        )
+        st.caption("Stocks grouped by average-linkage clustering on 1 - correlation; "
+                   "groups of highly correlated stocks carry much the same risk.")
+
 # Load and filter data
 with st.spinner("Loading stock data..."):
     try:
-        stocks_df = st.session_state.data_handler.get_stock_data(
-            period_options[selected_period]
-        )
-
-        if price_filter == "Near 52-Week High":
-            stocks_df = st.session_state.data_handler.filter_near_52week_high(stocks_df)
-        elif price_filter == "Near 52-Week Low":
-            stocks_df = st.session_state.data_handler.filter_near_52week_low(stocks_df)
+        # Blocks only on the very first load in the process; later refreshes
+        # happen in the background
+        snapshot = data_service.snapshot()
+        st.session_state.rendered_history_version = (snapshot.origin, snapshot.history_version)
+        if data_service.last_error:
+            st.warning(data_service.last_error)
+        if data_handler.last_error:
+            st.warning(data_handler.last_error)
+        if tick_streamer and tick_streamer.last_error:
+            st.warning(tick_streamer.last_error)
 
         # Market Overview Section
         st.header("Market Overview")
-        col1, col2, col3, col4 = st.columns(4)
-
-        with col1:
-            st.metric(
-                "Total Stocks",
-                len(stocks_df),
-                delta=None
-            )
-        with col2:
-            avg_1y_return = stocks_df['1y_return'].mean()
-            st.metric(
-                "Average 1Y Return",
-                format_percentage(avg_1y_return),
-                delta=format_percentage(avg_1y_return)
-            )
-        with col3:
-            avg_5y_return = stocks_df['5y_return'].mean()
-            st.metric(
-                "Average 5Y Return",
-                format_percentage(avg_5y_return),
-                delta=format_percentage(avg_5y_return)
-            )
-        with col4:
-            last_update = st.session_state.data_handler.get_last_update_time()
-            if last_update:
-                st.metric(
-                    "Last Updated",
-                    last_update.strftime("%H:%M:%S"),
-                    delta="Live" if auto_refresh else None
-                )
+        render_market_overview(price_screen)
 
         # Stock Analysis Section
         st.header("Stock Analysis")
 
         # Search and filter
         search = st.text_input("🔍 Search stocks by name or symbol")
-        if search:
-            stocks_df = stocks_df[
-                stocks_df['Symbol'].str.contains(search, case=False) |
-                stocks_df['Name'].str.contains(search, case=False)
-            ]
+        render_stock_table(price_screen, search)
+        stocks_df = filter_stocks(snapshot, price_screen, search)
+
+        # Technical Screener Section
+        st.header("Technical Screener")
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_conditions = st.multiselect(
+                "Show stocks matching all of",
+                list(SCREEN_CONDITIONS.keys())
+            )
+        with col2:
+            return_range = st.slider("1Y return (%)", -100, 300, (-100, 300), step=5)
+
+        predicates = [SCREEN_CONDITIONS[condition] for condition in selected_conditions]
+        if return_range != (-100, 300):
+            low, high = return_range
+            predicates.append(Between(
+                '1y_return',
+                low=low / 100 if low > -100 else None,
+                high=high / 100 if high < 300 else None
+            ))
+        screen = All(*predicates) if predicates else None
+        with perf.span('render.screener') as span:
+            screen_df = snapshot.screener.run(screen)
+            span.rows = len(screen_df)
 
-        # Display stock table with enhanced styling
         st.dataframe(
-            stocks_df[[
-                'Symbol', 'Name', 'Current Price', 'Price Change %',
-                '52W High', '52W Low', 'From 52W High %', 'From 52W Low %',
-                '1y_return', '2y_return', '5y_return'
+            screen_df[[
+                'Symbol', 'Name', 'Close', 'RSI', 'RSI Status', 'MACD', 'Signal',
+                'MACD Status', 'MA50', 'MA200', 'Above MA200'
             ]].style.format({
-                'Current Price': '₹{:.2f}',
-                'Price Change %': '{:+.2f}%',
-                '52W High': '₹{:.2f}',
-                '52W Low': '₹{:.2f}',
-                'From 52W High %': '{:.1f}%',
-                'From 52W Low %': '{:+.1f}%',
-                '1y_return': '{:.2%}',
-                '2y_return': '{:.2%}',
-                '5y_return': '{:.2%}'
-            }).applymap(
-                lambda x: 'color: red' if isinstance(x, float) and x < 0 else 'color: green',
-                subset=['Price Change %', 'From 52W High %', 'From 52W Low %', '1y_return', '2y_return', '5y_return']
-            ).set_properties(**{
-                'background-color': 'white',
-                'font-family': 'sans-serif'
+                'Close': '₹{:.2f}',
+                'RSI': '{:.1f}',
+                'MACD': '{:.2f}',
+                'Signal': '{:.2f}',
+                'MA50': '₹{:.2f}',
+                'MA200': '₹{:.2f}'
             }),
             height=400
         )
 
+        # Saved screens follow live prices; see render_saved_screens
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            screen_name = st.text_input("Screen name", placeholder="e.g. Oversold above MA200")
+        with col2:
+            if st.button("Save screen", disabled=screen is None or not screen_name):
+                st.session_state.saved_screens.save(screen_name, screen)
+        render_saved_screens()
+
         # Technical Analysis Section
         st.header("Technical Analysis")
 
-        selected_stock = st.selectbox(
-            "Select a stock for detailed analysis",
-            stocks_df['Symbol'].tolist()
-        )
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            selected_stock = st.selectbox(
+                "Select a stock for detailed analysis",
+                stocks_df['Symbol'].tolist()
+            )
+        with col2:
+            interval = st.selectbox("Interval", list(INTERVALS), index=list(INTERVALS).index('1d'))
 
         if selected_stock:
-            stock_data = st.session_state.data_handler.get_detailed_stock_data(
-                selected_stock,
-                period_options[selected_period]
-            )
+            render_technical_analysis(selected_stock, period_options[selected_period], interval)
 
-            # Calculate technical indicators
-            indicators = calculate_all_indicators(stock_data)
-
-            # Create tabs for different charts
-            tab1, tab2, tab3 = st.tabs(["📊 Price & Indicators", "📉 MACD", "📈 Returns"])
-
-            with tab1:
-                st.plotly_chart(
-                    create_price_chart(stock_data, selected_stock, indicators),
-                    use_container_width=True
-                )
-
-            with tab2:
-                st.plotly_chart(
-                    create_macd_chart(stock_data, indicators),
-                    use_container_width=True
-                )
-
-            with tab3:
-                st.plotly_chart(
-                    create_returns_chart(stock_data, selected_stock),
-                    use_container_width=True
-                )
-
-            # Technical Indicators Summary
-            st.subheader("Technical Indicators Summary")
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                current_rsi = indicators['RSI'].iloc[-1]
-                rsi_status = "Oversold" if current_rsi < 30 else "Overbought" if current_rsi > 70 else "Neutral"
-                st.metric("RSI (14)", f"{current_rsi:.2f}", rsi_status)
-
-            with col2:
-                macd = indicators['MACD'].iloc[-1]
-                signal = indicators['Signal'].iloc[-1]
-                macd_status = "Bullish" if macd > signal else "Bearish"
-                st.metric("MACD", f"{macd:.2f}", macd_status)
-
-            with col3:
-                current_price = stock_data['Close'].iloc[-1]
-                ma200 = indicators['MA200'].iloc[-1]
-                trend = "Above MA200" if current_price > ma200 else "Below MA200"
-                st.metric("Trend", trend, f"{((current_price/ma200 - 1) * 100):.2f}%")
+        # Correlation Section
+        st.header("Correlation & Risk")
+        render_correlation()
 
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
 
 # Add refresh button
 if st.button("🔄 Refresh Data"):
-    st.session_state.data_handler.clear_cache()
-    st.experimental_rerun()
+    data_handler.clear_cache()
+    with st.spinner("Refreshing data..."):
+        data_service.refresh_history()
+        data_service.refresh_prices()
+    st.rerun()
+
+perf.observe('render.page_seconds', time.perf_counter() - page_start)
+if perf.registry.enabled:
+    with st.expander("⏱️ Performance"):
+        render_perf_panel()
 
 # Footer
 st.markdown("""
 ---
 <div style='text-align: center'>
-    <p>Real-time data provided by Yahoo Finance. Auto-refreshes every minute when enabled.</p>
+    <p>Real-time data provided by Yahoo Finance. Prices refresh in the background when auto-refresh is enabled.</p>
     <p>Last updated: {}</p>
 </div>
 """.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")), unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_1Y = 252
+TRADING_DAYS_2Y = 504
+TRADING_DAYS_5Y = 1260
+
+
+# Fields kept in the panel; Volume and corporate actions are not charted or screened
+PANEL_FIELDS = ('Open', 'High', 'Low', 'Close')
+PANEL_DTYPE = np.float32
+
+
+class PricePanel:
+    """Daily bars of many symbols aligned on a shared dates x symbols grid.
+
+    All fields live in one compact float32 block of shape (fields, dates,
+    symbols); dates a symbol did not trade are NaN. Dates are stored as
+    int32 day numbers and symbols are dictionary-encoded: a symbol's code
+    is its position in `symbols` and indexes the last axis.
+
+    `panel['Close']` is a dates x symbols view and `history(symbol)` a
+    DataFrame over one symbol's slice of the block, so vectorized metrics,
+    indicators and charts read the same memory without copying it.
+    """
+
+    def __init__(self, days, symbols, bars, fields=PANEL_FIELDS, tz=None):
+        self.days = np.asarray(days, dtype=np.int32)
+        self.symbols = list(symbols)
+        self.bars = bars
+        self.fields = tuple(fields)
+        self.tz = tz
+        self.codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+
+        dates = pd.DatetimeIndex(self.days.astype('datetime64[D]').astype('datetime64[ns]'))
+        self.dates = dates.tz_localize(tz) if tz else dates
+
+        # Rows a symbol's frame starts at; gaps after it force a (copying) dropna
+        valid = ~np.isnan(self['Close']) if 'Close' in self._field_index else np.ones(self.shape, dtype=bool)
+        self._first = valid.argmax(axis=0) if len(self.days) else np.zeros(len(self.symbols), dtype=int)
+        self._gapless = valid.sum(axis=0) == len(self.days) - self._first
+
+    def __getitem__(self, field):
+        return self.bars[self._field_index[field]]
+
+    def __contains__(self, symbol):
+        return symbol in self.codes
+
+    @property
+    def shape(self):
+        return (len(self.days), len(self.symbols))
+
+    @property
+    def nbytes(self):
+        return int(self.bars.nbytes + self.days.nbytes)
+
+    def history(self, symbol):
+        """OHLC frame of one symbol from its first bar, a view into the panel"""
+        code = self.codes[symbol]
+        first = self._first[code]
+        frame = pd.DataFrame(self.bars[:, first:, code].T, index=self.dates[first:],
+                             columns=list(self.fields), copy=False)
+        if not self._gapless[code]:
+            frame = frame.dropna(subset=['Close'])
+        return frame
+
+    @classmethod
+    def from_histories(cls, histories, fields=PANEL_FIELDS):
+        """Build a panel from {symbol: OHLCV DataFrame}"""
+        histories = {s: h for s, h in histories.items() if h is not None and len(h) > 0}
+        symbols = list(histories)
+        if not symbols:
+            return cls(np.empty(0, dtype=np.int32), [], np.empty((len(fields), 0, 0), dtype=PANEL_DTYPE), fields)
+
+        tz = histories[symbols[0]].index.tz
+        days = {symbol: _day_numbers(histories[symbol].index) for symbol in symbols}
+        all_days = np.unique(np.concatenate(list(days.values())))
+
+        # Each symbol is written straight into its column of the float32 block
+        bars = np.full((len(fields), len(all_days), len(symbols)), np.nan, dtype=PANEL_DTYPE)
+        for code, symbol in enumerate(symbols):
+            rows = np.searchsorted(all_days, days[symbol])
+            for i, field in enumerate(fields):
+                bars[i, rows, code] = histories[symbol][field].to_numpy()
+        return cls(all_days, symbols, bars, fields, tz)
+
+
+def _day_numbers(dates):
+    """int32 days since 1970-01-01 of the (local) calendar dates of an index"""
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    return dates.to_numpy().astype('datetime64[D]').astype(np.int32)
+
+
+def bars_back(valid):
+    """Rank every valid entry by how many bars back it is (1 = latest), 0 where invalid.
+
+    With this rank positional lookbacks like `hist['Close'][-252]` become a
+    mask over the panel, even for symbols with gaps or shorter histories.
+    """
+    counts = valid.sum(axis=0)
+    return np.where(valid, counts - np.cumsum(valid, axis=0) + 1, 0)
+
+
+def _lookback(values, rank, bars):
+    """Value `bars` bars back from the latest (bars=1 is the latest), NaN if history is shorter"""
+    hit = rank == bars
+    rows = hit.argmax(axis=0)
+    # Per-symbol results are small, so they are computed in float64
+    return np.where(hit.any(axis=0), values[rows, np.arange(values.shape[1])].astype(float), np.nan)
+
+
+def compute_history_metrics(panel):
+    """Vectorized 52-week range and 1y/2y/5y returns for every symbol in the panel.
+
+    Returns a DataFrame with Symbol, Last Close, 52W High, 52W Low and the
+    return columns, matching what the per-symbol loop used to produce.
+    Symbols without any valid close are dropped.
+    """
+    close = panel['Close']
+    valid = ~np.isnan(close)
+    counts = valid.sum(axis=0)
+    rank = bars_back(valid)
+
+    last_close = _lookback(close, rank, 1)
+    first_close = _lookback(close, rank, np.maximum(counts, 1))
+    has_year = counts >= TRADING_DAYS_1Y
+    in_year = (rank > 0) & (rank <= TRADING_DAYS_1Y)
+
+    with np.errstate(all='ignore'):
+        # fmax/fmin skip NaN like pandas' max/min do
+        high_52w = np.where(has_year, np.fmax.reduce(np.where(in_year, panel['High'], -np.inf), axis=0), last_close)
+        low_52w = np.where(has_year, np.fmin.reduce(np.where(in_year, panel['Low'], np.inf), axis=0), last_close)
+
+        metrics = pd.DataFrame({
+            'Symbol': panel.symbols,
+            'Last Close': last_close,
+            '52W High': high_52w,
+            '52W Low': low_52w,
+            '1y_return': last_close / _lookback(close, rank, TRADING_DAYS_1Y) - 1,
+            '2y_return': last_close / _lookback(close, rank, TRADING_DAYS_2Y) - 1,
+            '5y_return': np.where(counts >= TRADING_DAYS_5Y, last_close / first_close - 1, np.nan)
+        })
+    return metrics[counts > 0].reset_index(drop=True)
@@ -0,0 +1,212 @@
+import os
+import json
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from data_providers import OHLCV_COLUMNS, period_to_offset
+
+
+class OHLCVStore:
+    """On-disk bar store with one Parquet file per symbol, daily unless another `interval` is given.
+
+    A small JSON manifest records the last stored timestamp of every symbol,
+    so a refresh can ask the provider only for bars newer than what is on disk
+    without opening each file first.
+
+    Loaded frames are only kept in memory with `cache_frames=True`; the daily
+    universe is held by the compact PricePanel instead, so by default each
+    load reads the file again.
+
+    Bars are split and dividend adjusted, so a corporate action rewrites the
+    whole history: every refresh refetches a few already stored bars and,
+    when they no longer match, the symbol's full period is downloaded again.
+    Writes of a symbol are serialized in-process and go through a unique
+    temp file, so concurrent refreshes cannot interleave.
+    """
+
+    # Stored bars refetched on every update to detect re-adjusted history
+    OVERLAP = {'1d': pd.Timedelta(days=7)}
+    # Relative difference of an overlapping close that counts as re-adjusted
+    ADJUSTMENT_TOLERANCE = 1e-4
+
+    def __init__(self, root='data/ohlcv', interval='1d', cache_frames=False):
+        self.root = root
+        self.interval = interval
+        self.cache_frames = cache_frames
+        os.makedirs(self.root, exist_ok=True)
+        self._manifest_path = os.path.join(self.root, 'manifest.json')
+        self._manifest = self._load_manifest()
+        self._frames = {}
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path) as f:
+                return {symbol: pd.Timestamp(ts) for symbol, ts in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _replace(self, path, write):
+        """Write through a unique temp file next to `path`, then swap it in"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=os.path.basename(path), suffix='.tmp')
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _save_manifest(self):
+        with self._lock:
+            manifest = {symbol: ts.isoformat() for symbol, ts in self._manifest.items()}
+
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(manifest, f)
+        self._replace(self._manifest_path, write)
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f"{symbol}.parquet")
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def symbols(self):
+        return list(self._manifest)
+
+    def last_timestamp(self, symbol):
+        """Timestamp of the newest stored bar, or None if the symbol is not stored"""
+        return self._manifest.get(symbol)
+
+    def load(self, symbol):
+        """Load the full stored history for a symbol (empty frame if missing)"""
+        frame = self._frames.get(symbol)
+        if frame is None:
+            try:
+                frame = pd.read_parquet(self._path(symbol))
+            except FileNotFoundError:
+                return pd.DataFrame(columns=OHLCV_COLUMNS)
+            if self.cache_frames:
+                self._frames[symbol] = frame
+        return frame
+
+    def append(self, symbol, bars, save_manifest=True, period=None, replace=False):
+        """Merge new bars into the stored history, newer rows win on overlap.
+
+        With `period`, bars older than that before the newest are dropped;
+        with replace=True the stored history is discarded first.
+        """
+        with self._symbol_lock(symbol):
+            merged = self._merge(symbol, self.load(symbol), bars, period, replace)
+        if save_manifest:
+            self._save_manifest()
+        return merged
+
+    def _merge(self, symbol, stored, bars, period=None, replace=False):
+        # Callers hold the symbol's lock
+        bars = bars[[col for col in OHLCV_COLUMNS if col in bars.columns]].sort_index()
+        if len(bars) == 0:
+            return stored
+        if len(stored) > 0 and not replace:
+            if stored.index.tz != bars.index.tz:
+                bars = bars.tz_localize(None) if bars.index.tz else bars.tz_localize(stored.index.tz)
+            merged = pd.concat([stored[stored.index < bars.index[0]], bars])
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        else:
+            merged = bars
+        if period is not None and period != 'max':
+            merged = merged[merged.index > merged.index[-1] - period_to_offset(period)]
+
+        # Unchanged histories are not rewritten; readers never see a partial file
+        if _same_bars(merged, stored):
+            merged = stored
+        else:
+            self._replace(self._path(symbol), merged.to_parquet)
+
+        if self.cache_frames:
+            self._frames[symbol] = merged
+        with self._lock:
+            self._manifest[symbol] = merged.index[-1]
+        return merged
+
+    def _readjusted(self, stored, bars):
+        """True when refetched bars disagree with the stored bars they overlap.
+
+        The newest stored bar may have been a still-forming one, so it is not
+        compared.
+        """
+        if len(stored) < 2 or len(bars) == 0:
+            return False
+        if stored.index.tz != bars.index.tz:
+            bars = bars.tz_localize(None) if bars.index.tz else bars.tz_localize(stored.index.tz)
+        overlap = stored.index[:-1].intersection(bars.index)
+        if len(overlap) == 0:
+            return False
+        old = stored.loc[overlap, 'Close'].to_numpy(dtype=float)
+        new = bars.loc[overlap, 'Close'].to_numpy(dtype=float)
+        return not np.allclose(old, new, rtol=self.ADJUSTMENT_TOLERANCE, atol=0, equal_nan=True)
+
+    def update(self, provider, symbols, period='5y', stats=None):
+        """Bring the store up to date and return {symbol: full history}.
+
+        Symbols with no local history are downloaded for `period`. Stored
+        symbols are grouped by their last timestamp and re-requested from a
+        little before it, so the last (possibly partial) bar is replaced,
+        only newer bars cross the network, and a history re-adjusted for a
+        split or dividend is spotted and downloaded again in full. Bars older
+        than `period` are dropped. Every request is recorded into `stats` (a
+        fetch_scheduler.FetchStats) when given.
+        """
+        symbols = list(symbols)
+        overlap = self.OVERLAP.get(self.interval, pd.Timedelta(0))
+        missing = [s for s in symbols if s not in self._manifest]
+        by_start = {}
+        for symbol in symbols:
+            if symbol in self._manifest:
+                start = (self._manifest[symbol] - overlap).strftime('%Y-%m-%d')
+                by_start.setdefault(start, []).append(symbol)
+
+        fetched = {}
+        if missing:
+            fetched.update(provider.get_history(missing, period=period, interval=self.interval, stats=stats))
+        for start, group in by_start.items():
+            fetched.update(provider.get_history(group, start=start, interval=self.interval, stats=stats))
+
+        histories = {}
+        readjusted = []
+        for symbol, bars in fetched.items():
+            with self._symbol_lock(symbol):
+                stored = self.load(symbol)
+                if self._readjusted(stored, bars):
+                    readjusted.append(symbol)
+                else:
+                    histories[symbol] = self._merge(symbol, stored, bars, period)
+        if readjusted:
+            # The stored history is kept if the full download fails
+            refetched = provider.get_history(readjusted, period=period, interval=self.interval, stats=stats)
+            for symbol, bars in refetched.items():
+                histories[symbol] = self.append(symbol, bars, save_manifest=False, period=period, replace=True)
+        if fetched:
+            self._save_manifest()
+
+        return {s: histories[s] if s in histories else self.load(s) for s in symbols if s in self._manifest}
+
+
+def _same_bars(a, b):
+    """True when two histories have the same timestamps, columns and values"""
+    if len(a) != len(b) or list(a.columns) != list(b.columns) or not a.index.equals(b.index):
+        return False
+    return np.array_equal(a.to_numpy(dtype=float), b.to_numpy(dtype=float), equal_nan=True)
+
+
+def slice_period(hist, period):
+    """Return the trailing `period` ('1mo' ... '5y') of a sorted history"""
+    if len(hist) == 0 or period == 'max':
+        return hist
+    # A positional slice keeps views of the panel zero-copy
+    start = hist.index.searchsorted(hist.index[-1] - period_to_offset(period), side='right')
+    return hist.iloc[start:]
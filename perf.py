@@ -0,0 +1,262 @@
+"""Lightweight timing spans, counters and latency histograms for the hot paths.
+
+Collection is off unless PERF_METRICS=1 is set or `registry.enabled` is
+switched on (the app offers a toggle for it with PERF_ADMIN=1); while off,
+`span` hands back a shared no-op object and the other calls return after
+one attribute check.
+
+    with perf.span('handler.history_metrics') as span:
+        metrics = compute_history_metrics(panel)
+        span.rows = len(metrics)
+
+Metrics can be read in the app's performance panel, scraped from
+`serve(port)` (/metrics in Prometheus text format, /metrics.json) or
+written periodically to a file with `export_to_file(path)`.
+"""
+import os
+import json
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value, count=1):
+        self.counts[bisect.bisect_left(self.buckets, value)] += count
+        self.count += count
+        self.sum += value * count
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class _NullSpan:
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Times a block; set `rows` to count the rows it processed"""
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.rows = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        self.registry.observe(f"{self.name}_seconds", seconds, **self.labels)
+        if self.rows:
+            self.registry.count(f"{self.name}_rows_total", self.rows, **self.labels)
+        if exc_type is not None:
+            self.registry.count(f"{self.name}_errors_total", **self.labels)
+        return False
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+class Registry:
+    """Process-wide store of histograms and counters, plus gauge collectors read at export time"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, labels)
+
+    def observe(self, name, value, count=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value, count)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_collector(self, name, collect):
+        """`collect()` returns {metric: number}; it is only called when metrics are read"""
+        self._collectors[name] = collect
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """All metrics as plain data"""
+        with self._lock:
+            histograms = {key: (h.count, h.sum, h.quantile(0.5), h.quantile(0.95), list(h.counts))
+                          for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        gauges = {}
+        for name, collect in list(self._collectors.items()):
+            try:
+                gauges[name] = {k: v for k, v in collect().items() if isinstance(v, (int, float))}
+            except Exception:
+                gauges[name] = {}
+        return {
+            'enabled': self.enabled,
+            'since': self.started,
+            'histograms': [
+                {'name': name, 'labels': dict(labels), 'count': count, 'sum': total,
+                 'mean': total / count if count else 0.0, 'p50': p50, 'p95': p95,
+                 'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], bucket_counts))}
+                for (name, labels), (count, total, p50, p95, bucket_counts) in sorted(histograms.items())
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            'gauges': gauges
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='nse_'):
+        """Metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            # One TYPE line per metric family; label sets of a family are adjacent
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for h in snapshot['histograms']:
+            name = prefix + h['name'].replace('.', '_')
+            labels = sorted(h['labels'].items())
+            declare(name, 'histogram')
+            cumulative = 0
+            for bound, count in h['buckets'].items():
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {h['count']}")
+        for c in snapshot['counters']:
+            name = prefix + c['name'].replace('.', '_')
+            declare(name, 'counter')
+            lines.append(f"{name}{_format_labels(sorted(c['labels'].items()))} {c['value']}")
+        for source, values in snapshot['gauges'].items():
+            for metric, value in values.items():
+                name = f"{prefix}{source}_{metric}".replace('.', '_')
+                declare(name, 'gauge')
+                lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(enabled=os.environ.get('PERF_METRICS', '') not in ('', '0'))
+span = registry.span
+observe = registry.observe
+count = registry.count
+
+
+def export_to_file(path, interval=15.0, stop_event=None):
+    """Rewrite `path` (Prometheus text) and `path`.json every `interval` seconds on a daemon thread"""
+    stop_event = stop_event or threading.Event()
+
+    def write(target, text):
+        tmp = target + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, target)
+
+    def run():
+        while not stop_event.is_set():
+            write(path, registry.to_prometheus())
+            write(path + '.json', registry.to_json())
+            stop_event.wait(interval)
+
+    threading.Thread(target=run, name='perf-export', daemon=True).start()
+    return stop_event
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve /metrics (Prometheus text) and /metrics.json on a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = registry.to_json(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='perf-http', daemon=True).start()
+    return server
@@ -0,0 +1,135 @@
+import threading
+
+import pandas as pd
+
+# Supported chart intervals: (stored base interval, pandas rule). Intraday
+# timeframes are built from stored 1-minute bars, weekly from daily bars
+INTERVALS = {
+    '1m': ('1m', None),
+    '5m': ('1m', '5min'),
+    '15m': ('1m', '15min'),
+    '1h': ('1m', '1h'),
+    '1d': ('1d', None),
+    '1w': ('1d', 'W-MON')
+}
+
+# NSE opens at 09:15, so hourly bars run 09:15-10:15, 10:15-11:15, ...
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+SESSION_CLOSE = pd.Timedelta(hours=15, minutes=30)
+# Exchange time zone; tz-naive bars are in exchange time
+MARKET_TZ = 'Asia/Kolkata'
+
+OHLCV_AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def resample_bars(bars, rule):
+    """Aggregate OHLCV bars into `rule` bins labelled by their start; empty bins are dropped"""
+    if len(bars) == 0:
+        return bars
+    aggregation = {column: how for column, how in OHLCV_AGGREGATION.items() if column in bars}
+    intraday = not rule.startswith('W')
+    resampled = bars.resample(
+        rule,
+        label='left',
+        closed='left',
+        origin='start_day',
+        offset=SESSION_OPEN if intraday else None
+    ).agg(aggregation)
+    return resampled.dropna(subset=['Close'])
+
+
+def in_session(ts):
+    """Whether a timestamp falls in regular trading hours on a weekday (holidays are not known)"""
+    ts = ts.tz_convert(MARKET_TZ) if ts.tz is not None else ts
+    since_midnight = ts - ts.normalize()
+    return ts.weekday() < 5 and SESSION_OPEN <= since_midnight < SESSION_CLOSE
+
+
+def bar_start(ts, interval):
+    """Label of the `interval` bar a timestamp falls in, as resample_bars labels it"""
+    base, rule = INTERVALS[interval]
+    day = ts.normalize()
+    if base == '1d':
+        # Weekly bins start on Mondays
+        return day - pd.Timedelta(days=day.weekday()) if rule else day
+    step = pd.Timedelta(rule or '1min')
+    return day + SESSION_OPEN + ((ts - day - SESSION_OPEN) // step) * step
+
+
+class BarResampler:
+    """Incremental resampling of one symbol's bars to a coarser interval.
+
+    Bars before the current (still open) bin are finished: they are
+    aggregated once and cached. Each update re-aggregates only the source
+    bars from the start of the current bin onwards, so the partial bar
+    follows revisions of the latest source bar and new bars cost only
+    their own aggregation.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.finished = None
+        self.current = None
+        self._first = None
+        self._bars = None
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        self.finished = None
+        self.current = None
+        self._bars = None
+
+    def update(self, source):
+        """Fold in the latest source bars and return all resampled bars"""
+        with self._lock:
+            if len(source) == 0:
+                self._reset()
+                return source
+            # A source that no longer starts where it did, or at the same price
+            # (re-adjusted for a split), was reloaded: rebuild
+            first = (source.index[0], source['Close'].iloc[0])
+            if self._first is not None and first != self._first:
+                self._reset()
+            self._first = first
+
+            if self.current is not None:
+                source = source[source.index >= self.current.index[0]]
+            bars = resample_bars(source, self.rule)
+            if len(bars) == 0:
+                return self.bars() if self.current is not None else bars
+
+            finished = bars.iloc[:-1]
+            if len(finished):
+                self.finished = finished if self.finished is None else pd.concat([self.finished, finished])
+            self.current = bars.iloc[-1:]
+            self._bars = None
+            return self.bars()
+
+    def bars(self):
+        if self._bars is None:
+            parts = [part for part in (self.finished, self.current) if part is not None]
+            self._bars = pd.concat(parts) if len(parts) > 1 else parts[0]
+        return self._bars
+
+
+class ResampleCache:
+    """One BarResampler per (symbol, interval), shared by every caller"""
+
+    def __init__(self):
+        self._resamplers = {}
+        self._lock = threading.Lock()
+
+    def resample(self, symbol, interval, source):
+        """Bars of `symbol` at `interval`, built from its base-interval `source` bars"""
+        rule = INTERVALS[interval][1]
+        if rule is None:
+            return source
+        with self._lock:
+            resampler = self._resamplers.get((symbol, interval))
+            if resampler is None:
+                resampler = self._resamplers[(symbol, interval)] = BarResampler(rule)
+        return resampler.update(source)
+
+    def clear(self):
+        with self._lock:
+            self._resamplers.clear()
@@ -0,0 +1,211 @@
+import itertools
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# Every column generation gets a unique token, so saved screens can tell
+# whether anything they depend on has changed since they were evaluated
+_generations = itertools.count(1)
+
+
+class SortedIndex:
+    """Row positions of a numeric column sorted by value; missing values are left out"""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        order = np.argsort(values, kind='stable')
+        self.order = order[~np.isnan(values[order])]
+        self.sorted = values[self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def between(self, low=None, high=None, inclusive='both'):
+        """Positions with low <= value <= high in O(log n + k); `inclusive` as in Series.between"""
+        start, end = 0, len(self.sorted)
+        if low is not None:
+            side = 'left' if inclusive in ('both', 'left') else 'right'
+            start = np.searchsorted(self.sorted, low, side=side)
+        if high is not None:
+            side = 'right' if inclusive in ('both', 'right') else 'left'
+            end = np.searchsorted(self.sorted, high, side=side)
+        return np.sort(self.order[start:max(start, end)])
+
+
+class Predicate:
+    """A screen condition; combine with & and |"""
+
+    def columns(self):
+        raise NotImplementedError
+
+    def select(self, screener):
+        """Sorted row positions of the screener's table matching the condition"""
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return All(self, other)
+
+    def __or__(self, other):
+        return Any(self, other)
+
+
+class Between(Predicate):
+    """Column value within [low, high]; either bound may be None"""
+
+    def __init__(self, column, low=None, high=None, inclusive='both'):
+        self.column = column
+        self.low = low
+        self.high = high
+        self.inclusive = inclusive
+
+    def columns(self):
+        return {self.column}
+
+    def select(self, screener):
+        return screener.index(self.column).between(self.low, self.high, self.inclusive)
+
+
+class Ratio(Between):
+    """Ratio of two columns within [low, high], e.g. price to 52-week high"""
+
+    def __init__(self, numerator, denominator, low=None, high=None, inclusive='both'):
+        super().__init__((numerator, denominator), low, high, inclusive)
+
+    def columns(self):
+        return set(self.column)
+
+
+class Flag(Between):
+    """Boolean column is True"""
+
+    def __init__(self, column):
+        super().__init__(column, low=1, high=1)
+
+
+class All(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def columns(self):
+        return set().union(*(p.columns() for p in self.predicates))
+
+    def select(self, screener):
+        return reduce(np.intersect1d, (p.select(screener) for p in self.predicates))
+
+
+class Any(All):
+    def select(self, screener):
+        return reduce(np.union1d, (p.select(screener) for p in self.predicates))
+
+
+def near_52week_high(threshold=0.95):
+    """Current price at or above `threshold` times the 52-week high"""
+    return Ratio('Current Price', '52W High', low=threshold)
+
+
+def near_52week_low(threshold=1.05):
+    """Current price at or below `threshold` times the 52-week low"""
+    return Ratio('Current Price', '52W Low', high=threshold)
+
+
+# Conditions offered by the technical screener
+SCREEN_CONDITIONS = {
+    'RSI < 30 (Oversold)': Between('RSI', high=30, inclusive='left'),
+    'RSI > 70 (Overbought)': Between('RSI', low=70, inclusive='right'),
+    'Bullish MACD Crossover': Flag('Bullish Crossover'),
+    'Bearish MACD Crossover': Flag('Bearish Crossover'),
+    'Above MA200': Flag('Above MA200'),
+    'Golden Cross (MA50 > MA200)': Flag('Golden Cross')
+}
+
+
+def screen_table(stock_table, indicator_screen):
+    """The stock table with the indicator columns alongside, row for row"""
+    if indicator_screen is None:
+        return stock_table.reset_index(drop=True)
+    indicators = indicator_screen.drop(columns=['Name'], errors='ignore').drop_duplicates('Symbol')
+    return stock_table.merge(indicators, on='Symbol', how='left')
+
+
+class Screener:
+    """Evaluates predicates against one table using sorted indexes built on demand.
+
+    Each column (or column ratio) is sorted the first time a predicate uses
+    it; threshold queries then cost a binary search plus the matching rows.
+    After a price refresh `update` returns a screener that keeps the indexes
+    of every column the refresh did not touch.
+    """
+
+    def __init__(self, table, indexes=None, generations=None):
+        self.table = table
+        self._indexes = dict(indexes or {})
+        self.generations = dict(generations or {})
+
+    def _values(self, key):
+        if isinstance(key, tuple):
+            numerator, denominator = key
+            return pd.to_numeric(self.table[numerator], errors='coerce') / pd.to_numeric(self.table[denominator], errors='coerce')
+        return pd.to_numeric(self.table[key], errors='coerce')
+
+    def index(self, key):
+        index = self._indexes.get(key)
+        if index is None:
+            index = SortedIndex(self._values(key))
+            self._indexes[key] = index
+        return index
+
+    def generation(self, column):
+        # Columns not yet seen date from this screener's table
+        return self.generations.setdefault(column, self.generations.setdefault(None, next(_generations)))
+
+    def select(self, predicate):
+        if predicate is None:
+            return np.arange(len(self.table))
+        return predicate.select(self)
+
+    def run(self, predicate):
+        """Matching rows of the table"""
+        return self.table.iloc[self.select(predicate)]
+
+    def update(self, table, changed_columns):
+        """Screener for a new table in which only `changed_columns` differ"""
+        if len(table) != len(self.table) or not np.array_equal(table['Symbol'], self.table['Symbol']):
+            return Screener(table)
+        changed = set(changed_columns)
+        indexes = {
+            key: index for key, index in self._indexes.items()
+            if not changed & (set(key) if isinstance(key, tuple) else {key})
+        }
+        generations = {column: gen for column, gen in self.generations.items() if column not in changed}
+        generation = next(_generations)
+        generations.update({column: generation for column in changed})
+        return Screener(table, indexes, generations)
+
+
+class SavedScreens:
+    """Named predicates whose results are re-evaluated only when their columns change"""
+
+    def __init__(self):
+        self.screens = {}
+        self._results = {}
+
+    def save(self, name, predicate):
+        self.screens[name] = predicate
+        self._results.pop(name, None)
+
+    def remove(self, name):
+        self.screens.pop(name, None)
+        self._results.pop(name, None)
+
+    def evaluate(self, screener):
+        """{name: matching row positions}, reusing results whose columns are unchanged"""
+        results = {}
+        for name, predicate in self.screens.items():
+            state = tuple(sorted((str(c), screener.generation(c)) for c in predicate.columns()))
+            cached = self._results.get(name)
+            if cached is None or cached[0] != state:
+                cached = (state, predicate.select(screener))
+                self._results[name] = cached
+            results[name] = cached[1]
+        return results
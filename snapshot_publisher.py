@@ -0,0 +1,288 @@
+"""Standalone refresher that publishes universe snapshots to memory-mapped files.
+
+Run it next to any number of app replicas:
+
+    python snapshot_publisher.py --root data/snapshots
+
+and start the apps with SNAPSHOT_DIR=data/snapshots. The apps then map the
+published files read-only and never contact the data provider themselves:
+daily bars come from the published panel, and the publisher also keeps
+the local 1-minute store current for the intraday charts.
+
+Layout: every snapshot is written to its own directory, named after the
+publish time so names never repeat across publisher restarts, holding one
+.npy file per array or table column plus meta.json. Once the directory is
+complete, the CURRENT file is atomically replaced with its name, so
+readers only ever see whole versions.
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_handler import StockDataHandler
+from data_service import DataService, Snapshot
+from metrics import PricePanel
+from screener import Screener, screen_table
+import perf
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+TABLES = ('history_metrics', 'indicator_screen', 'stock_table')
+KEEP_VERSIONS = 3
+
+
+def _write_table(directory, name, df):
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if values.dtype == object:
+            # Strings go to JSON; numbers and flags stay mappable arrays
+            filename = f"{name}.{i}.json"
+            with open(os.path.join(directory, filename), 'w') as f:
+                json.dump(values.tolist(), f)
+        else:
+            filename = f"{name}.{i}.npy"
+            np.save(os.path.join(directory, filename), values.to_numpy())
+        columns.append({'name': column, 'file': filename})
+    return columns
+
+
+def _read_table(directory, columns):
+    data = {}
+    for column in columns:
+        path = os.path.join(directory, column['file'])
+        if path.endswith('.json'):
+            with open(path) as f:
+                data[column['name']] = json.load(f)
+        else:
+            data[column['name']] = np.load(path, mmap_mode='r')
+    return pd.DataFrame(data)
+
+
+def write_snapshot(root, snapshot):
+    """Write a Snapshot as a new version directory and make it current"""
+    os.makedirs(root, exist_ok=True)
+    # Versions restart with the publisher, so directories are named by time;
+    # an existing name is never reused while a reader may have it mapped
+    stamp = time.time_ns()
+    while os.path.exists(os.path.join(root, f"v{stamp}")):
+        stamp += 1
+    name = f"v{stamp}"
+    tmp_dir = os.path.join(root, f".{name}.tmp")
+    os.makedirs(tmp_dir)
+
+    panel = snapshot.panel
+    np.save(os.path.join(tmp_dir, 'days.npy'), panel.days)
+    np.save(os.path.join(tmp_dir, 'bars.npy'), np.ascontiguousarray(panel.bars))
+
+    meta = {
+        'origin': snapshot.origin,
+        'version': snapshot.version,
+        'history_version': snapshot.history_version,
+        'prices_version': snapshot.prices_version,
+        'prices_at': snapshot.prices_at.isoformat() if snapshot.prices_at else None,
+        'updated_at': snapshot.updated_at.isoformat() if snapshot.updated_at else None,
+        'timezone': str(panel.tz) if panel.tz else None,
+        'symbols': panel.symbols,
+        'fields': list(panel.fields),
+        'tables': {table: _write_table(tmp_dir, table, getattr(snapshot, table)) for table in TABLES},
+        'quotes': {
+            'symbols': [str(s) for s in snapshot.quotes.index],
+            'values': snapshot.quotes.astype(float).tolist()
+        }
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    final_dir = os.path.join(root, name)
+    os.replace(tmp_dir, final_dir)
+
+    # Swap the pointer last: readers switch to the new version in one step
+    pointer_tmp = os.path.join(root, CURRENT_FILE + '.tmp')
+    with open(pointer_tmp, 'w') as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(root, CURRENT_FILE))
+
+    prune_snapshots(root)
+    return final_dir
+
+
+def prune_snapshots(root, keep=KEEP_VERSIONS):
+    """Delete all but the `keep` newest version directories, never the current one"""
+    with open(os.path.join(root, CURRENT_FILE)) as f:
+        current = f.read().strip()
+    versions = [d for d in os.listdir(root) if d.startswith('v') and os.path.isdir(os.path.join(root, d))]
+    versions.sort(key=lambda d: os.path.getmtime(os.path.join(root, d)), reverse=True)
+    # Readers still holding an older version keep their mapping after unlink
+    for old in versions[keep:]:
+        if old != current:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+
+class SnapshotReader:
+    """Maps the current published snapshot, re-mapping only when the version changes"""
+
+    def __init__(self, root):
+        self.root = root
+        self._name = None
+        self._snapshot = None
+
+    def current_name(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def read(self):
+        """Latest published Snapshot, or None if nothing has been published yet"""
+        name = self.current_name()
+        if name is None:
+            return self._snapshot
+        if name == self._name:
+            return self._snapshot
+
+        directory = os.path.join(self.root, name)
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+
+        # The float32 block is mapped, so replicas share its pages
+        panel = PricePanel(
+            np.load(os.path.join(directory, 'days.npy')),
+            meta['symbols'],
+            np.load(os.path.join(directory, 'bars.npy'), mmap_mode='r'),
+            meta['fields'],
+            meta['timezone']
+        )
+        tables = {table: _read_table(directory, columns) for table, columns in meta['tables'].items()}
+
+        now = time.monotonic()
+        self._snapshot = Snapshot(
+            # Snapshots written before origins were published fall back to their directory
+            origin=meta.get('origin') or name,
+            version=meta['version'],
+            history_version=meta['history_version'],
+            prices_version=meta['prices_version'],
+            panel=panel,
+            quotes=pd.Series(meta['quotes']['values'], index=meta['quotes']['symbols'], name='Current Price'),
+            history_updated=now,
+            prices_updated=now,
+            prices_at=datetime.fromisoformat(meta['prices_at']) if meta.get('prices_at') else None,
+            updated_at=datetime.fromisoformat(meta['updated_at']) if meta['updated_at'] else None,
+            screener=Screener(screen_table(tables['stock_table'], tables['indicator_screen'])),
+            **tables
+        )
+        self._name = name
+        return self._snapshot
+
+
+class MappedDataService:
+    """Drop-in for DataService that serves snapshots published by another process"""
+
+    def __init__(self, data_handler, root, wait_timeout=300):
+        self.data_handler = data_handler
+        self.reader = SnapshotReader(root)
+        self.wait_timeout = wait_timeout
+        self.last_error = None
+        perf.registry.register_collector('data_service', self.stats)
+
+    def snapshot(self):
+        """Current published snapshot, waiting for the first one if necessary"""
+        deadline = time.monotonic() + self.wait_timeout
+        snapshot = self.reader.read()
+        while snapshot is None:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No snapshot published in {self.reader.root}")
+            time.sleep(1)
+            snapshot = self.reader.read()
+        return snapshot
+
+    def request_refresh(self, max_price_age, max_history_age=None):
+        # The publisher decides when to refresh; just pick up new versions
+        try:
+            self.reader.read()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = f"Error reading snapshot: {str(e)}"
+
+    def refresh_history(self):
+        return self.snapshot()
+
+    def refresh_prices(self):
+        return self.snapshot()
+
+    def stats(self):
+        snapshot = self.reader.read()
+        return {'version': snapshot.version if snapshot else 0, 'source': self.reader.root}
+
+
+def run_publisher(service, root, price_interval=60, history_interval=3600, intraday_interval=300,
+                  stop_event=None):
+    """Refresh through `service` on a fixed cadence and publish every new snapshot.
+
+    Every `intraday_interval` seconds (never when None) the 1-minute store
+    the replicas read their intraday bars from is topped up as well.
+    """
+    stop_event = stop_event or threading.Event()
+    next_history = 0.0
+    next_intraday = 0.0
+    published = None
+    while not stop_event.is_set():
+        now = time.monotonic()
+        try:
+            if now >= next_history:
+                service.refresh_history()
+                next_history = now + history_interval
+            service.refresh_prices()
+            snapshot = service.snapshot()
+            if snapshot.version != published:
+                directory = write_snapshot(root, snapshot)
+                published = snapshot.version
+                logger.info("Published snapshot v%s (%s stocks) to %s",
+                            snapshot.version, len(snapshot.stock_table), directory)
+        except Exception as e:
+            logger.error(f"Error publishing snapshot: {str(e)}")
+        if intraday_interval is not None and now >= next_intraday:
+            try:
+                service.data_handler.update_intraday()
+            except Exception as e:
+                logger.error(f"Error updating intraday bars: {str(e)}")
+            next_intraday = now + intraday_interval
+        stop_event.wait(price_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish Nifty 500 snapshots for the Streamlit app")
+    parser.add_argument('--root', default='data/snapshots', help="Directory the snapshots are written to")
+    parser.add_argument('--price-interval', type=float, default=60, help="Seconds between price refreshes")
+    parser.add_argument('--history-interval', type=float, default=3600, help="Seconds between history refreshes")
+    parser.add_argument('--intraday-interval', type=float, default=300,
+                        help="Seconds between 1-minute bar updates (0 disables them)")
+    parser.add_argument('--metrics-port', type=int, help="Serve timing metrics on this port (/metrics)")
+    parser.add_argument('--metrics-file', help="Write timing metrics to this file every 15s")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    if args.metrics_port or args.metrics_file:
+        perf.registry.enabled = True
+    if args.metrics_port:
+        perf.serve(args.metrics_port)
+    if args.metrics_file:
+        perf.export_to_file(args.metrics_file)
+
+    service = DataService(StockDataHandler(), history_interval=args.history_interval)
+    run_publisher(service, args.root, args.price_interval, args.history_interval,
+                  args.intraday_interval or None)
+
+
+if __name__ == "__main__":
+    main()
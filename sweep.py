@@ -0,0 +1,239 @@
+"""Parallel parameter sweeps of the backtest strategies over the universe.
+
+Every strategy is swept over its own grid of indicator periods and rule
+thresholds; each grid point is one task for a process pool. The close
+panel is copied into shared memory once and every worker maps it, so
+tasks carry only their parameters. Finished tasks are appended to a JSON
+lines file as they arrive; running the same sweep again skips every
+task already in the file, so an interrupted sweep resumes where it
+stopped.
+
+    python sweep.py --store data/ohlcv --out data/sweeps/default.jsonl
+    python sweep.py --strategy "MACD trend" --workers 16
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import itertools
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from backtest import STRATEGIES, DEFAULT_COST, backtest
+from technical_analysis import calculate_panel_indicators
+
+# Grids around the dashboard defaults (RSI 14 30/70, MACD 12/26/9, MA200, Bollinger 20/2)
+GRIDS = {
+    'RSI reversion': {'rsi_periods': [7, 14, 21], 'oversold': [20, 25, 30], 'overbought': [65, 70, 80]},
+    'MACD trend': {'macd_fast': [8, 12, 16], 'macd_slow': [21, 26, 34], 'macd_signal': [7, 9, 12]},
+    'Above MA200': {'ma_windows': [(50,), (100,), (150,), (200,), (250,)]},
+    'Bollinger reversion': {'bb_window': [10, 20, 30], 'bb_std': [1.5, 2.0, 2.5]}
+}
+
+INDICATOR_PARAMS = set(inspect.signature(calculate_panel_indicators).parameters) - {'close'}
+
+
+def expand_grid(grid):
+    """Every combination of a {param: [values]} grid, as dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def sweep_tasks(grids=None):
+    """(strategy, params) for every point of every grid; MACD needs fast < slow"""
+    grids = GRIDS if grids is None else grids
+    return [
+        (strategy, params) for strategy, grid in grids.items() for params in expand_grid(grid)
+        if params.get('macd_fast', 0) < params.get('macd_slow', 1)
+    ]
+
+
+def task_key(strategy, params):
+    return json.dumps([strategy, params], sort_keys=True)
+
+
+class SharedClose:
+    """A dates x symbols float64 close array placed in shared memory once.
+
+    `spec` is all a worker needs to map it; the creating process unlinks
+    the segment on close.
+    """
+
+    def __init__(self, close):
+        close = np.asarray(close, dtype=float)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(close.nbytes, 1))
+        self.array = np.ndarray(close.shape, dtype=close.dtype, buffer=self.shm.buf)
+        self.array[:] = close
+        self.spec = (self.shm.name, close.shape, close.dtype.str)
+
+    def close(self):
+        self.array = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def attach_close(spec):
+    """Map a SharedClose from another process, returns (shared memory, array)"""
+    name, shape, dtype = spec
+    # Pool workers share the creator's resource tracker, which unlinks the
+    # segment only if the creator never does
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+_worker = {}
+
+
+def _init_worker(spec, dates, symbols, cost):
+    shm, close = attach_close(spec)
+    _worker.update(shm=shm, close=close, dates=dates, symbols=symbols, cost=cost)
+
+
+def evaluate(close, dates, symbols, strategy, params, cost=DEFAULT_COST):
+    """Backtest one strategy at one grid point, returns a flat result row"""
+    indicator_params = {k: v for k, v in params.items() if k in INDICATOR_PARAMS}
+    rule_params = {k: v for k, v in params.items() if k not in INDICATOR_PARAMS}
+    indicators = calculate_panel_indicators(close, **indicator_params)
+    positions = STRATEGIES[strategy](close, indicators, **rule_params)
+    result = backtest(strategy, dates, symbols, close, positions, cost)
+    return {
+        'strategy': strategy,
+        'params': params,
+        **result.stats,
+        'Median Sharpe': float(result.summary['Sharpe'].median()),
+        'Beat Buy & Hold': float((result.summary['Total Return'] > result.summary['Buy & Hold']).mean())
+    }
+
+
+def _run_task(strategy, params):
+    start = time.perf_counter()
+    row = evaluate(_worker['close'], _worker['dates'], _worker['symbols'], strategy, params, _worker['cost'])
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+
+def load_results(path):
+    """Rows already written to a results file; a torn last line is ignored"""
+    rows = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+def results_frame(rows):
+    """Result rows as a DataFrame with one column per parameter"""
+    if not rows:
+        return pd.DataFrame()
+    params = pd.json_normalize([row['params'] for row in rows])
+    stats = pd.DataFrame([{k: v for k, v in row.items() if k != 'params'} for row in rows])
+    return pd.concat([stats[['strategy']], params, stats.drop(columns='strategy')], axis=1)
+
+
+def run_sweep(panel, path, tasks=None, workers=None, cost=DEFAULT_COST, progress=None):
+    """Run every task not yet in `path` on a process pool and append each result as it finishes.
+
+    `progress(done, total, row)` is called after every task, counting the
+    tasks recovered from the file as done. Returns all rows in the file.
+    """
+    tasks = sweep_tasks() if tasks is None else tasks
+    rows = load_results(path)
+    done = {task_key(row['strategy'], row['params']) for row in rows}
+    # Tuples come back from JSON as lists
+    pending = [(s, p) for s, p in tasks if task_key(s, json.loads(json.dumps(p))) not in done]
+    finished = len(tasks) - len(pending)
+    if not pending:
+        return rows
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Rewrite what was read, dropping a torn last line, then append
+    with open(path, 'w') as f:
+        f.writelines(json.dumps(row) + '\n' for row in rows)
+
+    with SharedClose(panel['Close']) as shared, open(path, 'a') as out, ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(shared.spec, panel.dates, panel.symbols, cost)
+    ) as pool:
+        futures = [pool.submit(_run_task, strategy, params) for strategy, params in pending]
+        try:
+            for future in as_completed(futures):
+                line = json.dumps(future.result())
+                out.write(line + '\n')
+                out.flush()
+                rows.append(json.loads(line))
+                finished += 1
+                if progress is not None:
+                    progress(finished, len(tasks), rows[-1])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return rows
+
+
+def main():
+    from metrics import PricePanel
+    from ohlcv_store import OHLCVStore
+
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over the local OHLCV store")
+    parser.add_argument('--store', default='data/ohlcv')
+    parser.add_argument('--out', default='data/sweeps/default.jsonl', help="Results file; reruns resume from it")
+    parser.add_argument('--strategy', action='append', choices=list(GRIDS), help="Only sweep these strategies")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--cost', type=float, default=DEFAULT_COST, help="One-way cost per trade")
+    parser.add_argument('--top', type=int, default=5, help="Best grid points to print per strategy")
+    args = parser.parse_args()
+
+    store = OHLCVStore(args.store)
+    panel = PricePanel.from_histories({symbol: store.load(symbol) for symbol in store.symbols()})
+    if not panel.symbols:
+        parser.error(f"No stored history in {args.store}")
+    grids = {name: GRIDS[name] for name in args.strategy} if args.strategy else GRIDS
+    started = time.monotonic()
+    resumed = []
+
+    def report(done, total, row):
+        if not resumed:
+            resumed.append(done - 1)
+        elapsed = time.monotonic() - started
+        eta = elapsed / (done - resumed[0]) * (total - done)
+        print(f"[{done}/{total}] {row['strategy']} {row['params']} Sharpe {row['Sharpe']:.2f} "
+              f"({elapsed:.0f}s elapsed, ~{eta:.0f}s left)", file=sys.stderr)
+
+    try:
+        rows = run_sweep(panel, args.out, sweep_tasks(grids), args.workers, args.cost, report)
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun the same command to resume from {args.out}", file=sys.stderr)
+        return 130
+
+    columns = ['Total Return', 'Sharpe', 'Max Drawdown', 'Turnover', 'Median Sharpe']
+    for strategy in grids:
+        results = results_frame([row for row in rows if row['strategy'] == strategy])
+        print(f"\n{strategy}")
+        print(results.nlargest(args.top, 'Sharpe')[list(grids[strategy]) + columns].round(3).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import re
+import bisect
+from collections import defaultdict
+
+import numpy as np
+
+# Minimum trigram similarity for a fuzzy match ("relaince" -> "reliance" is 0.56)
+FUZZY_THRESHOLD = 0.5
+
+# Rank of each kind of match; fuzzy matches score their similarity (0-1)
+EXACT_SCORE = 4.0
+SYMBOL_PREFIX_SCORE = 3.0
+NAME_PREFIX_SCORE = 2.5
+WORD_PREFIX_SCORE = 2.0
+SUBSTRING_SCORE = 1.5
+
+
+def normalize(text):
+    """Lower-case text with the exchange suffix removed and punctuation folded to spaces"""
+    text = str(text).lower().strip()
+    if text.endswith('.ns'):
+        text = text[:-3]
+    return ' '.join(re.findall(r'[a-z0-9&]+', text))
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolIndex:
+    """Ranked prefix and typo-tolerant search over symbols and company names.
+
+    Prefix lookups bisect a sorted array of keys: the symbol, the full name
+    and the name starting at each of its words, so "consultancy" finds
+    "Tata Consultancy Services". Any other symbol or name containing the
+    query ranks after those, so the matches are the same as a substring
+    filter. Only when nothing contains the query, fuzzy lookups use a
+    trigram index over the individual words and score candidates by Dice
+    similarity, so "relaince" still finds Reliance.
+    """
+
+    def __init__(self, symbols, names):
+        self.symbols = [str(s) for s in symbols]
+        self.names = [str(n).strip() for n in names]
+        self._texts = [(normalize(s), normalize(n)) for s, n in zip(self.symbols, self.names)]
+
+        keys = []
+        tokens = []
+        for doc, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            symbol_key = normalize(symbol)
+            keys.append((symbol_key, doc, SYMBOL_PREFIX_SCORE))
+            tokens.append((symbol_key, doc))
+            words = normalize(name).split()
+            for i in range(len(words)):
+                keys.append((' '.join(words[i:]), doc, NAME_PREFIX_SCORE if i == 0 else WORD_PREFIX_SCORE))
+                tokens.append((words[i], doc))
+        keys.sort()
+        self._keys = [key for key, _, _ in keys]
+        self._key_docs = np.array([doc for _, doc, _ in keys], dtype=np.int64)
+        self._key_scores = np.array([score for _, _, score in keys])
+
+        postings = defaultdict(list)
+        token_ids = {}
+        for token, doc in tokens:
+            if token not in token_ids:
+                token_ids[token] = len(token_ids)
+                for gram in trigrams(token):
+                    postings[gram].append(token_ids[token])
+        self._token_docs = [[] for _ in token_ids]
+        for token, doc in tokens:
+            self._token_docs[token_ids[token]].append(doc)
+        self._token_sizes = np.array([len(trigrams(token)) for token in token_ids])
+        self._postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df['Symbol'], df['Name'])
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _prefix_matches(self, query, scores):
+        start = bisect.bisect_left(self._keys, query)
+        end = start
+        while end < len(self._keys) and self._keys[end].startswith(query):
+            doc = int(self._key_docs[end])
+            score = self._key_scores[end]
+            if self._keys[end] == query and score == SYMBOL_PREFIX_SCORE:
+                score = EXACT_SCORE
+            if score > scores.get(doc, 0.0):
+                scores[doc] = score
+            end += 1
+
+    def _substring_matches(self, query, scores):
+        for doc, (symbol, name) in enumerate(self._texts):
+            if doc not in scores and (query in symbol or query in name):
+                scores[doc] = SUBSTRING_SCORE
+
+    def _fuzzy_matches(self, query, scores):
+        query_grams = trigrams(query.replace(' ', ''))
+        postings = [self._postings[g] for g in query_grams if g in self._postings]
+        if not postings:
+            return
+        # Cost follows the length of the postings, not the size of the universe
+        candidates, shared = np.unique(np.concatenate(postings), return_counts=True)
+        similarity = 2.0 * shared / (len(query_grams) + self._token_sizes[candidates])
+        close = similarity >= FUZZY_THRESHOLD
+        for token_id, score in zip(candidates[close], similarity[close]):
+            for doc in self._token_docs[token_id]:
+                if score > scores.get(doc, 0.0):
+                    scores[doc] = float(score)
+
+    def search(self, query, limit=20):
+        """Symbols matching the query, best match first; limit=None returns every match"""
+        query = normalize(query)
+        if not query:
+            return []
+        scores = {}
+        self._prefix_matches(query, scores)
+        self._substring_matches(query, scores)
+        # Typo tolerance only for queries nothing contains
+        if len(query) >= 3 and not scores:
+            self._fuzzy_matches(query, scores)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.symbols[item[0]]))
+        # The symbol list may repeat a symbol; keep its best-ranked entry
+        results = dict.fromkeys(self.symbols[doc] for doc, _ in ranked)
+        return list(results)[:limit] if limit is not None else list(results)
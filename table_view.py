@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Display formats of the stock table in main.py
+STOCK_TABLE_FORMATS = {
+    'Current Price': '₹{:.2f}',
+    'Price Change %': '{:+.2f}%',
+    '52W High': '₹{:.2f}',
+    '52W Low': '₹{:.2f}',
+    'From 52W High %': '{:.1f}%',
+    'From 52W Low %': '{:+.1f}%',
+    '1y_return': '{:.2%}',
+    '2y_return': '{:.2%}',
+    '5y_return': '{:.2%}'
+}
+
+# Columns coloured red when negative and green otherwise
+STOCK_TABLE_SIGNED = ['Price Change %', 'From 52W High %', 'From 52W Low %', '1y_return', '2y_return', '5y_return']
+
+
+class TableView:
+    """Pre-formatted, sortable and paginated view of one table snapshot.
+
+    Display strings, cell colours and per-column sort orders are computed
+    once when the view is built (once per snapshot version). Rendering a
+    page then only slices those arrays, so its cost depends on the page
+    size and not on the size of the universe.
+    """
+
+    def __init__(self, df, formats, signed_columns=(), na_rep='N/A'):
+        self.df = df.reset_index(drop=True)
+        self.columns = list(self.df.columns)
+        self.display = {}
+        for column in self.columns:
+            values = self.df[column]
+            fmt = formats.get(column)
+            if fmt is None:
+                self.display[column] = values.astype(str).to_numpy()
+            else:
+                self.display[column] = np.array([na_rep if pd.isna(v) else fmt.format(v) for v in values], dtype=object)
+
+        # Same rule as the old per-cell lambda: only negative numbers are red
+        self.styles = {
+            column: np.where(self.df[column].to_numpy(dtype=float) < 0, 'color: red', 'color: green')
+            for column in signed_columns
+        }
+        self._sort_orders = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def sort_order(self, column, ascending=True):
+        """Row positions sorted by a column (missing values last), cached per column"""
+        if column not in self._sort_orders:
+            self._sort_orders[column] = self.df[column].sort_values(kind='stable', na_position='last').index.to_numpy()
+        order = self._sort_orders[column]
+        if ascending:
+            return order
+        # Reverse the valid part only, keeping missing values at the end
+        valid = self.df[column].notna().to_numpy()[order]
+        return np.concatenate([order[valid][::-1], order[~valid]])
+
+    def page(self, rows=None, sort_by=None, ascending=True, page=0, page_size=50):
+        """Positions of the rows shown on one page.
+
+        `rows` restricts the view to a subset of row positions (for example
+        after filtering); pages are numbered from 0.
+        """
+        if sort_by is not None:
+            order = self.sort_order(sort_by, ascending)
+            if rows is not None:
+                selected = np.zeros(len(self.df), dtype=bool)
+                selected[rows] = True
+                order = order[selected[order]]
+        else:
+            order = np.arange(len(self.df)) if rows is None else np.asarray(rows)
+        return order[page * page_size:(page + 1) * page_size]
+
+    def render(self, positions, columns=None):
+        """Styler for the given row positions, built from the precomputed strings and colours"""
+        columns = columns or self.columns
+        frame = pd.DataFrame({column: self.display[column][positions] for column in columns})
+        styles = pd.DataFrame({
+            column: self.styles[column][positions] if column in self.styles else ''
+            for column in columns
+        })
+        return frame.style.apply(lambda _: styles, axis=None).set_properties(**{
+            'background-color': 'white',
+            'font-family': 'sans-serif'
+        })
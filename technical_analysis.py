@@ -1,3 +1,5 @@
+import math
+from collections import deque
 import pandas as pd
 import numpy as np
 
@@ -35,20 +37,474 @@ def calculate_bollinger_bands(data, window=20):
     lower_band = ma - (std * 2)
     return upper_band, ma, lower_band
 
-def calculate_all_indicators(data):
+def calculate_all_indicators(data, rsi_periods=14, macd_fast=12, macd_slow=26, macd_signal=9, bb_window=20):
     """Calculate all technical indicators"""
     indicators = {}
     
     # RSI
-    indicators['RSI'] = calculate_rsi(data)
+    indicators['RSI'] = calculate_rsi(data, rsi_periods)
     
     # MACD
-    indicators['MACD'], indicators['Signal'], indicators['Histogram'] = calculate_macd(data)
+    indicators['MACD'], indicators['Signal'], indicators['Histogram'] = calculate_macd(data, macd_fast, macd_slow, macd_signal)
     
     # Moving Averages
     indicators['MA20'], indicators['MA50'], indicators['MA200'] = calculate_moving_averages(data)
     
     # Bollinger Bands
-    indicators['BB_Upper'], indicators['BB_Middle'], indicators['BB_Lower'] = calculate_bollinger_bands(data)
+    indicators['BB_Upper'], indicators['BB_Middle'], indicators['BB_Lower'] = calculate_bollinger_bands(data, bb_window)
     
     return indicators
+
+
+
+def _rolling_sum_2d(values, window):
+    """Rolling sum down each column of a 2-D array, NaN until `window` valid rows"""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    sums[counts < window] = np.nan
+    return sums
+
+
+def _rolling_mean_2d(values, window):
+    return _rolling_sum_2d(values, window) / window
+
+
+def _rolling_std_2d(values, window):
+    # Center each column first so the sum-of-squares form keeps its precision
+    centered = values - np.nanmean(values, axis=0)
+    s1 = _rolling_sum_2d(centered, window)
+    s2 = _rolling_sum_2d(centered ** 2, window)
+    return np.sqrt(np.maximum(s2 - s1 ** 2 / window, 0.0) / (window - 1))
+
+
+def _ewm_2d(values, span):
+    """ewm(span, adjust=False).mean() down each column, one vector step per row"""
+    alpha = 2 / (span + 1)
+    out = np.empty_like(values)
+    state = np.full(values.shape[1], np.nan)
+    for i, row in enumerate(values):
+        state = np.where(np.isnan(state), row, np.where(np.isnan(row), state, state + alpha * (row - state)))
+        out[i] = state
+    return out
+
+
+def _has_gaps(valid):
+    """Whether any column has a missing row between its first and last valid rows"""
+    first = np.argmax(valid, axis=0)
+    last = len(valid) - 1 - np.argmax(valid[::-1], axis=0)
+    return bool(np.any(valid.sum(axis=0) < np.where(valid.any(axis=0), last - first + 1, 0)))
+
+
+def calculate_panel_indicators(close, rsi_periods=14, macd_fast=12, macd_slow=26, macd_signal=9,
+                               ma_windows=(20, 50, 200), bb_window=20, bb_std=2):
+    """Calculate all technical indicators for a dates x symbols close array at once.
+
+    Rows are the union of every symbol's dates, so a symbol can be missing
+    a day the others traded. Indicators run over each symbol's own closes,
+    as calculate_all_indicators does on its history, and are NaN on the
+    rows it is missing.
+    """
+    close = np.asarray(close, dtype=float)
+    valid = ~np.isnan(close)
+    if not _has_gaps(valid):
+        return _panel_indicators(close, rsi_periods, macd_fast, macd_slow, macd_signal,
+                                 ma_windows, bb_window, bb_std)
+
+    # Move each column's closes up past its gaps (a stable sort keeps their
+    # order), compute there and put the results back on the original rows
+    order = np.argsort(~valid, axis=0, kind='stable')
+    compact = np.take_along_axis(close, order, axis=0)
+    indicators = _panel_indicators(compact, rsi_periods, macd_fast, macd_slow, macd_signal,
+                                   ma_windows, bb_window, bb_std)
+    for name, values in indicators.items():
+        expanded = np.full_like(values, np.nan)
+        np.put_along_axis(expanded, order, values, axis=0)
+        expanded[~valid] = np.nan
+        indicators[name] = expanded
+    return indicators
+
+
+def _panel_indicators(close, rsi_periods, macd_fast, macd_slow, macd_signal, ma_windows, bb_window, bb_std):
+    """Indicators of a close array whose columns have no missing rows between closes"""
+    indicators = {}
+
+    # RSI
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    gain = _rolling_mean_2d(np.where(delta > 0, delta, 0.0), rsi_periods)
+    loss = _rolling_mean_2d(np.where(delta < 0, -delta, 0.0), rsi_periods)
+    # Rows before a symbol's first `rsi_periods` closes have no RSI yet
+    listed = np.cumsum(~np.isnan(close), axis=0) >= rsi_periods
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indicators['RSI'] = np.where(listed, 100 - (100 / (1 + gain / loss)), np.nan)
+
+    # MACD
+    indicators['MACD'] = _ewm_2d(close, macd_fast) - _ewm_2d(close, macd_slow)
+    indicators['Signal'] = _ewm_2d(indicators['MACD'], macd_signal)
+    indicators['Histogram'] = indicators['MACD'] - indicators['Signal']
+
+    # Moving Averages
+    for window in ma_windows:
+        indicators[f"MA{window}"] = _rolling_mean_2d(close, window)
+
+    # Bollinger Bands
+    middle = _rolling_mean_2d(close, bb_window)
+    std = _rolling_std_2d(close, bb_window)
+    indicators['BB_Upper'], indicators['BB_Middle'], indicators['BB_Lower'] = (
+        middle + std * bb_std, middle, middle - std * bb_std
+    )
+
+    return indicators
+
+
+def calculate_indicator_screen(panel, indicators=None):
+    """Latest indicator values and signal flags for every symbol of a PricePanel.
+
+    Values are read at each symbol's own last bar; crossover flags compare
+    that bar with the symbol's previous bar, skipping days it did not trade.
+    """
+    # One float64 copy of the float32 panel closes serves every indicator
+    close = np.asarray(panel['Close'], dtype=float)
+    if indicators is None:
+        indicators = calculate_panel_indicators(close)
+
+    columns = np.arange(close.shape[1])
+    valid = ~np.isnan(close)
+    last = len(close) - 1 - np.argmax(valid[::-1], axis=0)
+    rows = np.where(valid, np.arange(len(close))[:, None], -1)
+    rows[last, columns] = -1
+    previous = np.maximum(rows.max(axis=0), 0)
+
+    def at(values, rows):
+        return values[rows, columns]
+
+    screen = pd.DataFrame({'Symbol': panel.symbols, 'Close': at(close, last)})
+    for name, values in indicators.items():
+        screen[name] = at(values, last)
+
+    macd_above = indicators['MACD'] > indicators['Signal']
+    screen['RSI Status'] = np.select([screen['RSI'] < 30, screen['RSI'] > 70], ['Oversold', 'Overbought'], 'Neutral')
+    screen['MACD Status'] = np.where(at(macd_above, last), 'Bullish', 'Bearish')
+    screen['Bullish Crossover'] = at(macd_above, last) & ~at(macd_above, previous)
+    screen['Bearish Crossover'] = ~at(macd_above, last) & at(macd_above, previous)
+    screen['Above MA200'] = screen['Close'] > screen['MA200']
+    if 'MA50' in indicators and 'MA200' in indicators:
+        ma50_above = indicators['MA50'] > indicators['MA200']
+        screen['Golden Cross'] = at(ma50_above, last) & ~at(ma50_above, previous)
+    return screen[valid.any(axis=0)].reset_index(drop=True)
+
+class RollingMean:
+    """Rolling mean over a fixed window, updated in O(1) from a running sum"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.nan_count = 0
+        self._updates = 0
+
+    def _push(self, value):
+        self.values.append(value)
+        if math.isnan(value):
+            self.nan_count += 1
+        else:
+            self.total += value
+
+    def _pop(self, left):
+        value = self.values.popleft() if left else self.values.pop()
+        if math.isnan(value):
+            self.nan_count -= 1
+        else:
+            self.total -= value
+
+    def bootstrap(self, series):
+        """Seed the window from the tail of a history"""
+        self.values.clear()
+        self.total = 0.0
+        self.nan_count = 0
+        for value in series.iloc[-self.window:]:
+            self._push(float(value))
+        return self.value
+
+    def update(self, value, replace=False):
+        """Add a new value, or revise the latest one when replace=True"""
+        if replace and self.values:
+            self._pop(left=False)
+        self._push(float(value))
+        if len(self.values) > self.window:
+            self._pop(left=True)
+
+        # Re-sum now and then so floating point error cannot accumulate
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self.total = math.fsum(v for v in self.values if not math.isnan(v))
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.values) < self.window or self.nan_count:
+            return np.nan
+        return self.total / self.window
+
+
+class RollingStd:
+    """Rolling sample standard deviation using Welford's add/remove updates.
+
+    Like pandas, the value is NaN while the window holds a NaN; NaN values
+    are kept out of the running mean and M2.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.count = 0
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._updates = 0
+
+    def _add(self, value):
+        self.values.append(value)
+        if math.isnan(value):
+            self.nan_count += 1
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, left):
+        value = self.values.popleft() if left else self.values.pop()
+        if math.isnan(value):
+            self.nan_count -= 1
+            return
+        self.count -= 1
+        if self.count == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    def _resync(self):
+        values = np.fromiter(self.values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count = len(values)
+        self.nan_count = len(self.values) - self.count
+        self.mean = values.mean() if len(values) else 0.0
+        self.m2 = ((values - self.mean) ** 2).sum() if len(values) else 0.0
+
+    def bootstrap(self, series):
+        """Seed the window from the tail of a history"""
+        self.values = deque(float(v) for v in series.iloc[-self.window:])
+        self._resync()
+        return self.value
+
+    def update(self, value, replace=False):
+        """Add a new value, or revise the latest one when replace=True"""
+        if replace and self.values:
+            self._remove(left=False)
+        self._add(float(value))
+        if len(self.values) > self.window:
+            self._remove(left=True)
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self._resync()
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.values) < self.window or self.nan_count:
+            return np.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+
+class EMA:
+    """Exponential moving average with carried state, matching ewm(span, adjust=False).
+
+    As in pandas (ignore_na=False), a NaN input repeats the last value but
+    still ages it, so the next observation gets more weight after a gap.
+    `weight` is the weight of the current value against a new input's alpha.
+    """
+
+    def __init__(self, span):
+        self.alpha = 2 / (span + 1)
+        self.value = np.nan
+        self.weight = 1.0
+        self.previous = (np.nan, 1.0)
+
+    def _aged_weight(self, series):
+        """Weight of the last value after the inputs missing since it"""
+        missing = series.isna().to_numpy()[::-1]
+        trailing = int(missing.argmin()) if not missing.all() else len(missing)
+        return (1 - self.alpha) ** trailing
+
+    def bootstrap(self, series):
+        """Seed the state from a history, returns the full EMA series"""
+        ema = series.ewm(span=2 / self.alpha - 1, adjust=False).mean()
+        self.value = float(ema.iloc[-1]) if len(ema) else np.nan
+        self.weight = self._aged_weight(series)
+        if len(ema) > 1:
+            self.previous = (float(ema.iloc[-2]), self._aged_weight(series.iloc[:-1]))
+        else:
+            self.previous = (np.nan, 1.0)
+        return ema
+
+    def update(self, value, replace=False):
+        """Add a new value, or revise the latest one when replace=True"""
+        if not replace:
+            self.previous = (self.value, self.weight)
+        base, weight = self.previous
+        if math.isnan(base):
+            self.value, self.weight = value, 1.0
+            return self.value
+        weight *= 1 - self.alpha
+        if not math.isnan(value):
+            if value != base:
+                base = (weight * base + self.alpha * value) / (weight + self.alpha)
+            weight = 1.0
+        self.value, self.weight = base, weight
+        return self.value
+
+
+class RSIIndicator:
+    """Incremental counterpart of calculate_rsi"""
+
+    def __init__(self, periods=14):
+        self.gains = RollingMean(periods)
+        self.losses = RollingMean(periods)
+        self.last_close = np.nan
+        self.previous_close = np.nan
+
+    def bootstrap(self, data):
+        close = data['Close']
+        delta = close.diff()
+        # Same first-bar quirk as calculate_rsi: the NaN delta counts as 0
+        self.gains.bootstrap(delta.where(delta > 0, 0))
+        self.losses.bootstrap(-delta.where(delta < 0, 0))
+        self.last_close = float(close.iloc[-1]) if len(close) else np.nan
+        self.previous_close = float(close.iloc[-2]) if len(close) > 1 else np.nan
+        return self.value
+
+    def update(self, close, replace=False):
+        if not replace:
+            self.previous_close = self.last_close
+        self.last_close = close
+        delta = close - self.previous_close
+        self.gains.update(delta if delta > 0 else 0.0, replace)
+        self.losses.update(-delta if delta < 0 else 0.0, replace)
+        return self.value
+
+    @property
+    def value(self):
+        gain, loss = self.gains.value, self.losses.value
+        if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+            return np.nan
+        if loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+
+class MACDIndicator:
+    """Incremental counterpart of calculate_macd"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def bootstrap(self, data):
+        macd = self.fast.bootstrap(data['Close']) - self.slow.bootstrap(data['Close'])
+        self.signal.bootstrap(macd)
+        return self.value
+
+    def update(self, close, replace=False):
+        macd = self.fast.update(close, replace) - self.slow.update(close, replace)
+        self.signal.update(macd, replace)
+        return self.value
+
+    @property
+    def value(self):
+        macd = self.fast.value - self.slow.value
+        return macd, self.signal.value, macd - self.signal.value
+
+
+class BollingerBandsIndicator:
+    """Incremental counterpart of calculate_bollinger_bands"""
+
+    def __init__(self, window=20, num_std=2):
+        self.mean = RollingMean(window)
+        self.std = RollingStd(window)
+        self.num_std = num_std
+
+    def bootstrap(self, data):
+        self.mean.bootstrap(data['Close'])
+        self.std.bootstrap(data['Close'])
+        return self.value
+
+    def update(self, close, replace=False):
+        self.mean.update(close, replace)
+        self.std.update(close, replace)
+        return self.value
+
+    @property
+    def value(self):
+        ma, std = self.mean.value, self.std.value
+        return ma + std * self.num_std, ma, ma - std * self.num_std
+
+
+class IncrementalIndicators:
+    """Stateful version of calculate_all_indicators.
+
+    `bootstrap` runs the pandas functions once over the history and seeds
+    every indicator's state from it; afterwards `update` folds in one bar in
+    O(1) and returns the latest value of each indicator under the same keys
+    calculate_all_indicators uses. Pass replace=True to revise the current,
+    still-forming bar instead of appending a new one.
+    """
+
+    def __init__(self, rsi_periods=14, macd_fast=12, macd_slow=26, macd_signal=9,
+                 ma_windows=(20, 50, 200), bb_window=20):
+        self.rsi = RSIIndicator(rsi_periods)
+        self.macd = MACDIndicator(macd_fast, macd_slow, macd_signal)
+        self.moving_averages = {f"MA{window}": RollingMean(window) for window in ma_windows}
+        self.bollinger = BollingerBandsIndicator(bb_window)
+        self.params = dict(rsi_periods=rsi_periods, macd_fast=macd_fast, macd_slow=macd_slow,
+                           macd_signal=macd_signal, bb_window=bb_window)
+
+    @classmethod
+    def from_history(cls, data, **params):
+        engine = cls(**params)
+        engine.bootstrap(data)
+        return engine
+
+    def bootstrap(self, data):
+        """Seed state from a full history, returns calculate_all_indicators(data)"""
+        self.rsi.bootstrap(data)
+        self.macd.bootstrap(data)
+        for ma in self.moving_averages.values():
+            ma.bootstrap(data['Close'])
+        self.bollinger.bootstrap(data)
+        return calculate_all_indicators(data, **self.params)
+
+    def update(self, bar, replace=False):
+        """Fold in one bar (anything with a 'Close' entry) and return the latest values"""
+        close = float(bar['Close'])
+        self.rsi.update(close, replace)
+        self.macd.update(close, replace)
+        for ma in self.moving_averages.values():
+            ma.update(close, replace)
+        self.bollinger.update(close, replace)
+        return self.latest()
+
+    def latest(self):
+        latest = {'RSI': self.rsi.value}
+        latest['MACD'], latest['Signal'], latest['Histogram'] = self.macd.value
+        for name, ma in self.moving_averages.items():
+            latest[name] = ma.value
+        latest['BB_Upper'], latest['BB_Middle'], latest['BB_Lower'] = self.bollinger.value
+        return latest
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import backtest, hold_between
+
+
+def reference_equity(close, positions, cost):
+    """Per-bar loop: the position decided at each close is held over the next bar"""
+    equity = np.ones(len(close))
+    held = 0.0
+    last_close = np.nan
+    last_listed = max(t for t in range(len(close)) if not np.isnan(close[t]))
+    for t in range(len(close)):
+        price = close[t] if not np.isnan(close[t]) else last_close
+        listed = t > 0 and not np.isnan(last_close) and t <= last_listed
+        new_held = positions[t - 1] if listed else 0.0
+        growth = 1.0
+        if listed:
+            growth += new_held * (price / last_close - 1) - cost * abs(new_held - held)
+        held = new_held
+        equity[t] = (equity[t - 1] if t else 1.0) * growth
+        last_close = price
+    return equity
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(1)
+    n = 40
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, (n, 3)), axis=0)
+    close[:6, 1] = np.nan       # listed late
+    close[15:18, 2] = np.nan    # trading halt
+    close[30:, 2] = np.nan      # delisted
+    positions = (rng.random((n, 3)) > 0.5).astype(float)
+    positions[:10, 0] = 0.0     # flat start
+    dates = pd.bdate_range('2025-01-01', periods=n)
+    return dates, ['A.NS', 'B.NS', 'C.NS'], close, positions
+
+
+@pytest.mark.parametrize('cost', [0.0, 0.001, 0.01])
+def test_matches_a_per_bar_loop(panel, cost):
+    dates, symbols, close, positions = panel
+    result = backtest('test', dates, symbols, close, positions, cost=cost)
+
+    for j, symbol in enumerate(symbols):
+        expected = reference_equity(close[:, j], positions[:, j], cost)
+        np.testing.assert_allclose(result.equity[:, j], expected, rtol=1e-12)
+        assert result.summary.set_index('Symbol').loc[symbol, 'Total Return'] == pytest.approx(expected[-1] - 1)
+
+
+def test_fees_are_charged_on_every_flip():
+    dates = pd.bdate_range('2025-01-01', periods=6)
+    close = np.full((6, 1), 100.0)
+    positions = np.array([[1.0], [0.0], [1.0], [0.0], [0.0], [0.0]])
+    result = backtest('flips', dates, ['A.NS'], close, positions, cost=0.01)
+
+    # Enter, exit, enter, exit on flat prices: four one-way costs
+    assert result.equity[-1, 0] == pytest.approx(0.99 ** 4)
+    assert result.summary['Trades'].iloc[0] == 2
+
+
+def test_flat_start_and_late_listing_earn_nothing(panel):
+    dates, symbols, close, positions = panel
+    result = backtest('test', dates, symbols, close, positions, cost=0.001)
+
+    assert (result.equity[:11, 0] == 1.0).all()
+    # B has no close before day 6, so nothing is held or charged until day 7
+    assert (result.equity[:7, 1] == 1.0).all()
+    # C is frozen after its last close
+    assert (result.equity[29:, 2] == result.equity[29, 2]).all()
+
+
+def test_portfolio_is_the_equal_weight_mean_of_listed_symbols(panel):
+    dates, symbols, close, positions = panel
+    result = backtest('test', dates, symbols, close, positions, cost=0.001)
+
+    daily = np.vstack([np.ones((1, 3)), result.equity[1:] / result.equity[:-1]]) - 1
+    filled = pd.DataFrame(close).ffill().to_numpy()
+    listed = np.zeros_like(close, dtype=bool)
+    listed[1:] = ~np.isnan(filled[:-1])
+    listed[30:, 2] = False
+    expected = np.cumprod(1 + np.where(listed, daily, 0).sum(axis=1) / np.maximum(listed.sum(axis=1), 1))
+    np.testing.assert_allclose(result.portfolio.to_numpy(), expected, rtol=1e-12)
+
+
+def test_hold_between_keeps_positions_until_exit():
+    entries = np.array([[False], [True], [False], [True], [False], [False]])
+    exits = np.array([[False], [False], [False], [True], [True], [False]])
+    assert hold_between(entries, exits)[:, 0].tolist() == [0, 1, 1, 0, 0, 0]
@@ -0,0 +1,44 @@
+import json
+import sys
+
+import pytest
+
+import benchmark
+
+
+def result(seconds, relative, peak_mb=1.0):
+    return {'seconds': seconds, 'relative': relative, 'peak_mb': peak_mb}
+
+
+def test_times_are_compared_in_calibration_units():
+    baseline = {'stage': result(0.10, 2.0)}
+    # Twice as slow in seconds on a host that is twice as slow overall
+    assert benchmark.compare({'stage': result(0.20, 2.0)}, baseline, 0.5, 0.25) == []
+    # Same seconds on a host that is twice as fast overall
+    assert benchmark.compare({'stage': result(0.10, 4.0)}, baseline, 0.5, 0.25)
+
+
+def test_short_stages_are_only_checked_for_memory():
+    baseline = {'stage': result(0.001, 0.01)}
+    assert benchmark.compare({'stage': result(0.004, 0.04)}, baseline, 0.5, 0.25) == []
+    assert benchmark.compare({'stage': result(0.004, 0.01, peak_mb=10.0)}, baseline, 0.5, 0.25)
+
+
+@pytest.fixture
+def run(monkeypatch, tmp_path):
+    path = tmp_path / 'baseline.json'
+
+    def run(results, *args):
+        monkeypatch.setattr(benchmark, 'run_benchmarks', lambda n_symbols, repeat: results)
+        monkeypatch.setattr(sys, 'argv', ['benchmark.py', '--baseline', str(path), *args])
+        return benchmark.main()
+    return run
+
+
+def test_exit_status(run, tmp_path):
+    baseline = {'stage': result(0.10, 2.0)}
+    assert run(baseline) == 2
+    assert run(baseline, '--update-baseline') == 0
+    assert json.loads((tmp_path / 'baseline.json').read_text())['500']['stage']['relative'] == 2.0
+    assert run({'stage': result(0.10, 2.5)}) == 0
+    assert run({'stage': result(0.10, 4.0)}) == 1
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from correlation import CorrelationCache, RollingCorrelation, log_returns
+from data_providers import FakeDataProvider
+from metrics import PricePanel
+
+WINDOW = 60
+
+
+@pytest.fixture
+def histories():
+    provider = FakeDataProvider(end='2025-06-30', origin='2023-01-01')
+    return provider.get_history(['ABC.NS', 'DEF.NS', 'XYZ.NS', 'PQR.NS'], period='2y')
+
+
+def panel_until(histories, rows):
+    return PricePanel.from_histories({symbol: hist.iloc[:rows] for symbol, hist in histories.items()})
+
+
+def fitted(panel):
+    return RollingCorrelation(WINDOW).fit(log_returns(panel['Close'], WINDOW)).matrix()
+
+
+def test_new_bars_are_folded_in(histories):
+    cache = CorrelationCache()
+    cache.matrix(panel_until(histories, 300), WINDOW)
+    panel = panel_until(histories, 305)
+    matrix = cache.matrix(panel, WINDOW)
+
+    assert cache.refits == 1 and cache.updates == 5
+    np.testing.assert_allclose(matrix, fitted(panel), atol=1e-5)
+
+
+def test_rewritten_history_is_refitted(histories):
+    cache = CorrelationCache()
+    cache.matrix(panel_until(histories, 300), WINDOW)
+
+    # A split re-adjusts earlier closes of one symbol; the last day stays the same
+    adjusted = dict(histories)
+    hist = histories['DEF.NS'].iloc[:300].copy()
+    hist.iloc[-30:-10, hist.columns.get_loc('Close')] *= 0.5
+    adjusted['DEF.NS'] = hist
+    panel = panel_until(adjusted, 300)
+    matrix = cache.matrix(panel, WINDOW)
+
+    assert cache.refits == 2
+    np.testing.assert_allclose(matrix, fitted(panel), atol=1e-5)
+
+
+def test_revised_last_bar_is_replaced(histories):
+    cache = CorrelationCache()
+    cache.matrix(panel_until(histories, 300), WINDOW)
+    revised = dict(histories)
+    hist = histories['ABC.NS'].iloc[:300].copy()
+    hist.iloc[-1, hist.columns.get_loc('Close')] *= 1.03
+    revised['ABC.NS'] = hist
+    panel = panel_until(revised, 300)
+    matrix = cache.matrix(panel, WINDOW)
+
+    assert cache.refits == 1 and cache.updates == 1
+    np.testing.assert_allclose(matrix, fitted(panel), atol=1e-5)
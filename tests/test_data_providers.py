@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from data_providers import FakeDataProvider, split_download, OHLCV_COLUMNS
+
+END = '2025-06-30'
+
+
+def symbols(n):
+    return [f"SYN{i:03d}.NS" for i in range(n)]
+
+
+def test_get_history_splits_into_batches():
+    provider = FakeDataProvider(end=END, batch_size=4)
+    histories = provider.get_history(symbols(10), period='1y')
+
+    assert [len(batch) for batch, _, _ in provider.calls] == [4, 4, 2]
+    assert sorted(histories) == symbols(10)
+    for hist in histories.values():
+        assert list(hist.columns) == OHLCV_COLUMNS
+        assert hist.index[-1] == pd.Timestamp(END)
+
+
+def test_get_quotes_splits_into_batches():
+    provider = FakeDataProvider(end=END, batch_size=3)
+    quotes = provider.get_quotes(symbols(7))
+
+    assert [(len(batch), kind) for batch, kind, _ in provider.calls] == [(3, 'quote'), (3, 'quote'), (1, 'quote')]
+    assert sorted(quotes) == symbols(7)
+
+
+def test_history_is_deterministic_and_incremental():
+    provider = FakeDataProvider(end=END)
+    full = provider.get_history(['ABC.NS'], period='1y')['ABC.NS']
+    tail = provider.get_history(['ABC.NS'], start='2025-06-02')['ABC.NS']
+
+    assert tail.index[0] >= pd.Timestamp('2025-06-02')
+    pd.testing.assert_frame_equal(tail, full.loc[tail.index], check_freq=False)
+    pd.testing.assert_frame_equal(FakeDataProvider(end=END).get_history(['ABC.NS'], period='1y')['ABC.NS'], full)
+
+
+def test_injected_errors_raise_without_scheduler():
+    provider = FakeDataProvider(end=END, error_rate=1.0)
+    with pytest.raises(ConnectionError):
+        provider.get_history(symbols(2), period='1y')
+
+
+def test_split_download_drops_missing_and_untraded_rows():
+    dates = pd.bdate_range('2025-01-01', periods=3)
+    columns = pd.MultiIndex.from_product([['A.NS', 'B.NS'], OHLCV_COLUMNS])
+    frame = pd.DataFrame(1.0, index=dates, columns=columns)
+    frame.loc[dates[0], 'B.NS'] = float('nan')
+
+    histories = split_download(frame, ['A.NS', 'B.NS', 'C.NS'])
+
+    assert sorted(histories) == ['A.NS', 'B.NS']
+    assert len(histories['A.NS']) == 3
+    assert len(histories['B.NS']) == 2
@@ -0,0 +1,45 @@
+import numpy as np
+
+from data_providers import FakeDataProvider
+from derived_cache import DerivedCache, last_bar_key
+from visualizations import chart_data_version
+
+
+def history():
+    return FakeDataProvider(end='2025-06-30', origin='2023-01-01').get_history(['ABC.NS'], period='2y')['ABC.NS']
+
+
+def readjusted(hist, factor=0.5):
+    """History after a split: every bar but the newest scaled"""
+    hist = hist.copy()
+    hist.iloc[:-1, hist.columns.get_loc('Close')] *= factor
+    return hist
+
+
+def test_readjusted_history_is_recomputed():
+    cache = DerivedCache()
+    hist = history()
+    before = cache.indicators('ABC.NS', '1y', hist)
+    after = cache.indicators('ABC.NS', '1y', readjusted(hist))
+
+    assert cache.misses == 2
+    assert not np.isclose(before['MA20'].iloc[-1], after['MA20'].iloc[-1])
+
+
+def test_unchanged_history_hits():
+    cache = DerivedCache()
+    hist = history()
+    cache.indicators('ABC.NS', '1y', hist)
+    cache.indicators('ABC.NS', '1y', hist.copy())
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert last_bar_key(hist) == last_bar_key(hist.copy())
+
+
+def test_chart_version_ignores_only_the_last_bar():
+    hist = history()
+    revised = hist.copy()
+    revised.iloc[-1, revised.columns.get_loc('Close')] += 1
+
+    assert chart_data_version(revised) == chart_data_version(hist)
+    assert chart_data_version(readjusted(hist)) != chart_data_version(hist)
@@ -0,0 +1,141 @@
+import threading
+
+import pytest
+
+from data_providers import FakeDataProvider
+from fetch_scheduler import FetchScheduler, FetchStats, TokenBucket
+
+END = '2025-06-30'
+SYMBOLS = [f"SYN{i:03d}.NS" for i in range(10)]
+
+
+class RecordingSleep:
+    def __init__(self):
+        self.delays = []
+        self._lock = threading.Lock()
+
+    def __call__(self, seconds):
+        with self._lock:
+            self.delays.append(seconds)
+
+
+def scheduler(max_retries=3, **kwargs):
+    sleep = RecordingSleep()
+    return FetchScheduler(max_workers=4, rate=1000, max_retries=max_retries, sleep=sleep, **kwargs), sleep
+
+
+class FlakySymbolProvider(FakeDataProvider):
+    """Leaves `dropped` out of the first `drops` responses that include it, like yf.download does"""
+
+    def __init__(self, dropped, drops, **kwargs):
+        super().__init__(**kwargs)
+        self.dropped = dropped
+        self.drops = drops
+
+    def download(self, symbols, period='5y', start=None, interval='1d'):
+        histories = super().download(symbols, period, start, interval)
+        if self.dropped in histories and self.drops > 0:
+            self.drops -= 1
+            del histories[self.dropped]
+        return histories
+
+
+def test_retries_with_bounded_backoff_until_failed():
+    fetch_scheduler, sleep = scheduler(max_retries=2, base_delay=0.5, max_delay=0.8)
+    provider = FakeDataProvider(end=END, batch_size=4, error_rate=1.0, scheduler=fetch_scheduler)
+    stats = FetchStats()
+
+    histories = provider.get_history(SYMBOLS, period='1y', stats=stats)
+
+    assert histories == {}
+    assert len(provider.calls) == 3 * 3
+    summary = stats.summary()
+    assert summary['items'] == 3 and summary['failed'] == 3 and summary['retries'] == 6
+    assert summary['symbols'] == 10 and summary['failed_symbols'] == 10
+    # Full jitter: attempt k waits up to min(max_delay, base_delay * 2 ** k)
+    assert len(sleep.delays) == 6
+    assert all(0 <= delay <= 0.8 for delay in sleep.delays)
+
+
+def test_flaky_provider_recovers_within_retries():
+    fetch_scheduler, sleep = scheduler(max_retries=10)
+    provider = FakeDataProvider(end=END, batch_size=2, error_rate=0.4, seed=3, scheduler=fetch_scheduler)
+    stats = FetchStats()
+
+    histories = provider.get_history(SYMBOLS, period='1y', stats=stats)
+
+    assert sorted(histories) == SYMBOLS
+    summary = stats.summary()
+    assert summary['failed'] == 0 and summary['failed_symbols'] == 0
+    assert summary['retries'] == len(sleep.delays) > 0
+
+
+def test_missing_symbol_is_retried_alone():
+    fetch_scheduler, _ = scheduler()
+    provider = FlakySymbolProvider('SYN003.NS', drops=1, end=END, batch_size=5, scheduler=fetch_scheduler)
+    stats = FetchStats()
+
+    histories = provider.get_history(SYMBOLS, period='1y', stats=stats)
+
+    assert sorted(histories) == SYMBOLS
+    assert ['SYN003.NS'] in [batch for batch, _, _ in provider.calls]
+    assert stats.summary()['retries'] == 1
+
+
+def test_symbol_that_never_arrives_counts_as_failed():
+    fetch_scheduler, _ = scheduler(max_retries=2)
+    provider = FlakySymbolProvider('SYN003.NS', drops=99, end=END, batch_size=5, scheduler=fetch_scheduler)
+    stats = FetchStats()
+
+    histories = provider.get_history(SYMBOLS, period='1y', stats=stats)
+
+    assert sorted(histories) == [s for s in SYMBOLS if s != 'SYN003.NS']
+    summary = stats.summary()
+    assert summary['items'] == 2 and summary['failed'] == 1
+    assert summary['symbols'] == 10 and summary['failed_symbols'] == 1
+
+
+def test_map_returns_its_own_stats():
+    fetch_scheduler, _ = scheduler(max_retries=0)
+
+    def fetch(item):
+        if item % 2:
+            raise ValueError(item)
+        return item * 10
+
+    results, stats = fetch_scheduler.map(fetch, range(4))
+    other_results, other_stats = fetch_scheduler.map(fetch, [0, 2])
+
+    assert results == [0, None, 20, None]
+    assert stats.summary()['failed'] == 2 and stats.failures == {'1': '1', '3': '3'}
+    assert other_results == [0, 20] and other_stats.summary()['failed'] == 0
+
+
+def test_stats_add_up_across_runs():
+    fetch_scheduler, _ = scheduler()
+    provider = FakeDataProvider(end=END, batch_size=4, scheduler=fetch_scheduler)
+    stats = FetchStats()
+
+    provider.get_history(SYMBOLS[:6], period='1y', stats=stats)
+    provider.get_history(SYMBOLS[6:], start='2025-06-01', stats=stats)
+
+    assert stats.summary()['items'] == 3
+    assert stats.summary()['symbols'] == 10
+
+
+def test_token_bucket_limits_rate(monkeypatch):
+    now = [0.0]
+    slept = []
+    monkeypatch.setattr('fetch_scheduler.time.monotonic', lambda: now[0])
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+    monkeypatch.setattr('fetch_scheduler.time.sleep', sleep)
+
+    bucket = TokenBucket(rate=2, capacity=2)
+    for _ in range(6):
+        bucket.acquire()
+
+    # Two tokens up front, then one every half second
+    assert now[0] == pytest.approx(2.0)
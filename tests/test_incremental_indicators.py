@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_providers import FakeDataProvider
+from technical_analysis import IncrementalIndicators, RollingStd, calculate_all_indicators
+
+NAMES = ['RSI', 'MACD', 'Signal', 'Histogram', 'MA20', 'MA50', 'MA200', 'BB_Upper', 'BB_Middle', 'BB_Lower']
+
+
+def history(nan_rows=()):
+    hist = FakeDataProvider(end='2025-06-30', origin='2023-01-01').get_history(['ABC.NS'], period='5y')['ABC.NS']
+    hist = hist.copy()
+    hist.iloc[list(nan_rows), hist.columns.get_loc('Close')] = np.nan
+    return hist
+
+
+def expected_at(hist, row):
+    indicators = calculate_all_indicators(hist.iloc[:row + 1])
+    return {name: indicators[name].iloc[-1] for name in NAMES}
+
+
+def assert_matches(latest, expected):
+    for name in NAMES:
+        assert latest[name] == pytest.approx(expected[name], rel=1e-9, abs=1e-9, nan_ok=True), name
+
+
+@pytest.mark.parametrize('nan_rows', [(), (-150, -149, -40, -5)])
+def test_bootstrap_matches_pandas(nan_rows):
+    hist = history(nan_rows)
+    engine = IncrementalIndicators()
+    indicators = engine.bootstrap(hist)
+
+    assert_matches(engine.latest(), {name: indicators[name].iloc[-1] for name in NAMES})
+
+
+@pytest.mark.parametrize('nan_rows', [(), (-150, -149, -40, -5)])
+def test_updates_match_pandas(nan_rows):
+    hist = history(nan_rows)
+    start = len(hist) - 200
+    engine = IncrementalIndicators.from_history(hist.iloc[:start])
+
+    for row in range(start, len(hist)):
+        latest = engine.update(hist.iloc[row])
+        assert_matches(latest, expected_at(hist, row))
+
+
+def test_replacing_the_forming_bar():
+    hist = history((-3,))
+    engine = IncrementalIndicators.from_history(hist.iloc[:-1])
+    forming = hist.iloc[-1].copy()
+
+    engine.update(forming * 1.03)
+    latest = engine.update(forming, replace=True)
+
+    assert_matches(latest, expected_at(hist, len(hist) - 1))
+
+
+def test_rolling_std_recovers_after_nan_leaves_window():
+    values = pd.Series([1.0, 2.0, np.nan, 4.0, 5.0, 7.0, 11.0])
+    std = RollingStd(3)
+    std.bootstrap(values.iloc[:2])
+
+    for i in range(2, len(values)):
+        assert std.update(values.iloc[i]) == pytest.approx(
+            values.iloc[:i + 1].rolling(3).std().iloc[-1], nan_ok=True
+        )
@@ -0,0 +1,109 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_providers import FakeDataProvider
+from ohlcv_store import OHLCVStore, slice_period
+
+SYMBOLS = ['AAA.NS', 'BBB.NS', 'CCC.NS']
+
+
+class SplitProvider(FakeDataProvider):
+    """Fake provider whose adjusted history halves before `split` once it is set"""
+    split = None
+
+    def download(self, symbols, period='5y', start=None, interval='1d'):
+        histories = super().download(symbols, period, start, interval)
+        if self.split is not None:
+            for hist in histories.values():
+                hist.loc[hist.index < self.split, ['Open', 'High', 'Low', 'Close']] /= 2
+        return histories
+
+
+def test_update_fetches_only_recent_bars(tmp_path):
+    provider = FakeDataProvider(end='2025-06-20', origin='2024-01-01')
+    store = OHLCVStore(str(tmp_path))
+    store.update(provider, SYMBOLS, period='1y')
+
+    provider.end = pd.Timestamp('2025-06-30')
+    histories = store.update(provider, SYMBOLS, period='1y')
+
+    symbols, period, start = provider.calls[-1]
+    assert sorted(symbols) == SYMBOLS and period == '5y'
+    assert pd.Timestamp(start) >= pd.Timestamp('2025-06-13')
+    # The fake walk keeps its closes when `end` moves
+    expected = provider.get_history(SYMBOLS, period='1y')
+    for symbol in SYMBOLS:
+        assert histories[symbol].index.equals(expected[symbol].index)
+        np.testing.assert_allclose(histories[symbol]['Close'], expected[symbol]['Close'])
+
+
+def test_unchanged_history_is_not_rewritten(tmp_path):
+    provider = FakeDataProvider(end='2025-06-30', origin='2024-01-01')
+    store = OHLCVStore(str(tmp_path))
+    store.update(provider, SYMBOLS, period='1y')
+    path = os.path.join(str(tmp_path), 'AAA.NS.parquet')
+    os.utime(path, (0, 0))
+
+    store.update(provider, SYMBOLS, period='1y')
+
+    assert os.stat(path).st_mtime == 0
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
+
+
+def test_readjusted_history_is_downloaded_again(tmp_path):
+    provider = SplitProvider(end='2025-06-20', origin='2024-01-01')
+    store = OHLCVStore(str(tmp_path))
+    store.update(provider, SYMBOLS, period='1y')
+
+    provider.end = pd.Timestamp('2025-06-30')
+    provider.split = pd.Timestamp('2025-06-25')
+    histories = store.update(provider, SYMBOLS, period='1y')
+
+    assert provider.calls[-1][1] == '1y'
+    expected = provider.get_history(SYMBOLS, period='1y')
+    for symbol in SYMBOLS:
+        np.testing.assert_allclose(histories[symbol]['Close'], expected[symbol]['Close'])
+        np.testing.assert_allclose(store.load(symbol)['Close'], expected[symbol]['Close'])
+
+
+def test_history_is_trimmed_to_period(tmp_path):
+    provider = FakeDataProvider(end='2025-06-30', origin='2020-01-01')
+    store = OHLCVStore(str(tmp_path))
+    store.append('AAA.NS', provider.get_history(['AAA.NS'], period='5y')['AAA.NS'])
+
+    history = store.update(provider, ['AAA.NS'], period='1y')['AAA.NS']
+
+    assert history.index[0] > pd.Timestamp('2024-06-30')
+    assert len(store.load('AAA.NS')) == len(history)
+
+
+def test_concurrent_appends_of_one_symbol(tmp_path):
+    provider = FakeDataProvider(end='2025-06-30', origin='2024-01-01')
+    full = provider.get_history(['AAA.NS'], period='1y')['AAA.NS']
+    store = OHLCVStore(str(tmp_path))
+    errors = []
+
+    def append(chunk):
+        try:
+            store.append('AAA.NS', chunk)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=append, args=(full.iloc[i:i + 20],)) for i in range(0, len(full), 20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert store.load('AAA.NS').index[-1] == full.index[-1]
+
+
+def test_slice_period_keeps_trailing_window():
+    hist = FakeDataProvider(end='2025-06-30', origin='2024-01-01').get_history(['AAA.NS'], period='1y')['AAA.NS']
+    sliced = slice_period(hist, '1mo')
+    assert sliced.index[0] > pd.Timestamp('2025-05-30')
+    assert sliced.index[-1] == hist.index[-1]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from data_providers import FakeDataProvider
+from metrics import PricePanel
+from technical_analysis import calculate_all_indicators, calculate_indicator_screen, calculate_panel_indicators
+
+NAMES = ['RSI', 'MACD', 'Signal', 'Histogram', 'MA20', 'MA50', 'MA200', 'BB_Upper', 'BB_Middle', 'BB_Lower']
+
+
+def histories():
+    provider = FakeDataProvider(end='2025-06-30', origin='2023-01-01')
+    hists = provider.get_history(['ABC.NS', 'XYZ.NS'], period='2y')
+    # XYZ misses a few days ABC traded, including the one before its last bar
+    gappy = hists['XYZ.NS']
+    hists['XYZ.NS'] = gappy.drop(gappy.index[[-300, -120, -119, -2]])
+    return hists
+
+
+def close_array(hists):
+    dates = hists['ABC.NS'].index.union(hists['XYZ.NS'].index)
+    return dates, np.column_stack([hists[s]['Close'].reindex(dates).to_numpy() for s in ('ABC.NS', 'XYZ.NS')])
+
+
+def test_gappy_symbol_matches_its_own_history():
+    hists = histories()
+    dates, close = close_array(hists)
+    indicators = calculate_panel_indicators(close)
+
+    for column, symbol in enumerate(('ABC.NS', 'XYZ.NS')):
+        hist = hists[symbol]
+        rows = dates.get_indexer(hist.index)
+        expected = calculate_all_indicators(hist)
+        for name in NAMES:
+            np.testing.assert_allclose(indicators[name][rows, column], expected[name].to_numpy(),
+                                       rtol=1e-7, atol=1e-7, err_msg=f"{symbol} {name}")
+
+
+def test_missing_rows_are_nan():
+    hists = histories()
+    dates, close = close_array(hists)
+    indicators = calculate_panel_indicators(close)
+
+    missing = ~dates.isin(hists['XYZ.NS'].index)
+    assert missing.sum() == 4
+    for name in NAMES:
+        assert np.isnan(indicators[name][missing, 1]).all(), name
+
+
+def test_screen_compares_with_previous_traded_bar():
+    hists = histories()
+    panel = PricePanel.from_histories(hists)
+    screen = calculate_indicator_screen(panel).set_index('Symbol')
+
+    for symbol in ('ABC.NS', 'XYZ.NS'):
+        # The panel holds float32 closes
+        hist = hists[symbol].assign(Close=hists[symbol]['Close'].astype(np.float32).astype(float))
+        indicators = calculate_all_indicators(hist)
+        above = (indicators['MACD'] > indicators['Signal']).to_numpy()
+        assert screen.loc[symbol, 'MACD'] == pytest.approx(indicators['MACD'].iloc[-1], rel=1e-9)
+        assert screen.loc[symbol, 'Bullish Crossover'] == (above[-1] and not above[-2])
+        assert screen.loc[symbol, 'Bearish Crossover'] == (not above[-1] and above[-2])
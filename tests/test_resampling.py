@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from resampling import BarResampler, ResampleCache, resample_bars
+
+
+def minute_bars(days=('2025-06-26', '2025-06-27', '2025-06-30')):
+    """1-minute bars for whole 09:15-15:30 sessions"""
+    index = pd.DatetimeIndex([
+        ts for day in days for ts in pd.date_range(f"{day} 09:15", f"{day} 15:29", freq='1min')
+    ])
+    return ohlcv(index)
+
+
+def daily_bars(start='2025-05-01', end='2025-06-30'):
+    return ohlcv(pd.bdate_range(start, end))
+
+
+def ohlcv(index):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(len(index)).cumsum()
+    return pd.DataFrame({'Open': close + rng.uniform(-1, 1, len(index)), 'High': close + 2,
+                         'Low': close - 2, 'Close': close,
+                         'Volume': rng.integers(100, 1000, len(index)).astype(float)}, index=index)
+
+
+def reference(bars, rule):
+    """Plain pandas resample with NSE hourly bins from 09:15 and weekly bins from Monday"""
+    if rule.startswith('W'):
+        return bars.groupby(bars.index.normalize() - pd.to_timedelta(bars.index.weekday, unit='D')).agg(
+            {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    return bars.resample(rule, offset='9h15min').agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}).dropna()
+
+
+def assert_same_bars(result, expected):
+    pd.testing.assert_frame_equal(result, expected, check_freq=False, check_names=False)
+
+
+@pytest.mark.parametrize('rule, source, step', [
+    ('1h', minute_bars(), 7),
+    ('1h', minute_bars(), 60),
+    ('15min', minute_bars(), 1),
+    ('W-MON', daily_bars(), 1),
+    ('W-MON', daily_bars(), 3),
+])
+def test_incremental_updates_match_a_full_resample(rule, source, step):
+    resampler = BarResampler(rule)
+    for end in range(step, len(source) + step, step):
+        result = resampler.update(source.iloc[:end])
+    assert_same_bars(result, reference(source, rule))
+    assert_same_bars(resample_bars(source, rule), reference(source, rule))
+
+
+def test_hourly_bins_start_at_the_open():
+    result = BarResampler('1h').update(minute_bars(['2025-06-27']))
+    assert result.index[0] == pd.Timestamp('2025-06-27 09:15')
+    assert result.index[-1] == pd.Timestamp('2025-06-27 15:15')
+    # The last bin only runs 15:15-15:30
+    assert len(result) == 7
+
+
+def test_partial_last_bar_completes():
+    source = minute_bars(['2025-06-27'])
+    resampler = BarResampler('1h')
+    # Half of the 10:15 bar
+    partial = resampler.update(source.loc[:'2025-06-27 10:44'])
+    assert partial.index[-1] == pd.Timestamp('2025-06-27 10:15')
+    assert partial['Close'].iloc[-1] == source.loc['2025-06-27 10:44', 'Close']
+    assert partial['Volume'].iloc[-1] == source.loc['2025-06-27 10:15':'2025-06-27 10:44', 'Volume'].sum()
+
+    # A revision of the newest source bar moves the partial bar
+    revised = source.loc[:'2025-06-27 10:44'].copy()
+    revised.iloc[-1, revised.columns.get_loc('Close')] = 500.0
+    revised.iloc[-1, revised.columns.get_loc('High')] = 500.0
+    assert resampler.update(revised)[['High', 'Close']].iloc[-1].tolist() == [500.0, 500.0]
+
+    complete = resampler.update(source.loc[:'2025-06-27 11:20'])
+    assert_same_bars(complete, reference(source.loc[:'2025-06-27 11:20'], '1h'))
+    assert complete.loc['2025-06-27 10:15', 'Close'] == source.loc['2025-06-27 11:14', 'Close']
+
+
+def test_replaced_source_is_rebuilt():
+    source = daily_bars()
+    resampler = BarResampler('W-MON')
+    resampler.update(source)
+
+    # A reload reaching further back
+    longer = daily_bars(start='2025-03-03')
+    assert_same_bars(resampler.update(longer), reference(longer, 'W-MON'))
+
+    # The same dates re-adjusted for a split
+    adjusted = longer.copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] *= 0.5
+    assert_same_bars(resampler.update(adjusted), reference(adjusted, 'W-MON'))
+
+
+def test_cache_keeps_one_resampler_per_symbol_and_interval():
+    cache = ResampleCache()
+    source = minute_bars()
+    assert cache.resample('A.NS', '1m', source) is source
+    assert_same_bars(cache.resample('A.NS', '1h', source), reference(source, '1h'))
+    finished = cache._resamplers[('A.NS', '1h')].finished
+    assert_same_bars(cache.resample('A.NS', '1h', source), reference(source, '1h'))
+    # Finished bars are not aggregated again
+    assert cache._resamplers[('A.NS', '1h')].finished is finished
+
+    assert_same_bars(cache.resample('B.NS', '15m', source.iloc[:100]), reference(source.iloc[:100], '15min'))
+    assert_same_bars(cache.resample('A.NS', '1h', source), reference(source, '1h'))
+    cache.clear()
+    assert cache._resamplers == {}
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from screener import (All, Between, Flag, Ratio, SavedScreens, Screener, SortedIndex,
+                      near_52week_high, near_52week_low)
+
+
+def table():
+    return pd.DataFrame({
+        'Symbol': ['A.NS', 'B.NS', 'C.NS', 'D.NS', 'E.NS', 'F.NS'],
+        'Current Price': [100.0, 50.0, 95.0, np.nan, 30.0, 200.0],
+        '52W High': [100.0, 100.0, 100.0, 80.0, 60.0, 210.0],
+        '52W Low': [60.0, 48.0, 90.0, 40.0, 29.0, 100.0],
+        'RSI': [30.0, 25.0, np.nan, 70.0, 80.0, 50.0],
+        'Above MA200': [True, False, True, False, False, True],
+    })
+
+
+class CountingBetween(Between):
+    calls = 0
+
+    def select(self, screener):
+        CountingBetween.calls += 1
+        return super().select(screener)
+
+
+@pytest.mark.parametrize('inclusive', ['both', 'left', 'right', 'neither'])
+def test_sorted_index_between_matches_series_between(inclusive):
+    values = pd.Series([3.0, 1.0, np.nan, 2.0, 2.0, 5.0, np.nan, 4.0])
+    index = SortedIndex(values)
+    assert len(index) == 6
+    for low, high in [(2, 4), (2, 2), (0, 10), (4, 2), (None, 2), (2, None), (None, None)]:
+        expected = values.between(-np.inf if low is None else low,
+                                  np.inf if high is None else high, inclusive=inclusive)
+        assert index.between(low, high, inclusive).tolist() == np.flatnonzero(expected).tolist()
+
+
+def test_missing_values_never_match():
+    screener = Screener(table())
+    assert 'C.NS' not in screener.run(Between('RSI')).Symbol.tolist()
+    assert 'D.NS' not in screener.run(Ratio('Current Price', '52W High')).Symbol.tolist()
+
+
+def test_predicates_match_boolean_masks():
+    df = table()
+    screener = Screener(df)
+    ratio_high = df['Current Price'] / df['52W High']
+    ratio_low = df['Current Price'] / df['52W Low']
+    cases = [
+        (Between('RSI', high=30, inclusive='left'), df['RSI'] < 30),
+        (Between('RSI', low=70, inclusive='right'), df['RSI'] > 70),
+        (Between('RSI', 30, 70), df['RSI'].between(30, 70)),
+        (Flag('Above MA200'), df['Above MA200']),
+        (near_52week_high(0.95), ratio_high >= 0.95),
+        (near_52week_low(1.05), ratio_low <= 1.05),
+        (Between('RSI', low=50) & Flag('Above MA200'), (df['RSI'] >= 50) & df['Above MA200']),
+        (Between('RSI', high=25) | near_52week_high(0.95), (df['RSI'] <= 25) | (ratio_high >= 0.95)),
+    ]
+    for predicate, mask in cases:
+        assert screener.select(predicate).tolist() == np.flatnonzero(mask.fillna(False)).tolist()
+
+
+def test_no_predicate_selects_every_row():
+    assert Screener(table()).select(None).tolist() == list(range(6))
+
+
+def test_update_keeps_only_untouched_indexes():
+    screener = Screener(table())
+    rsi = screener.index('RSI')
+    near_high = screener.index(('Current Price', '52W High'))
+    low = screener.index('52W Low')
+
+    refreshed = table()
+    refreshed['Current Price'] = refreshed['Current Price'] * 1.1
+    updated = screener.update(refreshed, ['Current Price'])
+
+    assert updated.index('RSI') is rsi
+    assert updated.index('52W Low') is low
+    assert updated.index(('Current Price', '52W High')) is not near_high
+    assert updated.select(near_52week_high(1.0)).tolist() == [0, 2, 5]
+
+
+def test_update_with_different_rows_starts_over():
+    screener = Screener(table())
+    rsi = screener.index('RSI')
+    updated = screener.update(table().iloc[::-1].reset_index(drop=True), [])
+    assert updated.index('RSI') is not rsi
+
+
+def test_saved_screens_rerun_only_when_their_columns_change():
+    CountingBetween.calls = 0
+    screens = SavedScreens()
+    screens.save('oversold', CountingBetween('RSI', high=30))
+    screens.save('near high', All(CountingBetween('Current Price', low=90), Flag('Above MA200')))
+
+    screener = Screener(table())
+    first = screens.evaluate(screener)
+    assert CountingBetween.calls == 2
+    assert first['oversold'].tolist() == [0, 1]
+    assert first['near high'].tolist() == [0, 2, 5]
+
+    # Same screener: both results reused
+    assert screens.evaluate(screener)['oversold'] is first['oversold']
+    assert CountingBetween.calls == 2
+
+    # Price refresh: only the screen on the price column is re-run
+    refreshed = table()
+    refreshed['Current Price'] = [80.0, 50.0, 95.0, np.nan, 30.0, 200.0]
+    second = screens.evaluate(screener.update(refreshed, ['Current Price']))
+    assert CountingBetween.calls == 3
+    assert second['oversold'] is first['oversold']
+    assert second['near high'].tolist() == [2, 5]
+
+
+def test_saving_a_screen_again_drops_its_result():
+    CountingBetween.calls = 0
+    screens = SavedScreens()
+    screener = Screener(table())
+    screens.save('rsi', CountingBetween('RSI', high=30))
+    screens.evaluate(screener)
+    screens.save('rsi', CountingBetween('RSI', low=70))
+    assert screens.evaluate(screener)['rsi'].tolist() == [3, 4]
+    assert CountingBetween.calls == 2
+    screens.remove('rsi')
+    assert screens.evaluate(screener) == {}
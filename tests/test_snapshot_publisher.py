@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_providers import FakeDataProvider
+from data_handler import StockDataHandler
+from data_service import DataService
+from ohlcv_store import OHLCVStore
+from snapshot_publisher import CURRENT_FILE, KEEP_VERSIONS, SnapshotReader, prune_snapshots, write_snapshot
+
+SYMBOLS = pd.DataFrame({'Symbol': ['ABC.NS', 'DEF.NS', 'XYZ.NS'], 'Name': ['Abc', 'Def', 'Xyz']})
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    handler = StockDataHandler(provider=FakeDataProvider(), store=OHLCVStore(str(tmp_path / 'ohlcv')),
+                               symbols=SYMBOLS)
+    return DataService(handler).snapshot()
+
+
+def versions(root):
+    return [d for d in os.listdir(root) if d.startswith('v')]
+
+
+def current(root):
+    with open(os.path.join(root, CURRENT_FILE)) as f:
+        return f.read().strip()
+
+
+def test_restarted_publisher_never_reuses_a_directory(tmp_path, snapshot):
+    root = str(tmp_path / 'snapshots')
+    first = write_snapshot(root, snapshot)
+    # A restarted publisher starts again from the same snapshot version
+    second = write_snapshot(root, snapshot)
+
+    assert first != second
+    assert os.path.isdir(first) and os.path.isdir(second)
+    assert current(root) == os.path.basename(second)
+    assert SnapshotReader(root).read().version == snapshot.version
+
+
+def test_prune_keeps_newest_and_current(tmp_path, snapshot):
+    root = str(tmp_path / 'snapshots')
+    written = [os.path.basename(write_snapshot(root, snapshot)) for _ in range(KEEP_VERSIONS + 2)]
+    assert sorted(versions(root)) == sorted(written[-KEEP_VERSIONS:])
+
+    # Point CURRENT back at an older version (its mtime is older than the rest)
+    with open(os.path.join(root, CURRENT_FILE), 'w') as f:
+        f.write(written[-KEEP_VERSIONS])
+    for i, name in enumerate(written[-KEEP_VERSIONS + 1:]):
+        os.utime(os.path.join(root, name), (2e9 + i, 2e9 + i))
+    prune_snapshots(root, keep=1)
+
+    assert sorted(versions(root)) == sorted([written[-KEEP_VERSIONS], written[-1]])
+
+
+def test_read_only_handler_never_downloads(tmp_path, snapshot):
+    handler = StockDataHandler(store=OHLCVStore(str(tmp_path / 'ohlcv')), symbols=SYMBOLS,
+                               read_only=True)
+
+    assert handler.provider is None
+    with pytest.raises(RuntimeError):
+        handler.load_quotes()
+    assert len(handler.get_detailed_stock_data('DEF.NS', '1y', '1d', snapshot.panel)) > 0
+    assert len(handler.get_detailed_stock_data('MISSING.NS', '1y', '1d')) == 0
+
+
+def test_restarted_publisher_has_a_new_origin(tmp_path, snapshot):
+    root = str(tmp_path / 'snapshots')
+    write_snapshot(root, snapshot)
+    reader = SnapshotReader(root)
+    first = reader.read()
+
+    # Same version numbers from a new DataService run
+    handler = StockDataHandler(provider=FakeDataProvider(), store=OHLCVStore(str(tmp_path / 'ohlcv')), symbols=SYMBOLS)
+    restarted = DataService(handler).snapshot()
+    write_snapshot(root, restarted)
+    second = reader.read()
+
+    assert (second.version, second.history_version) == (first.version, first.history_version)
+    assert second.origin != first.origin
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from symbol_search import SymbolIndex
+
+
+@pytest.fixture(scope='module')
+def symbols():
+    return pd.read_csv('nifty500_symbols.csv')
+
+
+@pytest.fixture(scope='module')
+def index(symbols):
+    return SymbolIndex.from_frame(symbols)
+
+
+def contains(symbols, query):
+    mask = (symbols['Symbol'].str.contains(query, case=False, regex=False) |
+            symbols['Name'].str.contains(query, case=False, regex=False))
+    return set(symbols.loc[mask, 'Symbol'])
+
+
+@pytest.mark.parametrize('query', ['infra', 'finance', 'corp', 'bank', 'ltd', 'india', 'hdfc', 'm&m'])
+def test_matches_are_the_same_as_a_substring_filter(index, symbols, query):
+    results = index.search(query, limit=None)
+    assert len(results) == len(set(results))
+    assert set(results) == contains(symbols, query)
+
+
+def test_broad_queries_are_not_capped(index, symbols):
+    assert len(index.search('ltd', limit=None)) == len(contains(symbols, 'ltd')) == 359
+    assert len(index.search('ltd', limit=10)) == 10
+
+
+def test_ranks_symbol_prefix_before_word_prefix_before_substring():
+    index = SymbolIndex(['AUBANK.NS', 'ZZZ.NS', 'BANKX.NS'],
+                        ['AU Small Finance', 'Zed Bank Ltd', 'Alpha Ltd'])
+    assert index.search('bank') == ['BANKX.NS', 'ZZZ.NS', 'AUBANK.NS']
+
+
+def test_exact_symbol_ranks_first(index):
+    assert index.search('tcs')[0] == 'TCS.NS'
+    assert index.search('consultancy') == ['TCS.NS']
+
+
+def test_fuzzy_only_when_nothing_contains_the_query(index, symbols):
+    assert index.search('relaince') == ['RELIANCE.NS']
+    # "infra" has literal matches, so no near misses are mixed in
+    assert set(index.search('infra', limit=None)) == contains(symbols, 'infra')
+    assert index.search('xyzzy') == []
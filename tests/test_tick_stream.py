@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tick_stream import revise_last_bar
+
+
+def bars(index, tz=None):
+    index = pd.DatetimeIndex(index, tz=tz)
+    close = np.arange(100, 100 + len(index), dtype=np.float32)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(len(index), 1000.0)}, index=index)
+
+
+def test_same_day_price_revises_last_bar():
+    data = bars(['2025-06-26', '2025-06-27'])
+    revised = revise_last_bar(data, 105.0, pd.Timestamp('2025-06-27 14:30'))
+
+    assert len(revised) == 2
+    assert revised['Close'].iloc[-1] == 105.0
+    assert revised['High'].iloc[-1] == 105.0
+    assert revised['Close'].dtype == np.float32
+    assert data['Close'].iloc[-1] == 101.0
+
+
+def test_next_day_price_appends_provisional_bar():
+    data = bars(['2025-06-26', '2025-06-27'])
+    revised = revise_last_bar(data, 99.0, pd.Timestamp('2025-06-30 09:20'))
+
+    assert revised.index[-1] == pd.Timestamp('2025-06-30')
+    assert revised.iloc[-1][['Open', 'High', 'Low', 'Close']].tolist() == [99.0] * 4
+    assert revised['Volume'].iloc[-1] == 0
+    assert revised.iloc[:-1].equals(data)
+
+
+def test_older_price_is_ignored():
+    data = bars(['2025-06-26', '2025-06-27'])
+    assert revise_last_bar(data, 90.0, pd.Timestamp('2025-06-26 15:00')) is data
+
+
+def test_price_time_is_compared_in_exchange_time():
+    data = bars(['2025-06-26', '2025-06-27'], tz='Asia/Kolkata')
+    # 20:00 UTC on the 26th is already the 27th in India
+    revised = revise_last_bar(data, 105.0, pd.Timestamp('2025-06-26 20:00', tz='UTC'))
+    assert len(revised) == 2 and revised['Close'].iloc[-1] == 105.0
+
+
+@pytest.mark.parametrize('interval, at, expected', [
+    ('1w', '2025-06-26 10:00', None),
+    ('1w', '2025-06-30 10:00', '2025-06-30'),
+    ('5m', '2025-06-27 09:24', None),
+    ('5m', '2025-06-27 09:25', '2025-06-27 09:25'),
+    ('1h', '2025-06-27 11:30', '2025-06-27 11:15'),
+])
+def test_bar_periods_follow_the_interval(interval, at, expected):
+    index = {'1w': ['2025-06-16', '2025-06-23'], '5m': ['2025-06-27 09:15', '2025-06-27 09:20'],
+             '1h': ['2025-06-27 09:15', '2025-06-27 10:15']}[interval]
+    data = bars(index)
+    revised = revise_last_bar(data, 150.0, pd.Timestamp(at), interval)
+
+    if expected is None:
+        assert len(revised) == len(data) and revised['Close'].iloc[-1] == 150.0
+    else:
+        assert revised.index[-1] == pd.Timestamp(expected) and len(revised) == len(data) + 1
+
+
+@pytest.mark.parametrize('interval, index, at', [
+    # Saturday and Sunday
+    ('1d', ['2025-06-26', '2025-06-27'], '2025-06-28 11:00'),
+    ('1d', ['2025-06-26', '2025-06-27'], '2025-06-29 11:00'),
+    # Monday before the open
+    ('1d', ['2025-06-26', '2025-06-27'], '2025-06-30 08:00'),
+    ('1w', ['2025-06-16', '2025-06-23'], '2025-06-30 08:00'),
+    # After the close
+    ('1m', ['2025-06-27 15:28', '2025-06-27 15:29'], '2025-06-27 20:00'),
+    ('1h', ['2025-06-27 13:15', '2025-06-27 14:15'], '2025-06-27 20:00'),
+    ('1m', ['2025-06-27 15:28', '2025-06-27 15:29'], '2025-06-27 15:30'),
+])
+def test_no_provisional_bar_outside_the_session(interval, index, at):
+    data = bars(index)
+    assert revise_last_bar(data, 150.0, pd.Timestamp(at), interval) is data
+
+
+def test_after_close_price_still_revises_the_session_bar():
+    data = bars(['2025-06-26', '2025-06-27'])
+    revised = revise_last_bar(data, 105.0, pd.Timestamp('2025-06-27 20:00'))
+    assert len(revised) == 2 and revised['Close'].iloc[-1] == 105.0
+
+
+def test_session_is_checked_in_exchange_time():
+    data = bars(['2025-06-26', '2025-06-27'], tz='UTC')
+    # 04:00 UTC on Monday is 09:30 in India
+    revised = revise_last_bar(data, 99.0, pd.Timestamp('2025-06-30 04:00', tz='UTC'))
+    assert len(revised) == 3
+    # 02:00 UTC is 07:30 in India, before the open
+    assert revise_last_bar(data, 99.0, pd.Timestamp('2025-06-30 02:00', tz='UTC')) is data
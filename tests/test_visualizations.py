@@ -0,0 +1,71 @@
+import base64
+import json
+
+import numpy as np
+import plotly.io as pio
+import pytest
+
+from data_providers import FakeDataProvider
+from technical_analysis import calculate_all_indicators
+from visualizations import (FigureCache, _last_bar, _latest_indicators, cached_price_chart, create_macd_chart,
+                            create_price_chart)
+
+
+def values(array):
+    if isinstance(array, dict):
+        return np.frombuffer(base64.b64decode(array['bdata']), dtype=array['dtype'])
+    return np.asarray(array)
+
+
+@pytest.fixture
+def history():
+    hist = FakeDataProvider(end='2025-06-30', origin='2023-01-01').get_history(['ABC.NS'], period='2y')['ABC.NS']
+    return hist, calculate_all_indicators(hist)
+
+
+def test_hits_return_separate_figures(history):
+    hist, indicators = history
+    cache = FigureCache()
+    build = lambda: create_price_chart(hist, 'ABC', indicators)
+    first = cache.get_or_build('price', build, _last_bar(hist), _latest_indicators(indicators))
+    second = cache.get_or_build('price', build, _last_bar(hist), _latest_indicators(indicators))
+
+    assert first is not second
+    first.update_layout(title='changed by one session')
+    third = cache.get_or_build('price', build, _last_bar(hist), _latest_indicators(indicators))
+    assert third.layout.title.text == 'ABC Technical Analysis'
+    assert cache.stats()['bytes'] == len(pio.to_json(build(), validate=False))
+
+
+def test_revised_bar_patches_a_copy(history):
+    hist, indicators = history
+    cache = FigureCache()
+    build = lambda: create_macd_chart(hist, indicators)
+    before = cache.get_or_build('macd', build, _last_bar(hist), _latest_indicators(indicators))
+    snapshot = json.loads(pio.to_json(before, validate=False))
+
+    latest = dict(_latest_indicators(indicators), MACD=1.5, Histogram=-2.0)
+    after = cache.get_or_build('macd', build, dict(_last_bar(hist), Close=1.0), latest)
+
+    assert cache.patches == 1
+    assert json.loads(pio.to_json(before, validate=False)) == snapshot
+    traces = {trace.name: trace for trace in after.data}
+    assert values(traces['MACD'].y)[-1] == 1.5
+    assert values(traces['Histogram'].y)[-1] == -2.0
+    assert traces['Histogram'].marker.color[-1] == '#ef5350'
+    np.testing.assert_array_equal(values(traces['MACD'].y)[:-1], values(before.data[0].y)[:-1])
+
+
+def test_zoomed_range_is_downsampled_and_not_patched_past_its_end(history):
+    hist, indicators = history
+    x_range = (hist.index[-120], hist.index[-60])
+    zoomed = cached_price_chart(hist, 'ABC', '2y', indicators, x_range)
+
+    candles = zoomed.data[0]
+    assert len(candles.x) == 61
+    assert np.datetime64(candles.x[-1]) == np.datetime64(hist.index[-60].tz_localize(None))
+
+    revised = hist.copy()
+    revised.iloc[-1, revised.columns.get_loc('Close')] += 5
+    again = cached_price_chart(revised, 'ABC', '2y', indicators, x_range)
+    assert values(again.data[0].close)[-1] == values(candles.close)[-1]
@@ -0,0 +1,347 @@
+"""Streaming live prices from a tick feed into the data service.
+
+A TickSource yields Tick objects; TickStreamer reads one on a background
+thread, keeps the latest price per symbol and pushes the changed prices to
+DataService.apply_ticks every `flush_interval` seconds. History is never
+re-fetched, only the quote columns of the ticked symbols change.
+
+Sources are chosen with a feed spec (TICK_FEED for the app):
+
+    replay:data/ticks.jsonl        play a recording in-process
+    replay:data/ticks.jsonl@10     ... ten times faster
+    tcp://127.0.0.1:9100           newline-delimited JSON ticks over TCP
+
+Recordings are JSON lines {"symbol", "price", "ts", "volume"}. To try the
+streaming mode locally:
+
+    python tick_stream.py synthesize data/ticks.jsonl --rate 300 --seconds 600
+    python tick_stream.py serve data/ticks.jsonl --port 9100 --loop
+    TICK_FEED=tcp://127.0.0.1:9100 streamlit run main.py
+"""
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import socketserver
+from dataclasses import dataclass, asdict
+
+import pandas as pd
+
+from resampling import MARKET_TZ, bar_start, in_session
+import perf
+
+
+@dataclass(frozen=True)
+class Tick:
+    symbol: str
+    price: float
+    ts: float
+    volume: float = 0.0
+
+
+def parse_tick(line):
+    data = json.loads(line)
+    return Tick(data['symbol'], float(data['price']), float(data['ts']), float(data.get('volume', 0.0)))
+
+
+def load_ticks(path):
+    with open(path) as f:
+        return [parse_tick(line) for line in f if line.strip()]
+
+
+def revise_last_bar(data, price, at=None, interval='1d'):
+    """History of `interval` bars with a live price quoted at `at` (default now) applied.
+
+    A price inside the newest bar's period moves its close (and high/low if
+    exceeded); a price from a later period starts a provisional bar at that
+    price, but only during a trading session, since `at` is usually the
+    fetch time and a quote fetched at the weekend or after the close is
+    still the last session's price; an older price leaves the history
+    alone. Naive `at` times are in exchange time.
+    """
+    if price is None or len(data) == 0 or pd.isna(price):
+        return data
+    at = pd.Timestamp.now(tz=MARKET_TZ) if at is None else pd.Timestamp(at)
+    if at.tz is None:
+        at = at.tz_localize(MARKET_TZ)
+    tz = data.index.tz
+    at = at.tz_convert(tz) if tz is not None else at.tz_convert(MARKET_TZ).tz_localize(None)
+    start = bar_start(at, interval)
+    last = data.index[-1]
+    if start < last or (start == last and data['Close'].iloc[-1] == price):
+        return data
+    if start > last and not in_session(at):
+        return data
+
+    # Keep the column dtype (float32 for panel views)
+    price = data['Close'].dtype.type(price)
+    if start > last:
+        bar = pd.DataFrame({column: [price] for column in ('Open', 'High', 'Low', 'Close')},
+                           index=pd.DatetimeIndex([start], name=data.index.name))
+        if 'Volume' in data:
+            bar['Volume'] = 0
+        return pd.concat([data, bar.astype(data.dtypes[bar.columns])])
+
+    data = data.copy()
+    data.loc[last, 'Close'] = price
+    data.loc[last, 'High'] = max(data.loc[last, 'High'], price)
+    data.loc[last, 'Low'] = min(data.loc[last, 'Low'], price)
+    return data
+
+
+class TickSource:
+    """Interface of a tick feed"""
+
+    def ticks(self):
+        """Iterator over incoming ticks; blocks while waiting and ends when the feed closes"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ReplayTickSource(TickSource):
+    """Plays recorded ticks in-process with their original spacing divided by `speed`"""
+
+    def __init__(self, ticks, speed=1.0, loop=False, sleep=time.sleep):
+        self.recording = load_ticks(ticks) if isinstance(ticks, str) else list(ticks)
+        self.speed = speed
+        self.loop = loop
+        self.sleep = sleep
+        self._closed = threading.Event()
+
+    def ticks(self):
+        while not self._closed.is_set():
+            yield from _paced(self.recording, self.speed, self.sleep, self._closed)
+            if not self.loop:
+                return
+
+    def close(self):
+        self._closed.set()
+
+
+def _paced(recording, speed, sleep, closed):
+    """Yield ticks at their recorded pace, stamped with the replay time"""
+    if not recording:
+        return
+    origin = recording[0].ts
+    started = time.time()
+    for tick in recording:
+        if closed.is_set():
+            return
+        due = started + (tick.ts - origin) / speed
+        delay = due - time.time()
+        if delay > 0:
+            sleep(delay)
+        yield Tick(tick.symbol, tick.price, time.time(), tick.volume)
+
+
+class SocketTickSource(TickSource):
+    """Reads newline-delimited JSON ticks from a TCP feed such as ReplayServer"""
+
+    def __init__(self, host, port, symbols=None, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.symbols = set(symbols) if symbols else None
+        self.timeout = timeout
+        self._socket = None
+
+    def ticks(self):
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._socket.settimeout(None)
+        with self._socket.makefile('r') as stream:
+            for line in stream:
+                if not line.strip():
+                    continue
+                tick = parse_tick(line)
+                if self.symbols is None or tick.symbol in self.symbols:
+                    yield tick
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+
+
+def make_tick_source(spec):
+    """TickSource for a feed spec: 'replay:<path>[@speed]' or 'tcp://<host>:<port>'"""
+    if spec.startswith('replay:'):
+        path, _, speed = spec[len('replay:'):].partition('@')
+        return ReplayTickSource(path, speed=float(speed or 1.0), loop=True)
+    if spec.startswith('tcp://'):
+        host, _, port = spec[len('tcp://'):].rpartition(':')
+        return SocketTickSource(host, int(port))
+    raise ValueError(f"Unknown tick feed: {spec}")
+
+
+class TickStreamer:
+    """Feeds a TickSource into DataService.apply_ticks.
+
+    A reader thread keeps only the latest price per symbol, so bursts of
+    ticks cost one dictionary write each; a flusher thread publishes the
+    accumulated prices as one delta every `flush_interval` seconds. The
+    reader reconnects with a growing delay when the feed fails.
+    """
+
+    def __init__(self, service, source, flush_interval=0.25, max_reconnect_delay=30.0):
+        self.service = service
+        self.source = source
+        self.flush_interval = flush_interval
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ticks_received = 0
+        self.flushes = 0
+        self.last_flush_delay = 0.0
+        self.last_error = None
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        perf.registry.register_collector('stream', self.stats)
+
+    def start(self):
+        threading.Thread(target=self._read, name='tick-reader', daemon=True).start()
+        threading.Thread(target=self._flush_loop, name='tick-flusher', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.source.close()
+
+    def _read(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                for tick in self.source.ticks():
+                    with self._lock:
+                        self._pending[tick.symbol] = tick.price
+                        if self._oldest is None:
+                            self._oldest = time.monotonic()
+                        self.ticks_received += 1
+                    delay = 1.0
+                    if self._stop.is_set():
+                        return
+                self.last_error = "Tick feed closed"
+            except Exception as e:
+                self.last_error = f"Tick feed error: {str(e)}"
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def flush(self):
+        """Publish the prices received since the last flush; returns how many symbols changed"""
+        with self._lock:
+            prices, self._pending = self._pending, {}
+            oldest, self._oldest = self._oldest, None
+        if not prices:
+            return 0
+        with perf.span('stream.flush') as span:
+            self.service.apply_ticks(prices)
+            span.rows = len(prices)
+        self.flushes += 1
+        # Time the oldest tick of this batch waited before being published
+        self.last_flush_delay = time.monotonic() - oldest
+        perf.observe('stream.tick_to_publish_seconds', self.last_flush_delay)
+        return len(prices)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = f"Error applying ticks: {str(e)}"
+
+    def stats(self):
+        return {
+            'ticks': self.ticks_received,
+            'flushes': self.flushes,
+            'last_flush_delay': self.last_flush_delay
+        }
+
+
+class ReplayServer(socketserver.ThreadingTCPServer):
+    """Local TCP feed that plays a recording to every client from the start"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, recording, host='127.0.0.1', port=9100, speed=1.0, loop=False):
+        self.recording = load_ticks(recording) if isinstance(recording, str) else list(recording)
+        self.speed = speed
+        self.loop = loop
+        super().__init__((host, port), _ReplayHandler)
+
+
+class _ReplayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        closed = threading.Event()
+        try:
+            while True:
+                for tick in _paced(server.recording, server.speed, time.sleep, closed):
+                    self.wfile.write((json.dumps(asdict(tick)) + '\n').encode())
+                if not server.loop:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def synthesize_ticks(symbols, prices, rate=300, seconds=60, volatility=0.0005, seed=0):
+    """Random-walk ticks around `prices` at `rate` ticks per second"""
+    rng = random.Random(seed)
+    current = dict(zip(symbols, prices))
+    start = time.time()
+    ticks = []
+    for i in range(int(rate * seconds)):
+        symbol = rng.choice(symbols)
+        current[symbol] *= 1 + rng.gauss(0, volatility)
+        ticks.append(Tick(symbol, round(current[symbol], 2), start + i / rate, rng.randint(1, 500)))
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay tick feeds")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    synth = commands.add_parser('synthesize', help="Write a synthetic recording for the Nifty 500 list")
+    synth.add_argument('--store', default='data/ohlcv', help="Start from the last closes in this OHLCV store")
+    synth.add_argument('path')
+    synth.add_argument('--rate', type=float, default=300, help="Ticks per second")
+    synth.add_argument('--seconds', type=float, default=600)
+
+    serve = commands.add_parser('serve', help="Replay a recording over TCP")
+    serve.add_argument('path')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=9100)
+    serve.add_argument('--speed', type=float, default=1.0)
+    serve.add_argument('--loop', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'synthesize':
+        from data_providers import FakeDataProvider
+        from ohlcv_store import OHLCVStore
+        symbols = pd.read_csv('nifty500_symbols.csv')['Symbol'].drop_duplicates().tolist()
+        # Real last closes where the store has them, synthetic ones otherwise
+        store = OHLCVStore(args.store)
+        quotes = FakeDataProvider().get_quotes(symbols)
+        for symbol in store.symbols():
+            history = store.load(symbol)
+            if len(history):
+                quotes[symbol] = float(history['Close'].iloc[-1])
+        symbols = [s for s in symbols if s in quotes]
+        ticks = synthesize_ticks(symbols, [quotes[s] for s in symbols], args.rate, args.seconds)
+        with open(args.path, 'w') as f:
+            for tick in ticks:
+                f.write(json.dumps(asdict(tick)) + '\n')
+        print(f"Wrote {len(ticks)} ticks to {args.path}")
+    else:
+        server = ReplayServer(args.path, args.host, args.port, args.speed, args.loop)
+        print(f"Replaying {len(server.recording)} ticks on {args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
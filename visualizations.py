@@ -2,10 +2,24 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+import json
+import base64
+import threading
 import numpy as np
+import plotly.io as pio
+from derived_cache import DerivedCache, close_checksum
+import perf
+from downsampling import MAX_POINTS_PER_TRACE, visible_slice, downsample_line, aggregate_ohlc
 
-def create_price_chart(stock_data, symbol, indicators):
+def create_price_chart(stock_data, symbol, indicators, x_range=None, max_points=MAX_POINTS_PER_TRACE,
+                       template='plotly_white'):
     """Create main price chart with technical indicators"""
+    # Only the visible range is sent, reduced to max_points per trace
+    stock_data = visible_slice(stock_data, x_range)
+    candles = aggregate_ohlc(stock_data, max_points)
+    lines = {name: downsample_line(visible_slice(indicators[name], x_range), max_points) for name in
+             ['MA20', 'MA50', 'MA200', 'BB_Upper', 'BB_Middle', 'BB_Lower', 'RSI']}
+
     # Create figure with secondary y-axis
     fig = make_subplots(rows=2, cols=1, 
                        shared_xaxes=True,
@@ -15,11 +29,11 @@ def create_price_chart(stock_data, symbol, indicators):
     # Add candlestick
     fig.add_trace(
         go.Candlestick(
-            x=stock_data.index,
-            open=stock_data['Open'],
-            high=stock_data['High'],
-            low=stock_data['Low'],
-            close=stock_data['Close'],
+            x=candles.index,
+            open=candles['Open'],
+            high=candles['High'],
+            low=candles['Low'],
+            close=candles['Close'],
             name='Price',
             increasing_line_color='#26a69a',
             decreasing_line_color='#ef5350'
@@ -31,9 +45,9 @@ def create_price_chart(stock_data, symbol, indicators):
     colors = {'MA20': '#1976D2', 'MA50': '#FFA000', 'MA200': '#E64A19'}
     for ma_name in ['MA20', 'MA50', 'MA200']:
         fig.add_trace(
-            go.Scatter(
-                x=stock_data.index,
-                y=indicators[ma_name],
+            go.Scattergl(
+                x=lines[ma_name].index,
+                y=lines[ma_name],
                 name=ma_name,
                 line=dict(color=colors[ma_name], width=1),
                 opacity=0.7
@@ -45,9 +59,9 @@ def create_price_chart(stock_data, symbol, indicators):
     for band, name in zip(['BB_Upper', 'BB_Middle', 'BB_Lower'], 
                          ['Upper BB', 'Middle BB', 'Lower BB']):
         fig.add_trace(
-            go.Scatter(
-                x=stock_data.index,
-                y=indicators[band],
+            go.Scattergl(
+                x=lines[band].index,
+                y=lines[band],
                 name=name,
                 line=dict(color='rgba(128, 128, 128, 0.3)', dash='dash'),
                 opacity=0.5
@@ -57,9 +71,9 @@ def create_price_chart(stock_data, symbol, indicators):
 
     # Add RSI
     fig.add_trace(
-        go.Scatter(
-            x=stock_data.index,
-            y=indicators['RSI'],
+        go.Scattergl(
+            x=lines['RSI'].index,
+            y=lines['RSI'],
             name='RSI',
             line=dict(color='#9C27B0')
         ),
@@ -81,7 +95,7 @@ def create_price_chart(stock_data, symbol, indicators):
         title=f'{symbol} Technical Analysis',
         yaxis_title='Price (₹)',
         yaxis2_title='RSI',
-        template='plotly_white',
+        template=template,
         xaxis_rangeslider_visible=False,
         height=800,
         showlegend=True,
@@ -99,15 +113,19 @@ def create_price_chart(stock_data, symbol, indicators):
 
     return fig
 
-def create_macd_chart(stock_data, indicators):
+def create_macd_chart(stock_data, indicators, x_range=None, max_points=MAX_POINTS_PER_TRACE,
+                      template='plotly_white'):
     """Create MACD chart"""
+    lines = {name: downsample_line(visible_slice(indicators[name], x_range), max_points) for name in
+             ['MACD', 'Signal', 'Histogram']}
+
     fig = go.Figure()
 
     # Add MACD line
     fig.add_trace(
-        go.Scatter(
-            x=stock_data.index,
-            y=indicators['MACD'],
+        go.Scattergl(
+            x=lines['MACD'].index,
+            y=lines['MACD'],
             name='MACD',
             line=dict(color='#2962FF')
         )
@@ -115,9 +133,9 @@ def create_macd_chart(stock_data, indicators):
 
     # Add Signal line
     fig.add_trace(
-        go.Scatter(
-            x=stock_data.index,
-            y=indicators['Signal'],
+        go.Scattergl(
+            x=lines['Signal'].index,
+            y=lines['Signal'],
             name='Signal',
             line=dict(color='#FF6D00')
         )
@@ -126,17 +144,17 @@ def create_macd_chart(stock_data, indicators):
     # Add Histogram
     fig.add_trace(
         go.Bar(
-            x=stock_data.index,
-            y=indicators['Histogram'],
+            x=lines['Histogram'].index,
+            y=lines['Histogram'],
             name='Histogram',
-            marker_color=np.where(indicators['Histogram'] >= 0, '#26a69a', '#ef5350')
+            marker_color=np.where(lines['Histogram'] >= 0, '#26a69a', '#ef5350')
         )
     )
 
     fig.update_layout(
         title='MACD Indicator',
         yaxis_title='Value',
-        template='plotly_white',
+        template=template,
         height=400,
         showlegend=True,
         legend=dict(
@@ -150,15 +168,18 @@ def create_macd_chart(stock_data, indicators):
 
     return fig
 
-def create_returns_chart(stock_data, symbol):
+def create_returns_chart(stock_data, symbol, returns=None, x_range=None, max_points=MAX_POINTS_PER_TRACE,
+                         template='plotly_white'):
     """Create returns chart with enhanced design"""
-    returns = (stock_data['Close'] / stock_data['Close'].iloc[0] - 1) * 100
+    if returns is None:
+        returns = (stock_data['Close'] / stock_data['Close'].iloc[0] - 1) * 100
+    returns = downsample_line(visible_slice(returns, x_range), max_points)
 
     fig = go.Figure()
 
     fig.add_trace(
-        go.Scatter(
-            x=stock_data.index,
+        go.Scattergl(
+            x=returns.index,
             y=returns,
             mode='lines',
             name='Returns',
@@ -171,10 +192,204 @@ def create_returns_chart(stock_data, symbol):
     fig.update_layout(
         title=f'{symbol} Cumulative Returns (%)',
         yaxis_title='Returns (%)',
-        template='plotly_white',
+        template=template,
         height=400,
         showlegend=False,
         hovermode='x unified'
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+# Rows and columns of the correlation heatmap sent to the browser
+MAX_HEATMAP_CELLS = 120
+
+
+def create_correlation_heatmap(matrix, symbols, window, max_cells=MAX_HEATMAP_CELLS, template='plotly_white'):
+    """Heatmap of a correlation matrix, in the order given (clustered order keeps groups together).
+
+    Larger universes are shown as averages over runs of consecutive
+    symbols, so the figure stays at most `max_cells` x `max_cells`.
+    """
+    n = len(symbols)
+    names = [s.replace('.NS', '') for s in symbols]
+    if n > max_cells:
+        starts = np.arange(0, n, -(-n // max_cells))
+        counts = np.diff(np.append(starts, n))
+        filled = np.nan_to_num(matrix.astype(float))
+        sums = np.add.reduceat(np.add.reduceat(filled, starts, axis=0), starts, axis=1)
+        matrix = sums / np.outer(counts, counts)
+        names = [f"{names[i]} … {names[i + k - 1]}" if k > 1 else names[i] for i, k in zip(starts, counts)]
+
+    fig = go.Figure(
+        go.Heatmap(
+            z=matrix,
+            x=names,
+            y=names,
+            zmin=-1,
+            zmax=1,
+            colorscale='RdBu_r',
+            colorbar=dict(title='ρ'),
+            hovertemplate='%{y}<br>%{x}<br>ρ = %{z:.2f}<extra></extra>'
+        )
+    )
+
+    fig.update_layout(
+        title=f'{window}-Day Return Correlation ({n} stocks)',
+        template=template,
+        height=700,
+        xaxis=dict(showticklabels=n <= 60),
+        yaxis=dict(showticklabels=n <= 60, autorange='reversed')
+    )
+
+    return fig
+
+# Trace names of the indicator lines drawn by the chart builders
+TRACE_INDICATORS = {
+    'MA20': 'MA20', 'MA50': 'MA50', 'MA200': 'MA200',
+    'Upper BB': 'BB_Upper', 'Middle BB': 'BB_Middle', 'Lower BB': 'BB_Lower',
+    'RSI': 'RSI', 'MACD': 'MACD', 'Signal': 'Signal', 'Histogram': 'Histogram'
+}
+
+
+def chart_data_version(stock_data):
+    """Version of a history that ignores in-place revisions of its last bar, but not re-adjusted earlier bars"""
+    if len(stock_data) == 0:
+        return None
+    return (len(stock_data), stock_data.index[0], stock_data.index[-1], close_checksum(stock_data, -1))
+
+
+def _last(values):
+    if isinstance(values, dict):
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype'])[-1]
+    return values[-1]
+
+
+def _with_last(values, value):
+    """Copy of a serialized trace array with its last element replaced"""
+    if isinstance(values, dict):
+        # Numeric arrays are serialized as plotly typed arrays (base64 'bdata')
+        array = np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype']).copy()
+        array[-1] = value
+        return {**values, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+    return list(values[:-1]) + [value]
+
+
+def patch_last_bar(spec, bar, latest):
+    """Copy of a serialized figure with the newest candle and last point of each line updated.
+
+    `latest` maps trace names to their new last value. Only the patched
+    arrays are copied; `spec` is left untouched. Downsampling always keeps
+    the final point and an aggregated last candle only widens, so the
+    newest values are exact; LTTB might have picked a neighbouring point in
+    the second-to-last bucket, which the next full rebuild corrects.
+    """
+    traces = []
+    for trace in spec['data']:
+        trace = dict(trace)
+        if trace['type'] == 'candlestick':
+            trace['high'] = _with_last(trace['high'], max(_last(trace['high']), bar['High']))
+            trace['low'] = _with_last(trace['low'], min(_last(trace['low']), bar['Low']))
+            trace['close'] = _with_last(trace['close'], bar['Close'])
+        elif trace.get('name') in latest and trace.get('y') is not None and len(trace['y']):
+            value = latest[trace['name']]
+            trace['y'] = _with_last(trace['y'], value)
+            if trace['type'] == 'bar':
+                trace['marker'] = {**trace['marker'],
+                                   'color': _with_last(trace['marker']['color'], '#26a69a' if value >= 0 else '#ef5350')}
+        traces.append(trace)
+    return {**spec, 'data': traces}
+
+
+class FigureCache(DerivedCache):
+    """LRU cache of finished figures keyed by (chart, symbol, period, data version, theme).
+
+    Each entry keeps the figure serialized to JSON (whose length is used for
+    the byte budget) and the last bar it shows. Sessions share entries, so a
+    cached figure is never modified: every caller gets its own go.Figure,
+    and a hit whose last bar was revised by a live tick swaps in a patched
+    copy instead of rebuilding.
+    """
+
+    def __init__(self, max_entries=48, max_bytes=96 * 1024 * 1024):
+        super().__init__(max_entries, max_bytes, sizeof=lambda entry: entry['nbytes'])
+        self.patches = 0
+        self._patch_lock = threading.Lock()
+
+    def get_or_build(self, key, build, bar, latest):
+        def build_entry():
+            spec = pio.to_json(build(), validate=False)
+            return {'json': spec, 'nbytes': len(spec), 'bar': bar}
+
+        entry = self.get_or_compute(key, build_entry)
+        with self._patch_lock:
+            if entry['bar'] != bar:
+                entry['json'] = json.dumps(patch_last_bar(json.loads(entry['json']), bar, latest))
+                entry['bar'] = bar
+                self.patches += 1
+            spec = entry['json']
+        # The JSON came from a validated figure, so it is not validated again
+        return go.Figure(json.loads(spec), _validate=False)
+
+
+figure_cache = FigureCache()
+perf.registry.register_collector('figure_cache', figure_cache.stats)
+
+
+def _last_bar(stock_data):
+    return {field: float(stock_data[field].iloc[-1]) for field in ['Open', 'High', 'Low', 'Close']}
+
+
+def _latest_indicators(indicators):
+    return {name: float(indicators[key].iloc[-1]) for name, key in TRACE_INDICATORS.items() if key in indicators}
+
+
+def _shows_last_bar(stock_data, x_range):
+    return x_range is None or x_range[1] is None or x_range[1] >= stock_data.index[-1]
+
+
+def cached_price_chart(stock_data, symbol, period, indicators, x_range=None, template='plotly_white'):
+    """create_price_chart served from figure_cache; a range ending before the newest bar is never patched"""
+    live = _shows_last_bar(stock_data, x_range)
+    key = ('price', symbol, period, chart_data_version(stock_data), x_range, template)
+    return figure_cache.get_or_build(
+        key,
+        lambda: create_price_chart(stock_data, symbol, indicators, x_range, template=template),
+        _last_bar(stock_data) if live else None,
+        _latest_indicators(indicators) if live else {}
+    )
+
+
+def cached_macd_chart(stock_data, symbol, period, indicators, x_range=None, template='plotly_white'):
+    """create_macd_chart served from figure_cache"""
+    live = _shows_last_bar(stock_data, x_range)
+    key = ('macd', symbol, period, chart_data_version(stock_data), x_range, template)
+    return figure_cache.get_or_build(
+        key,
+        lambda: create_macd_chart(stock_data, indicators, x_range, template=template),
+        _last_bar(stock_data) if live else None,
+        _latest_indicators(indicators) if live else {}
+    )
+
+
+def cached_returns_chart(stock_data, symbol, period, returns, x_range=None, template='plotly_white'):
+    """create_returns_chart served from figure_cache"""
+    live = _shows_last_bar(stock_data, x_range)
+    key = ('returns', symbol, period, chart_data_version(stock_data), x_range, template)
+    return figure_cache.get_or_build(
+        key,
+        lambda: create_returns_chart(stock_data, symbol, returns, x_range, template=template),
+        _last_bar(stock_data) if live else None,
+        {'Returns': float(returns.iloc[-1])} if live else {}
+    )
+
+
+def cached_correlation_heatmap(matrix, symbols, window, version, template='plotly_white'):
+    """create_correlation_heatmap served from figure_cache; `version` changes with the matrix"""
+    key = ('correlation', window, len(symbols), version, template)
+    return figure_cache.get_or_build(
+        key,
+        lambda: create_correlation_heatmap(matrix, symbols, window, template=template),
+        None,
+        {}
+    )